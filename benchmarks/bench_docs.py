@@ -0,0 +1,58 @@
+"""Time parsing and indexing of a large generated docsfile.
+
+Run from the top directory with: python benchmarks/bench_docs.py [PARAMETERS]
+
+A docsfile with PARAMETERS (default 20000) PARAMETER blocks, some FILE blocks
+and comments (about 3 MB for the default) is written to a temporary
+directory, then parsed in full with DocParser.parse(), indexed with
+DocParser.index() and parsed on demand with DocsIndex. Each is timed as the
+best of a few runs.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tui import (DocParser,
+                 DocsIndex)
+
+def write_docsfile(path, n):
+    """Write a docsfile with n PARAMETER blocks to path."""
+    with open(path, 'w') as f:
+        f.write('TITLE:\n    Benchmark\n'
+                'DESCRIPTION:\n    A generated docsfile.\n'
+                '# A comment line.\n'
+                'GENERAL:\n'
+                '    General text with an escaped \\# hash.\n\n')
+        for i in range(n):
+            f.write('PARAMETER: param%d\n'
+                    '    The docs for parameter number %d, which go on for a\n'
+                    '    while, so that the line looks like real docs. # comment\n'
+                    '\tTabs are expanded.\n\n' % (i, i))
+            if i % 100 == 0:
+                f.write('FILE: file%d.conf\n'
+                        '    A file.\n'
+                        '        Indented paragraph.\n\n' % i)
+
+def best(function, repeat=3):
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+def main(n=20000):
+    dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(dir, 'bench.docs')
+        write_docsfile(path, n)
+        print '%d parameters, %.1f MB' % (n, os.path.getsize(path) / 1e6)
+        print 'DocParser.parse:  %.3f s' % best(lambda: DocParser().parse(path))
+        print 'DocParser.index:  %.3f s' % best(lambda: DocParser().index(path))
+        label = 'param%d' % (n // 2)
+        lookup = lambda: DocsIndex([path]).parse('parameters', label)['parameters'][label]
+        print 'DocsIndex lookup: %.3f s' % best(lookup)
+    finally:
+        shutil.rmtree(dir)
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,61 @@
+"""Compare the textwrap and tui.fastwrap wrapping backends.
+
+Run from the top directory with: python benchmarks/bench_wrap.py [OPTIONS]
+
+Help, long help and the settings summary for a tui with OPTIONS (default 2000)
+documented options are rendered with tui.textwrapper set to each backend in
+turn, and timed as the best of a few runs. The output must be identical.
+Plain wrap() calls on the same docs are timed as well.
+"""
+import os
+import sys
+import textwrap
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tui import (Option,
+                 fastwrap,
+                 tui)
+
+DOCS = ('The value for parameter number %d, which goes on for a while so that '
+        'it needs wrapping over several lines, like real docs do. Some of them '
+        'have hyphenated words or  extra  spaces, which fastwrap hands over '
+        'to textwrap.')
+
+def make_ui(n):
+    options = []
+    for i in range(n):
+        docs = DOCS % i
+        if i % 10:
+            docs = docs.replace('  ', ' ').replace('hyphenated', 'long')
+        options.append(Option('param-%d' % i, 'Int', default=i, docs=docs))
+    return tui(options, progname='bench', command='bench', version='1', width=79,
+               docsfiles=[], configfiles=[], launch=False)
+
+def best(function, repeat=5):
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+def main(n=2000):
+    ui = make_ui(n)
+    print '%d options' % n
+    for methodname in ['help', 'longhelp', 'settingshelp']:
+        times = []
+        outputs = []
+        for backend in [textwrap, fastwrap]:
+            tui.textwrapper = backend
+            method = getattr(ui, methodname)
+            times.append(best(method))
+            outputs.append(method())
+        if outputs[0] != outputs[1]:
+            raise AssertionError('%s output differs between the backends' % methodname)
+        print '%-12s textwrap %7.1f ms  fastwrap %7.1f ms  (%.1fx)' % (
+            methodname, times[0] * 1000, times[1] * 1000, times[0] / times[1])
+    texts = [option.docs for option in ui.options.values()]
+    times = [best(lambda: [backend.wrap(text, 60, subsequent_indent='  ') for text in texts])
+             for backend in [textwrap, fastwrap]]
+    print '%-12s textwrap %7.1f ms  fastwrap %7.1f ms  (%.1fx)' % (
+        'wrap()', times[0] * 1000, times[1] * 1000, times[0] / times[1])
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,205 @@
+"""Tests for tui.completion and tui.complete().
+
+Run from the top directory with: python -m unittest discover tests
+"""
+import marshal
+import os
+import subprocess
+import sys
+import unittest
+
+from tui import (Option,
+                 Posarg,
+                 completion,
+                 formats)
+
+from test_tui import (Captured,
+                      TempDirTest,
+                      make_ui)
+
+def make_completion_ui(**kw):
+    return make_ui([Option('mode', formats.Choice(['fast', 'slow', "it's"]), 'm', docs='The mode. More text.'),
+                    Option('input', 'ReadableFile', 'i', docs='Input [file]: read.'),
+                    Option('quiet', 'Flag', 'q'),
+                    Posarg('target', formats.Choice(['all', 'none']), docs='What to do.'),
+                    Posarg('dirs', 'ReadableDir', recurring=True, docs='Dirs.')], **kw)
+
+class SpecTest(unittest.TestCase):
+
+    def test_action(self):
+        self.assertEqual(completion.action(formats.Choice(['a', 'b'])), ('choice', ['a', 'b']))
+        self.assertEqual(completion.action(formats.get_format('ReadableFile')), ('file', []))
+        self.assertEqual(completion.action(formats.get_format('ReadableDir')), ('dir', []))
+        self.assertEqual(completion.action(formats.get_format('Int')), ('none', []))
+
+    def test_summary(self):
+        self.assertEqual(completion.summary('First  sentence. Second.'), 'First sentence.')
+        self.assertEqual(completion.summary('No period'), 'No period')
+        self.assertEqual(completion.summary('e.g.this stays. Then'), 'e.g.this stays.')
+
+    def test_script(self):
+        self.assertRaises(ValueError, completion.script, make_completion_ui(), 'tcsh')
+
+class BashScriptTest(TempDirTest):
+    """Base for tests that run completion scripts in bash."""
+
+    def complete(self, script, words):
+        """Run the completion function of script in bash for words."""
+        function = 'complete_words'
+        for line in script.splitlines():
+            if line.startswith('complete '):
+                function = line.split()[-2]
+        commands = [script,
+                    'COMP_WORDS=(%s)' % ' '.join(completion._sh_quote(word) for word in words),
+                    'COMP_CWORD=%d' % (len(words) - 1),
+                    function,
+                    'printf "%s\\n" "${COMPREPLY[@]}"']
+        process = subprocess.Popen(['bash', '--norc', '--noprofile', '-c', '\n'.join(commands)],
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=self.dir)
+        stdout, stderr = process.communicate()
+        self.assertEqual(stderr, '')
+        return sorted(line for line in stdout.splitlines() if line)
+
+    def assertSyntax(self, script):
+        process = subprocess.Popen(['bash', '-n'], stdin=subprocess.PIPE)
+        process.communicate(script)
+        self.assertEqual(process.returncode, 0)
+
+class BashTest(BashScriptTest):
+
+    def setUp(self):
+        BashScriptTest.setUp(self)
+        os.mkdir(self.path('somedir'))
+        open(self.path('somefile'), 'w').close()
+        self.script = completion.bash(make_completion_ui())
+
+    def test_syntax(self):
+        self.assertSyntax(self.script)
+
+    def test_option_names(self):
+        self.assertEqual(self.complete(self.script, ['prog', '--m']), ['--mode'])
+        self.assertEqual(self.complete(self.script, ['prog', '-']),
+                         sorted(['--mode', '-m', '--input', '-i', '--quiet', '-q', '--help', '-h',
+                                 '--HELP', '--settings', '--version', '-V']))
+
+    def test_option_values(self):
+        self.assertEqual(self.complete(self.script, ['prog', '--mode', 'f']), ['fast'])
+        self.assertEqual(self.complete(self.script, ['prog', '-m', '']), ['fast', "it's", 'slow'])
+        self.assertEqual(self.complete(self.script, ['prog', '-i', 'some']), ['somedir', 'somefile'])
+
+    def test_posargs(self):
+        self.assertEqual(self.complete(self.script, ['prog', '']), ['all', 'none'])
+        # Option arguments are not counted as positional arguments.
+        self.assertEqual(self.complete(self.script, ['prog', '-m', 'fast', '-q', 'a']), ['all'])
+        self.assertEqual(self.complete(self.script, ['prog', 'all', 'some']), ['somedir'])
+        self.assertEqual(self.complete(self.script, ['prog', 'all', 'x', 'some']), ['somedir'])
+
+class ScriptsTest(unittest.TestCase):
+
+    def test_zsh(self):
+        script = completion.zsh(make_completion_ui())
+        lines = script.splitlines()
+        self.assertEqual(lines[0], '#compdef prog')
+        self.assertTrue("  '(--mode -m)'{--mode,-m}'[The mode.]:MODE:(fast it'\\''s slow)' \\" in lines, script)
+        self.assertTrue("  '(--input -i)'{--input,-i}'[Input \\[file\\]\\: read.]:INPUT:_files' \\" in lines, script)
+        self.assertTrue("  '1:TARGET:(all none)' \\" in lines, script)
+        self.assertEqual(lines[-1], "  '*:DIRS:_files -/'")
+
+    def test_fish(self):
+        script = completion.fish(make_completion_ui())
+        lines = script.splitlines()
+        self.assertTrue("complete -c 'prog' -f" in lines, script)
+        self.assertTrue("complete -c 'prog' -l 'mode' -s 'm' -r -f -a 'fast it\\'s slow' -d 'The mode.'" in lines, script)
+        self.assertTrue("complete -c 'prog' -l 'input' -s 'i' -r -F -d 'Input [file]: read.'" in lines, script)
+        self.assertTrue("complete -c 'prog' -a 'all none' -d 'TARGET'" in lines, script)
+
+class CompleteTest(unittest.TestCase):
+
+    def complete(self, *words):
+        return make_completion_ui().complete(['prog'] + list(words))
+
+    def test_options(self):
+        self.assertEqual(self.complete('--mo'), ['--mode'])
+        self.assertEqual(self.complete('--mode', ''), ['fast', "it's", 'slow'])
+        self.assertEqual(self.complete('-m', 's'), ['slow'])
+        self.assertEqual(self.complete('-q', '--q'), ['--quiet'])
+
+    def test_posargs(self):
+        self.assertEqual(self.complete(''), ['all', 'none'])
+        self.assertEqual(self.complete('-m', 'fast', 'n'), ['none'])
+        # Options are not completed after positional arguments or --.
+        self.assertEqual(self.complete('all', '--m'), [])
+        self.assertEqual(self.complete('--', '--m'), [])
+
+    def test_cword(self):
+        ui = make_completion_ui()
+        self.assertEqual(ui.complete(['prog', '--mode', 'f', 'all'], 2), ['fast'])
+
+    def test_launch(self):
+        # Not while the tui is made, with launch=False.
+        ui = make_completion_ui(argv=['prog', '--tui-complete', '2', 'prog', '--mode', 'f'])
+        captured = Captured(ui.launch, ['prog', '--tui-complete', '2', 'prog', '--mode', 'f'])
+        self.assertEqual((captured.status, captured.stdout), (0, 'fast\n'))
+        captured = Captured(ui.launch, ['prog', '--tui-complete', 'x'])
+        self.assertTrue('usage: prog --tui-complete' in captured.status, captured.status)
+
+class CompletionCacheTest(TempDirTest):
+
+    def test_cached(self):
+        cache = self.path('cache')
+        expected = make_completion_ui(helpcache=cache).completions()
+        self.assertTrue('prog-complete.marshal' in os.listdir(cache))
+        ui = make_completion_ui(helpcache=cache)
+        # A cached result is not computed again.
+        ui.options['mode'].format.complete = None
+        self.assertEqual(ui.completions(), expected)
+
+    def test_bad_cache_is_ignored(self):
+        cache = self.path('cache')
+        ui = make_completion_ui(helpcache=cache)
+        expected = ui.completions()
+        key = ui.specfingerprint('complete')
+        # A pickle must not be loaded.
+        bad = ['garbage', marshal.dumps([1, 2]), marshal.dumps((['--a'], {'a': [1]})),
+               marshal.dumps(('--a', {})), "cos\nsystem\n(S'false'\ntR."]
+        for data in bad:
+            with open(os.path.join(cache, 'prog-complete.marshal'), 'wb') as f:
+                f.write(key + '\n' + data)
+            self.assertEqual(make_completion_ui(helpcache=cache).completions(), expected, repr(data))
+
+class BashDynamicTest(BashScriptTest):
+
+    program = """\
+#!%s
+import sys
+sys.path[:0] = %r
+from tui import Option, formats, tui
+tui([Option('mode', formats.Choice(['fast', 'slow']), 'm')], progname='prog', command='prog',
+    docsfiles=['/does/not/exist'], configfiles=[])
+"""
+
+    def setUp(self):
+        BashScriptTest.setUp(self)
+        with open(self.path('prog'), 'w') as f:
+            f.write(self.program % (sys.executable, [os.path.abspath('.'), os.path.abspath('tests')]))
+        os.chmod(self.path('prog'), 0755)
+        self.script = completion.bash_dynamic(make_completion_ui())
+
+    def test_syntax(self):
+        self.assertSyntax(self.script)
+
+    def test_option_values(self):
+        self.assertEqual(self.complete(self.script, ['./prog', '--mode', 'f']), ['fast'])
+        self.assertEqual(self.complete(self.script, ['./prog', '--m']), ['--mode'])
+
+    def test_program_is_one_word(self):
+        # The typed command is not split or expanded by the shell.
+        self.assertEqual(self.complete(self.script, ['./prog; touch hacked', '--m']), [])
+        self.assertFalse(os.path.exists(self.path('hacked')))
+
+    def test_tilde(self):
+        script = 'HOME=%s\n%s' % (completion._sh_quote(self.dir), self.script)
+        self.assertEqual(self.complete(script, ['~/prog', '--m']), ['--mode'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Tests for tui.fastwrap.
+
+Run from the top directory with: python -m unittest discover tests
+"""
+import random
+import textwrap
+import unittest
+
+from tui import fastwrap
+
+class ConformanceTest(unittest.TestCase):
+    """fastwrap.wrap() must give the same output as textwrap.wrap()."""
+
+    texts = ['',
+             ' ',
+             'a',
+             'word',
+             'two words',
+             'a sentence that is long enough to need wrapping at most widths',
+             'averyveryveryverylongwordthatmustbebroken and then some',
+             'short averyveryveryverylongwordthatmustbebroken',
+             'hyphen-ated words',
+             'double  spaces',
+             ' leading space',
+             'trailing space ',
+             'tab\tseparated',
+             'new\nline',
+             'end of sentence. Next',
+             'unicode \xc3\xa9t\xc3\xa9 bytes',
+             u'unicode \xe9t\xe9 text']
+
+    def assertSame(self, text, width, initial_indent='', subsequent_indent='', **kw):
+        kw.update(initial_indent=initial_indent, subsequent_indent=subsequent_indent)
+        expected = textwrap.wrap(text, width, **kw)
+        self.assertEqual(fastwrap.wrap(text, width, **kw), expected, (text, width, kw))
+        self.assertEqual(fastwrap.fill(text, width, **kw), '\n'.join(expected))
+
+    def test_cases(self):
+        for text in self.texts:
+            for width in range(1, 40):
+                self.assertSame(text, width)
+                # textwrap can loop forever if the indents leave no room.
+                if width > 4:
+                    self.assertSame(text, width, '  ', '    ')
+                    self.assertSame(text, width, '', '...')
+
+    def test_random(self):
+        rng = random.Random(0)
+        alphabet = ['a', 'b', 'long', 'x' * 12, 'y' * 30, '.', ',']
+        for i in range(2000):
+            text = ' '.join(rng.choice(alphabet) for j in range(rng.randint(0, 30)))
+            width = rng.randint(7, 80)
+            self.assertSame(text, width, ' ' * rng.randint(0, 4), ' ' * rng.randint(0, 6))
+
+    def test_keyword_arguments(self):
+        self.assertSame('a b-c d', 3, break_on_hyphens=False)
+        self.assertSame('averyverylongword', 5, break_long_words=False)
+
+    def test_fast_path(self):
+        self.assertFalse(fastwrap._unsafe.search('plain words, one space apart.'))
+        for text in ['a-b', 'a  b', ' a', 'a ', 'a\tb', 'a\nb']:
+            self.assertTrue(fastwrap._unsafe.search(text), repr(text))
+
+if __name__ == '__main__':
+    unittest.main()
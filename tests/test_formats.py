@@ -0,0 +1,143 @@
+"""Tests for tui.formats.
+
+Run from the top directory with: python -m unittest discover tests
+"""
+import cStringIO
+import shlex
+import sys
+import unittest
+
+from tui import formats
+
+class SplitArgsTest(unittest.TestCase):
+    """split_args() must agree with shlex.split(argstr, comments=True)."""
+
+    cases = ['',
+             ' ',
+             'a',
+             'a b',
+             '  a   b  ',
+             'a\tb\tc',
+             'a\nb\r\nc',
+             'a\rb',
+             'a\x0bb',
+             'a\x0cb',
+             'a\xa0b',
+             '1:2:3 4,5,6',
+             '%(server)s/index.html',
+             'caf\xc3\xa9 \xe9t\xe9',
+             "'a b'",
+             '"a b"',
+             "a'b c'd",
+             '"a \\"b\\" c"',
+             "'a \\' b",
+             'a\\ b',
+             'a\\\\b',
+             'a\\',
+             'a #comment',
+             'a#b',
+             '# all comment',
+             "'#' not a comment",
+             '"" empty',
+             "''",
+             '"',
+             "'unbalanced",
+             'a "b',
+             u'unicode value',
+             u'quoted "unicode value"']
+
+    def shlex_split(self, argstr):
+        try:
+            return shlex.split(argstr, comments=True)
+        except ValueError, e:
+            return ValueError, str(e)
+
+    def split_args(self, argstr):
+        try:
+            return formats.split_args(argstr)
+        except ValueError, e:
+            return ValueError, str(e)
+
+    def test_conformance(self):
+        for argstr in self.cases:
+            self.assertEqual(self.split_args(argstr), self.shlex_split(argstr), repr(argstr))
+
+    def test_all_ascii_pairs(self):
+        # Every printable or whitespace character, alone and around a word.
+        chars = [chr(i) for i in range(1, 128) if chr(i).isspace() or 32 <= i < 127]
+        for c in chars:
+            for argstr in [c, 'a%sb' % c, '%sa %s' % (c, c)]:
+                self.assertEqual(self.split_args(argstr), self.shlex_split(argstr), repr(argstr))
+
+    def test_fast_path(self):
+        # Plain values do not need shlex.
+        self.assertFalse(formats._shlex_special.search('a b\tc'))
+        self.assertTrue(formats._shlex_special.search('a #b'))
+
+class TupleTest(unittest.TestCase):
+
+    def test_parse(self):
+        t = formats.Tuple([formats.Float, formats.Float, formats.Float])
+        self.assertEqual(t.parse(['1:2.5: 3']), [1.0, 2.5, 3.0])
+
+    def test_parse_consumes_one_argument(self):
+        t = formats.Tuple([formats.Int, formats.String])
+        argv = ['1:a', 'rest']
+        self.assertEqual(t.parse(argv), [1, 'a'])
+        self.assertEqual(argv, ['rest'])
+
+    def test_last_separator_repeats(self):
+        t = formats.Tuple([formats.Int] * 4, separator=',:')
+        self.assertEqual(t.parse_argument('1,2:3:4'), [1, 2, 3, 4])
+
+    def test_splits_at_first_occurrence(self):
+        # The last part gets the rest, separators and all.
+        t = formats.Tuple([formats.String, formats.String])
+        self.assertEqual(t.parse_argument('a:b:c'), ['a', 'b:c'])
+
+    def test_strip(self):
+        t = formats.Tuple([formats.String, formats.String], strip=False)
+        self.assertEqual(t.parse_argument(' a : b '), [' a ', ' b '])
+
+    def test_missing_separator(self):
+        t = formats.Tuple([formats.Int, formats.Int, formats.Int], separator=',:')
+        try:
+            t.parse_argument('1,2')
+        except formats.BadArgument, e:
+            self.assertTrue("':'" in e.message, e.message)
+        else:
+            self.fail('no BadArgument')
+
+    def test_bad_field(self):
+        t = formats.Tuple([formats.Int, formats.Int])
+        self.assertRaises(formats.BadArgument, t.parse_argument, '1:x')
+
+    def test_special(self):
+        t = formats.Tuple([formats.Int, formats.Int], special={'none': None})
+        self.assertEqual(t.parse_argument('None'), None)
+
+    def test_parse_many(self):
+        t = formats.Tuple([formats.Float, formats.Float, formats.Float])
+        self.assertEqual(t.parse_many(['1:2:3', '4:5:6']),
+                         [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+
+    def test_present(self):
+        t = formats.Tuple([formats.Int, formats.Int], separator=',')
+        self.assertEqual(t.present([1, 2]), '1,2')
+
+    def test_prints_nothing(self):
+        t = formats.Tuple([formats.Int, formats.Int])
+        stdout = sys.stdout
+        sys.stdout = cStringIO.StringIO()
+        try:
+            t.parse(['1:2'])
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(output, '')
+
+    def test_too_many_separators(self):
+        self.assertRaises(ValueError, formats.Tuple, [formats.Int], separator=':')
+
+if __name__ == '__main__':
+    unittest.main()
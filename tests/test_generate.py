@@ -0,0 +1,91 @@
+"""Tests for tui.generate.
+
+Run from the top directory with: python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+from tui import (Option,
+                 Posarg,
+                 generate)
+
+from test_tui import (Captured,
+                      TempDirTest,
+                      make_ui)
+
+def make_spec_ui():
+    return make_ui([Option('size', 'Int', 's', default=3, docs='The size, e.g. -1 or 2.'),
+                    Posarg('file', 'String', docs='The *file* to read.')],
+                   title='.Prog with a leading dot', description='Reads files.')
+
+class GenerateTest(TempDirTest):
+
+    def test_load(self):
+        with open(self.path('specmodule.py'), 'w') as f:
+            f.write('from test_generate import make_spec_ui\n'
+                    'ui = make_spec_ui()\n'
+                    'class holder:\n'
+                    '    factory = staticmethod(make_spec_ui)\n'
+                    'notui = 1\n')
+        sys.path.insert(0, self.dir)
+        try:
+            self.assertTrue('size' in generate.load('specmodule:ui').options)
+            self.assertTrue('size' in generate.load('specmodule:holder.factory').options)
+            self.assertEqual(generate.load('specmodule:holder.factory', call=False), make_spec_ui)
+            self.assertRaises(ValueError, generate.load, 'specmodule:notui')
+            self.assertRaises(ValueError, generate.load, 'specmodule')
+            self.assertRaises(AttributeError, generate.load, 'specmodule:missing')
+            self.assertRaises(ImportError, generate.load, 'nosuchspecmodule:ui')
+        finally:
+            sys.path.remove(self.dir)
+            del sys.modules['specmodule']
+
+    def test_generate(self):
+        paths = generate.generate(make_spec_ui(), self.path('out'), widths=[60, 79], kinds=['text', 'man', 'markdown'])
+        self.assertEqual(sorted(os.path.basename(path) for path in paths),
+                         ['prog-help-60.txt', 'prog-help-79.txt', 'prog-longhelp-60.txt',
+                          'prog-longhelp-79.txt', 'prog.1', 'prog.md'])
+
+    def test_helptext_is_runtime_help(self):
+        ui = make_spec_ui()
+        captured = Captured(ui.launch, ['prog', '--help'])
+        self.assertEqual(generate.helptext(make_spec_ui(), 'help', 79) + '\n', captured.stdout)
+        # The help option is only set while rendering.
+        ui = make_spec_ui()
+        generate.helptext(ui, 'help', 79)
+        self.assertFalse(ui['help'])
+
+    def test_helpdir(self):
+        generate.generate(make_spec_ui(), self.dir, kinds=['text'])
+        with open(self.path('prog-help-79.txt'), 'a') as f:
+            f.write('\nPREBUILT')
+        captured = Captured(make_ui([Option('size', 'Int', 's', default=3)], helpdir=self.dir).launch,
+                            ['prog', '--help'])
+        self.assertTrue(captured.stdout.endswith('PREBUILT\n'), captured.stdout)
+        # Prebuilt help only shows builtin defaults.
+        captured = Captured(make_ui([Option('size', 'Int', 's', default=3)], helpdir=self.dir).launch,
+                            ['prog', '--size', '4', '--help'])
+        self.assertFalse('PREBUILT' in captured.stdout, captured.stdout)
+        self.assertTrue('Int(4)' in captured.stdout, captured.stdout)
+
+    def test_manpage(self):
+        text = generate.manpage(make_spec_ui())
+        self.assertTrue(text.startswith('.TH "PROG" "1" "" "\\&.Prog with a leading dot" ""\n'), text)
+        self.assertTrue('prog \\- Reads files.' in text, text)
+        self.assertTrue('\\fB\\-\\-size\\fR, \\fB\\-s\\fR' in text, text)
+        self.assertTrue('e.g. \\-1 or 2.' in text, text)
+        for line in text.splitlines():
+            self.assertFalse(line.startswith("'"), line)
+
+    def test_markdown(self):
+        text = generate.markdown(make_spec_ui())
+        self.assertTrue(text.startswith('# prog\n'), text)
+        self.assertTrue('* `--size`, `-s`: Int(3). The size, e.g. -1 or 2.' in text, text)
+        self.assertTrue('The \\*file\\* to read.' in text, text)
+
+    def test_troff_escapes(self):
+        self.assertEqual(generate._troff('.a\n\'b\nc-d \\e'), '\\&.a\n\\&\'b\nc\\-d \\ee')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,452 @@
+"""Tests for docs, help output and the help options of tui.
+
+Run from the top directory with: python -m unittest discover tests
+"""
+import cPickle
+import cStringIO
+import marshal
+import os
+import sys
+import unittest
+
+from tui import (DocParser,
+                 DocsIndex,
+                 DocVars,
+                 Option,
+                 Posarg,
+                 SearchIndex,
+                 paramhelp_option,
+                 searchhelp_option)
+
+from test_tui import (Captured,
+                      TempDirTest,
+                      make_ui)
+
+DOCS = """\
+TITLE:
+    Prog
+
+PARAMETER: size
+    The size of the thing.
+
+PARAMETER: name
+    The name of the thing.
+"""
+
+class DocsTest(TempDirTest):
+
+    def docsfile(self, text=DOCS, name='prog.docs'):
+        with open(self.path(name), 'w') as f:
+            f.write(text)
+        return self.path(name)
+
+class DocsIndexTest(DocsTest):
+
+    def setUp(self):
+        DocsTest.setUp(self)
+        self.indexed = 0
+        self.index = DocParser.index
+        def index(parser, filename):
+            self.indexed += 1
+            return self.index(parser, filename)
+        DocParser.index = index
+
+    def tearDown(self):
+        DocParser.index = self.index
+        DocsTest.tearDown(self)
+
+    def test_parse(self):
+        index = DocsIndex([self.docsfile()])
+        self.assertEqual(index.labels('parameters'), ['size', 'name'])
+        parser = index.parse('parameters', 'name')
+        self.assertEqual(parser['parameters'], {'name': ['The name of the thing.']})
+
+    def test_cachefile(self):
+        docsfile, cachefile = self.docsfile(), self.path('index.cache')
+        first = DocsIndex([docsfile], cachefile).blocks
+        self.assertEqual(self.indexed, 1)
+        self.assertEqual(DocsIndex([docsfile], cachefile).blocks, first)
+        self.assertEqual(self.indexed, 1)
+
+    def test_changed_docsfile(self):
+        docsfile, cachefile = self.docsfile(), self.path('index.cache')
+        DocsIndex([docsfile], cachefile)
+        self.docsfile(DOCS + '\nPARAMETER: more\n    More.\n')
+        index = DocsIndex([docsfile], cachefile)
+        self.assertEqual(self.indexed, 2)
+        self.assertEqual(index.labels('parameters'), ['size', 'name', 'more'])
+
+    def test_bad_cachefile_is_ignored(self):
+        docsfile, cachefile = self.docsfile(), self.path('index.cache')
+        expected = DocsIndex([docsfile]).blocks
+        bad = ['garbage',
+               marshal.dumps([1, 2]),
+               marshal.dumps({docsfile: 'x'}),
+               marshal.dumps({docsfile: ((0, 0), [('parameters', None, 5, 0, 0)])}),
+               # A pickle must not be loaded.
+               "cos\nsystem\n(S'false'\ntR."]
+        for data in bad:
+            with open(cachefile, 'wb') as f:
+                f.write(data)
+            self.assertEqual(DocsIndex([docsfile], cachefile).blocks, expected, repr(data))
+
+    def test_cachefile_is_closed(self):
+        docsfile, cachefile = self.docsfile(), self.path('index.cache')
+        DocsIndex([docsfile], cachefile)
+        with open(cachefile, 'rb') as f:
+            self.assertTrue(isinstance(marshal.load(f), dict))
+
+class HelpOptionsTest(DocsTest):
+
+    def make_ui(self, **kw):
+        return make_ui([Option('size', 'Int', default=3), Option('name', 'String')],
+                       docsfiles=[self.docsfile()], **kw)
+
+    def test_not_added_by_default(self):
+        ui = self.make_ui()
+        self.assertFalse('help-param' in ui.options)
+        self.assertFalse('help-search' in ui.options)
+        captured = Captured(ui.launch, ['prog', '--help-param', 'size'])
+        self.assertTrue('help-param' in str(captured.status), captured.status)
+
+    def test_help_param(self):
+        ui = self.make_ui(paramhelpoption=paramhelp_option)
+        captured = Captured(ui.launch, ['prog', '--help-param', 'size'])
+        self.assertEqual(captured.status, 0)
+        self.assertTrue('Int(3). The size of the thing.' in captured.stdout, captured.stdout)
+        self.assertFalse('name' in captured.stdout, captured.stdout)
+
+    def test_help_search(self):
+        ui = self.make_ui(searchhelpoption=searchhelp_option)
+        captured = Captured(ui.launch, ['prog', '--help-search', 'nam'])
+        self.assertEqual(captured.status, 0)
+        self.assertTrue('The name of the thing.' in captured.stdout, captured.stdout)
+        self.assertFalse('The size' in captured.stdout, captured.stdout)
+
+class DocVarsTest(DocsTest):
+
+    docs = """\
+TITLE:
+    %(progname)s %(version)s
+
+PARAMETER: size
+    The size for %(progname)s, in 100%% units.
+
+FILE: %(progname)s.log
+    Where %(progname)s logs.
+"""
+
+    def make_ui(self, **kw):
+        kw.setdefault('docsfiles', [self.docsfile(self.docs)])
+        return make_ui([Option('size', 'Int')], version='1.0', **kw)
+
+    def test_version_changes(self):
+        docvars = DocVars(a=1)
+        versions = set([docvars.version])
+        for change in [lambda: docvars.__setitem__('a', 2),
+                       lambda: docvars.update(b=3),
+                       lambda: docvars.setdefault('c', 4),
+                       lambda: docvars.pop('c'),
+                       lambda: docvars.__delitem__('b'),
+                       docvars.clear]:
+            change()
+            self.assertFalse(docvars.version in versions)
+            versions.add(docvars.version)
+
+    def test_rendered(self):
+        ui = self.make_ui()
+        text = ui.longhelp()
+        self.assertTrue('prog 1.0' in text, text)
+        self.assertTrue('The size for prog, in 100% units.' in text, text)
+        self.assertTrue('Where prog logs.' in text, text)
+
+    def test_changed_docvars(self):
+        ui = self.make_ui()
+        ui.help()
+        ui.docvars['progname'] = 'other'
+        self.assertTrue('The size for other' in ui.help())
+        ui.docvars = dict(ui.docvars, progname='third')
+        self.assertTrue(isinstance(ui.docvars, DocVars))
+        self.assertTrue('The size for third' in ui.help())
+
+    def test_changed_docs(self):
+        ui = self.make_ui()
+        ui.help()
+        ui.options['size'].docs = 'Plain %(progname)s.'
+        # Docs not from a docsfile are not templates.
+        self.assertTrue('Plain %(progname)s.' in ui.help())
+
+    def test_usage_interpolated_once(self):
+        ui = self.make_ui(usage='%(progname)s 100%%')
+        self.assertEqual(ui.format_usage(), 'prog 100%')
+
+    def test_filedocs(self):
+        filedocs = {'%(progname)s.conf': ['For %(progname)s.']}
+        ui = self.make_ui(docsfiles=[], filedocs=filedocs)
+        self.assertEqual(filedocs, {'%(progname)s.conf': ['For %(progname)s.']})
+        self.assertTrue('For prog.' in ui.longhelp())
+
+    def test_file_blocks_are_merged(self):
+        ui = self.make_ui(filedocs={'other.conf': ['Other.']})
+        text = ui.longhelp()
+        self.assertTrue('Other.' in text, text)
+        self.assertTrue('Where prog logs.' in text, text)
+
+class HelpCacheTest(DocsTest):
+
+    def setUp(self):
+        DocsTest.setUp(self)
+        # Writing it again would change its mtime, and so the fingerprint.
+        self.docs = self.docsfile()
+
+    def make_ui(self, argv=(), **kw):
+        ui = make_ui([Option('size', 'Int', default=3), Option('name', 'String')], docsfiles=[self.docs],
+                     helpcache=self.path('cache'), **kw)
+        ui.launch(['prog'] + list(argv))
+        return ui
+
+    def rendered(self, ui, methodname):
+        calls = []
+        method = getattr(ui, 'iter' + methodname)
+        def counting(width):
+            calls.append(width)
+            return method(width)
+        setattr(ui, 'iter' + methodname, counting)
+        text = ui.cachedhelp(methodname)
+        return text, len(calls)
+
+    def test_hit(self):
+        text, calls = self.rendered(self.make_ui(), 'help')
+        self.assertEqual(calls, 1)
+        self.assertEqual(self.rendered(self.make_ui(), 'help'), (text, 0))
+
+    def test_changes_are_not_hits(self):
+        text, calls = self.rendered(self.make_ui(), 'settingshelp')
+        self.assertTrue('Int(3)' in text, text)
+        text, calls = self.rendered(self.make_ui(['--size', '4']), 'settingshelp')
+        self.assertEqual(calls, 1)
+        self.assertTrue('Int(4)' in text, text)
+        ui = self.make_ui(['--size', '4'])
+        ui.docvars['progname'] = 'other'
+        self.assertEqual(self.rendered(ui, 'settingshelp')[1], 1)
+
+    def test_bounded(self):
+        for size in range(10):
+            for methodname in ['help', 'settingshelp']:
+                self.make_ui(['--size', str(size)]).cachedhelp(methodname)
+        self.assertEqual(sorted(os.listdir(self.path('cache'))),
+                         ['prog-help-79.txt', 'prog-settingshelp-79.txt'])
+
+    def test_unwritable(self):
+        with open(self.path('cache'), 'w') as f:
+            f.write('not a directory')
+        text, calls = self.rendered(self.make_ui(), 'help')
+        self.assertEqual(self.rendered(self.make_ui(), 'help'), (text, 1))
+
+class LayoutTest(unittest.TestCase):
+
+    def make_ui(self):
+        ui = make_ui([Option('size', 'Int', 's', default=3, docs='The size.'),
+                      Option('name', 'String', docs='The name.')], title='Prog')
+        ui.launch(['prog', '--name', 'a name that is long enough to need wrapping in a table'])
+        return ui
+
+    def test_labels(self):
+        ui = self.make_ui()
+        lines = ui.optionhelp(width=79).splitlines()
+        # The one-space margin at indent 0 is kept.
+        self.assertEqual(lines[0], ' --size, -s:    Int(3). The size.')
+        self.assertEqual(ui.strsettings(width=79).splitlines()[0], 'size:     Int(3): Builtin default.')
+
+    def test_cache_cleared_by_new_parameters(self):
+        ui = self.make_ui()
+        ui.optionhelp()
+        ui._add_option(Option('a-much-longer-name', 'Flag', docs='New.'))
+        text = ui.optionhelp(width=79)
+        self.assertTrue(' --a-much-longer-name: Flag(False). New.' in text, text)
+        self.assertTrue(' --size, -s:           Int(3). The size.' in text, text)
+
+    def test_settingstable(self):
+        lines = self.make_ui().settingstable(width=60).splitlines()
+        self.assertEqual(lines[0].split(), ['NAME', 'FORMAT', 'VALUE', 'ORIGIN'])
+        self.assertTrue(lines[1].startswith('size      Int     3'), lines)
+        self.assertTrue(all(len(line) <= 60 for line in lines), lines)
+        # The long value is wrapped in its column.
+        name = [i for i, line in enumerate(lines) if line.startswith('name ')][0]
+        self.assertEqual(lines[name + 1][:18].strip(), '')
+
+    def test_settingstable_too_narrow(self):
+        ui = self.make_ui()
+        self.assertEqual(ui.settingstable(width=25), ui.strsettings(width=25))
+
+    def test_settingshelp(self):
+        ui = self.make_ui()
+        self.assertFalse('NAME' in ui.settingshelp(width=79))
+        ui.settings_table_width = 70
+        self.assertTrue('NAME' in ui.settingshelp(width=79))
+        self.assertFalse('NAME' in ui.settingshelp(width=60))
+
+class Terminal(object):
+    """A stdout that claims to be a terminal."""
+
+    def __init__(self):
+        self.out = cStringIO.StringIO()
+        self.write = self.out.write
+
+    def isatty(self):
+        return True
+
+class StreamTest(DocsTest):
+
+    def make_ui(self, **kw):
+        options = [Option('param-%d' % i, 'Int', default=i, docs='Docs for parameter %d, ' % i * 5)
+                   for i in range(50)]
+        ui = make_ui(options, title='Prog', description='Does things.', **kw)
+        ui.launch(['prog', '--param-3', '4'])
+        return ui
+
+    def test_same_as_strings(self):
+        ui = self.make_ui()
+        for methodname in ['help', 'longhelp', 'settingshelp']:
+            for width in [0, 40, 79, 120]:
+                self.assertEqual('\n'.join(getattr(ui, 'iter' + methodname)(width)),
+                                 getattr(ui, methodname)(width), (methodname, width))
+        ui.settings_table_width = 70
+        self.assertEqual('\n'.join(ui.itersettingshelp(79)), ui.settingshelp(79))
+        for methodname in ['optionhelp', 'posarghelp', 'strsettings']:
+            self.assertEqual('\n'.join(getattr(ui, 'iter' + methodname)(width=60)),
+                             getattr(ui, methodname)(width=60), methodname)
+
+    def test_streamed(self):
+        ui = self.make_ui()
+        wrapped = []
+        class Counting(object):
+            @staticmethod
+            def wrap(*args, **kw):
+                wrapped.append(args)
+                return ui.__class__.textwrapper.wrap(*args, **kw)
+        ui.textwrapper = Counting
+        lines = ui.iteroptionhelp(width=79)
+        lines.next()
+        self.assertTrue(len(wrapped) < 5, len(wrapped))
+
+    def test_page_without_terminal(self):
+        captured = Captured(self.make_ui(pager='false').page, iter(['a', 'b']))
+        self.assertEqual(captured.stdout, 'a\nb\n')
+
+    def test_pager(self):
+        path = self.path('paged')
+        ui = self.make_ui(pager='cat > %s' % path)
+        stdout = sys.stdout
+        sys.stdout = terminal = Terminal()
+        try:
+            ui.page(iter(['a', 'b']))
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(terminal.out.getvalue(), '')
+        with open(path) as f:
+            self.assertEqual(f.read(), 'a\nb\n')
+
+    def test_pager_quit_early(self):
+        ui = self.make_ui(pager='head -c 1 > /dev/null')
+        stdout = sys.stdout
+        sys.stdout = Terminal()
+        try:
+            ui.page('x' * 1000 for i in range(1000))
+        finally:
+            sys.stdout = stdout
+
+class SearchIndexTest(unittest.TestCase):
+
+    entries = [('size', [('size', 3), ('Int', 2), ('The size of the output.', 1)]),
+               ('output', [('output', 3), ('String', 2), ('Where to write the output.', 1)]),
+               ('outline', [('outline', 3), ('Flag', 2), ('Draw outlines.', 1)])]
+
+    def names(self, query, limit=None):
+        return [name for score, name in SearchIndex(self.entries).search(query, limit)]
+
+    def test_names_weigh_more_than_docs(self):
+        self.assertEqual(self.names('output'), ['output', 'size'])
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.names('output size'), ['size'])
+        self.assertEqual(self.names('output nothing'), [])
+
+    def test_prefixes(self):
+        self.assertEqual(sorted(self.names('out')), ['outline', 'output', 'size'])
+        # Exact matches count more than prefix matches.
+        self.assertEqual(self.names('outline')[0], 'outline')
+
+    def test_case_and_punctuation(self):
+        self.assertEqual(self.names('WRITE!'), ['output'])
+
+    def test_limit_and_ties(self):
+        self.assertEqual(self.names('out', 1), self.names('out')[:1])
+        index = SearchIndex([('b', [('same', 1)]), ('a', [('same', 1)])])
+        self.assertEqual([name for score, name in index.search('same')], ['b', 'a'])
+
+    def test_empty(self):
+        self.assertEqual(self.names(''), [])
+        self.assertEqual(SearchIndex().search('anything'), [])
+
+    def test_pickle(self):
+        index = SearchIndex(self.entries)
+        copy = cPickle.loads(cPickle.dumps(index, 2))
+        self.assertEqual(copy.search('out'), index.search('out'))
+
+    def test_fromstate(self):
+        index = SearchIndex(self.entries)
+        state = marshal.loads(marshal.dumps(index.__getstate__(), 2))
+        self.assertEqual(SearchIndex.fromstate(state).search('out'), index.search('out'))
+        names, terms, offsets, ids, weights = state
+        bad = [None, 'garbage', state[:4], (names, terms, offsets, ids, weights[:-1]),
+               (names, terms[:-1], offsets, ids, weights), (names[:1], terms, offsets, ids, weights),
+               (names, terms, offsets, ids[:-1] + 'x', weights), ([1], terms, offsets, ids, weights)]
+        for state in bad:
+            self.assertEqual(SearchIndex.fromstate(state), None, repr(state))
+
+class SearchDocsTest(DocsTest):
+
+    def setUp(self):
+        DocsTest.setUp(self)
+        self.docs = self.docsfile()
+
+    def make_ui(self, **kw):
+        return make_ui([Option('size', 'Int'), Option('name', 'String'),
+                        Posarg('file', 'String', docs='The file to read.')],
+                       docsfiles=[self.docs], **kw)
+
+    def test_search_docs(self):
+        ui = self.make_ui()
+        # Docs from the docsfile are searched.
+        self.assertEqual([param.name for score, param in ui.search_docs('thing')], ['size', 'name'])
+        self.assertEqual([param.name for score, param in ui.search_docs('read')], ['file'])
+        self.assertEqual(ui.search_docs('thing', 1)[0][1].name, 'size')
+
+    def test_searchhelp(self):
+        ui = self.make_ui()
+        self.assertTrue('The size of the thing.' in ui.searchhelp('size'))
+        self.assertEqual(ui.searchhelp('nothing'), "Nothing matches 'nothing'.")
+
+    def test_cached(self):
+        cache = self.path('cache')
+        expected = self.make_ui(helpcache=cache).searchindex().search('thing')
+        self.assertTrue('prog-search.marshal' in os.listdir(cache))
+        ui = self.make_ui(helpcache=cache)
+        # A cached index does not need the docs.
+        ui._require_docs = None
+        self.assertEqual(ui.searchindex().search('thing'), expected)
+
+    def test_bad_cache_is_ignored(self):
+        cache = self.path('cache')
+        ui = self.make_ui(helpcache=cache)
+        expected = ui.searchindex().search('thing')
+        key = ui.specfingerprint('search')
+        # A pickle must not be loaded.
+        for data in ['garbage', marshal.dumps([1, 2]), "cos\nsystem\n(S'false'\ntR."]:
+            with open(os.path.join(cache, 'prog-search.marshal'), 'wb') as f:
+                f.write(key + '\n' + data)
+            self.assertEqual(self.make_ui(helpcache=cache).searchindex().search('thing'), expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""Tests for tui.prefetch().
+
+Run from the top directory with: python -m unittest discover tests
+"""
+import ConfigParser
+import unittest
+
+import tui
+
+from tui import (Option,
+                 Prefetch,
+                 prefetch)
+
+from test_tui import (TempDirTest,
+                      make_ui)
+
+DOCS = """\
+PARAMETER: size
+    The size of the thing.
+"""
+
+class PrefetchTest(TempDirTest):
+
+    def setUp(self):
+        TempDirTest.setUp(self)
+        self.docsfile = self.path('prog.docs')
+        with open(self.docsfile, 'w') as f:
+            f.write(DOCS)
+        self.config = self.configfile('size = 2\n')
+
+    def tearDown(self):
+        tui._prefetch = None
+        TempDirTest.tearDown(self)
+
+    def make_ui(self, **kw):
+        kw.setdefault('docsfiles', [self.docsfile])
+        kw.setdefault('configfiles', [self.config])
+        return make_ui([Option('size', 'Int', default=1)], **kw)
+
+    def test_take(self):
+        fetched = Prefetch([self.config, self.path('missing')])
+        self.assertEqual(fetched.take(self.config), '[prog]\nsize = 2\n')
+        self.assertEqual(fetched.take(self.path('missing')), None)
+        # Each path is taken once, and only prefetched paths can be taken.
+        self.assertRaises(KeyError, fetched.take, self.config)
+        self.assertRaises(KeyError, fetched.take, self.docsfile)
+
+    def test_prefetched_contents_are_used(self):
+        prefetch(command='prog', docsfiles=[self.docsfile], configfiles=[self.config], width=79)
+        tui._prefetch._thread.join()
+        # Later changes are not seen, the prefetched contents are used.
+        self.configfile('size = 3\n')
+        with open(self.docsfile, 'w') as f:
+            f.write(DOCS.replace('size of', 'width of'))
+        ui = self.make_ui()
+        ui.launch(['prog'])
+        self.assertEqual(ui['size'], 2)
+        self.assertEqual(ui.options['size'].docs, 'The size of the thing.')
+        self.assertEqual(tui._prefetch.contents, {})
+        # Once taken, files are read from disk.
+        ui = self.make_ui()
+        ui.launch(['prog'])
+        self.assertEqual(ui['size'], 3)
+
+    def test_missing_files(self):
+        missing = self.path('missing.conf')
+        prefetch(command='prog', docsfiles=[], configfiles=[missing], width=79)
+        ui = self.make_ui(configfiles=[missing])
+        ui.launch(['prog'])
+        self.assertEqual(ui['size'], 1)
+
+    def test_errors_name_the_file(self):
+        with open(self.config, 'w') as f:
+            f.write('size = 2\n')
+        prefetch(command='prog', docsfiles=[], configfiles=[self.config], width=79)
+        ui = self.make_ui(docsfiles=[])
+        try:
+            ui.launch(['prog'])
+        except ConfigParser.Error, e:
+            self.assertTrue(self.config in str(e), str(e))
+        else:
+            self.fail('ConfigParser.Error not raised')
+
+    def test_terminal_size(self):
+        self.assertEqual(prefetch(command='prog', docsfiles=[], configfiles=[], width=79).terminal_size, None)
+        tui._prefetch.terminal_size = (123, 45)
+        self.assertEqual(make_ui([], width=None).width, 123)
+
+if __name__ == '__main__':
+    unittest.main()
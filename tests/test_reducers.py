@@ -0,0 +1,124 @@
+"""Tests for tui.reducers.
+
+Run from the top directory with: python -m unittest discover tests
+"""
+import collections
+import os
+import shutil
+import tempfile
+import unittest
+
+from tui import (Option,
+                 reducers,
+                 tui)
+
+def launch(parameters, argv, config=None, **kw):
+    """Return a tui launched with argv and an optional configfile text."""
+    dir = tempfile.mkdtemp()
+    try:
+        configfiles = []
+        if config is not None:
+            configfiles.append(os.path.join(dir, 'prog.conf'))
+            with open(configfiles[0], 'w') as f:
+                f.write('[prog]\n' + config)
+        ui = tui(parameters, progname='prog', command='prog', configfiles=configfiles,
+                 docsfiles=[], launch=False, **kw)
+        for name in ui.basic_option_names.values():
+            ui.options[name].reset()
+        ui.launch(['prog'] + argv)
+        return ui
+    finally:
+        shutil.rmtree(dir)
+
+class GetReducerTest(unittest.TestCase):
+
+    def test_by_name(self):
+        self.assertTrue(isinstance(reducers.get_reducer('count'), reducers.Count))
+        self.assertTrue(isinstance(reducers.get_reducer('SET'), reducers.Set))
+
+    def test_by_class_and_instance(self):
+        self.assertTrue(isinstance(reducers.get_reducer(reducers.Sum), reducers.Sum))
+        last = reducers.Last(3)
+        self.assertTrue(reducers.get_reducer(last) is last)
+
+    def test_function(self):
+        reducer = reducers.get_reducer(lambda a, b: a * b)
+        self.assertTrue(isinstance(reducer, reducers.Function))
+        self.assertEqual(reducer(2, 3), 6)
+
+    def test_errors(self):
+        self.assertRaises(ValueError, reducers.get_reducer, 'nosuchreducer')
+        # Module globals that are not reducer classes.
+        self.assertRaises(ValueError, reducers.get_reducer, 'formats')
+        self.assertRaises(ValueError, reducers.get_reducer, 1)
+        self.assertRaises(ValueError, reducers.Last, 0)
+
+class ReducerTest(unittest.TestCase):
+
+    def test_count(self):
+        ui = launch([Option('verbose', 'Flag', 'v', reducer='count')], ['-v', '-v', '--verbose'])
+        self.assertEqual(ui['verbose'], 3)
+
+    def test_count_skips_false_flags(self):
+        ui = launch([Option('verbose', 'Flag', 'v', reducer='count')], ['-v'], 'verbose = no\n')
+        self.assertEqual(ui['verbose'], 1)
+
+    def test_set(self):
+        ui = launch([Option('tag', 'String', reducer='set')], ['--tag', 'b', '--tag', 'a', '--tag', 'b'])
+        self.assertEqual(ui['tag'], set(['a', 'b']))
+        self.assertEqual(ui.options['tag'].strvalue, 'a, b')
+
+    def test_sum(self):
+        ui = launch([Option('size', 'Int', reducer='sum')], ['--size', '2', '--size', '5'], 'size = 3\n')
+        self.assertEqual(ui['size'], 10)
+
+    def test_min_max(self):
+        argv = ['--low', '4', '--low', '2', '--high', '4', '--high', '2']
+        ui = launch([Option('low', 'Int', reducer='min'), Option('high', 'Int', reducer='max')], argv)
+        self.assertEqual(ui['low'], 2)
+        self.assertEqual(ui['high'], 4)
+
+    def test_min_without_values(self):
+        ui = launch([Option('low', 'Int', reducer='min')], [])
+        self.assertEqual(ui['low'], None)
+
+    def test_last(self):
+        argv = ['--cmd', 'a', '--cmd', 'b', '--cmd', 'c']
+        ui = launch([Option('cmd', 'String', reducer=reducers.Last(2))], argv)
+        self.assertEqual(ui['cmd'], collections.deque(['b', 'c'], 2))
+
+    def test_function(self):
+        ui = launch([Option('path', 'String', default='', reducer=lambda a, b: a + '/' + b)],
+                    ['--path', 'b'], 'path = a\n')
+        self.assertEqual(ui['path'], '/a/b')
+
+    def test_configfile_before_argv(self):
+        # parsestr() (configfiles) and parse() (argv) both feed the reducer.
+        ui = launch([Option('tag', 'String', recurring=True)], ['--tag', 'b'], 'tag = a\n')
+        self.assertEqual(ui['tag'], ['a', 'b'])
+
+    def test_fresh_default_per_resolve(self):
+        # The accumulated value must not be shared with the default.
+        option = Option('tag', 'String', default=['x'], recurring=True)
+        ui = launch([option], ['--tag', 'a'])
+        self.assertEqual(ui['tag'], ['x', 'a'])
+        self.assertEqual(option.default, ['x'])
+        option.reset()
+        self.assertEqual(option.value, ['x'])
+
+    def test_other_defaults(self):
+        # Only lists and tuples are copied into a list.
+        option = Option('tag', 'String', recurring=True, default=None)
+        self.assertEqual(option.value, None)
+        self.assertEqual(Option('tag', 'String', recurring=True, default='ab').value, 'ab')
+        self.assertEqual(Option('tag', 'String', recurring=True, default=('a',)).value, ['a'])
+        self.assertEqual(Option('tag', 'String', recurring=True).value, [])
+
+    def test_deferrable(self):
+        self.assertTrue(Option('a', 'String', recurring=True).deferrable)
+        self.assertTrue(Option('a', 'String').deferrable)
+        self.assertFalse(Option('a', 'Flag', reducer='count').deferrable)
+        self.assertFalse(Option('a', 'String', reducer='set').deferrable)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""Tests for tui.server.
+
+Run from the top directory with: python -m unittest discover tests
+"""
+import cPickle
+import os
+import socket
+import threading
+import unittest
+
+from tui import (Option,
+                 reducers,
+                 server)
+
+from test_tui import (TempDirTest,
+                      make_ui)
+
+class ServerTest(TempDirTest):
+
+    def setUp(self):
+        TempDirTest.setUp(self)
+        self.socketpath = self.path('prog.sock')
+        self.built = 0
+        self.server = server.Server(self.make_ui, self.socketpath)
+
+    def tearDown(self):
+        self.server.close()
+        TempDirTest.tearDown(self)
+
+    def make_ui(self):
+        self.built += 1
+        return make_ui([Option('size', 'Int', 's', default=1)], configfiles=[self.path('prog.conf')])
+
+    def request(self, argv):
+        """Answer a request on a server thread while sending it with argv."""
+        thread = threading.Thread(target=self.server.handle_request)
+        thread.daemon = True
+        thread.start()
+        try:
+            return server.request(self.socketpath, argv, env={}, cwd=self.dir, width=60, timeout=10)
+        finally:
+            thread.join(10)
+
+    def test_round_trip(self):
+        reply = self.request(['prog', '-s', '2'])
+        self.assertEqual((reply['status'], reply['values']['size']), (None, 2))
+        reply = self.request(['prog'])
+        self.assertEqual(reply['values']['size'], 1)
+        reply = self.request(['prog', '--help'])
+        self.assertEqual(reply['status'], 0)
+        self.assertTrue('--size' in reply['stdout'], reply['stdout'])
+        reply = self.request(['prog', '-s', 'big'])
+        self.assertEqual((reply['status'], reply['values']), (1, None))
+        self.assertTrue('big' in reply['stderr'], reply['stderr'])
+
+    def test_configfile_changes(self):
+        self.configfile('size = 3\n')
+        self.assertEqual(self.request(['prog'])['values']['size'], 3)
+        self.configfile('size = 4\n')
+        os.utime(self.path('prog.conf'), (1, 1))
+        self.assertEqual(self.request(['prog'])['values']['size'], 4)
+        self.assertEqual(self.built, 1)
+
+    def test_client(self):
+        thread = threading.Thread(target=self.server.handle_request)
+        thread.daemon = True
+        thread.start()
+        self.assertEqual(server.client(self.socketpath, ['prog', '-s', '5'])['size'], 5)
+        thread.join(10)
+        self.assertEqual(server.client(self.path('nothing.sock'), ['prog']), None)
+
+    def test_live_socket_is_kept(self):
+        # The probe only connects, so the live server sees an empty request.
+        thread = threading.Thread(target=self.server.handle_request)
+        thread.daemon = True
+        thread.start()
+        self.assertRaises(ValueError, server.Server, self.make_ui, self.socketpath)
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(os.path.exists(self.socketpath))
+
+    def test_stale_socket_is_removed(self):
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.path('stale.sock'))
+        stale.close()
+        server.Server(self.make_ui, self.path('stale.sock')).close()
+        self.assertFalse(os.path.exists(self.path('stale.sock')))
+
+    def test_other_files_are_kept(self):
+        open(self.path('file.sock'), 'w').close()
+        self.assertRaises(ValueError, server.Server, self.make_ui, self.path('file.sock'))
+        self.assertTrue(os.path.exists(self.path('file.sock')))
+
+    def test_unmarshallable_values(self):
+        path = self.path('last.sock')
+        last = server.Server(lambda: make_ui([Option('recent', 'String', reducer=reducers.Last(2))]), path)
+        try:
+            reply = server._load_reply(last.handle(dict(argv=['prog', '--recent', 'a'])))
+        finally:
+            last.close()
+        self.assertEqual((reply['status'], reply['values']), (1, None))
+        self.assertTrue('can not be marshalled' in reply['stderr'], reply['stderr'])
+
+class ClientTest(TempDirTest):
+    """Clients only trust sockets of their own user that answer like a server."""
+
+    def answer(self, data):
+        """Listen on a socket, and answer a request with data on a thread."""
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path('other.sock'))
+        listener.listen(1)
+        def answer():
+            connection = listener.accept()[0]
+            server._receive(connection)
+            connection.sendall(data)
+            connection.close()
+            listener.close()
+        thread = threading.Thread(target=answer)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def test_other_programs(self):
+        for data in ['', 'not marshal', cPickle.dumps(dict(stdout='', stderr='', status=None, values={}), 2),
+                     server.marshal.dumps(dict(stdout=1, stderr='', status=None, values={}))]:
+            thread = self.answer(data)
+            self.assertEqual(server.client(self.path('other.sock'), ['prog']), None)
+            thread.join(10)
+            os.unlink(self.path('other.sock'))
+
+    def test_not_a_socket(self):
+        open(self.path('file.sock'), 'w').close()
+        self.assertEqual(server.client(self.path('file.sock'), ['prog']), None)
+
+    @unittest.skipIf(os.getuid() != 0, 'needs root to chown the socket')
+    def test_other_users(self):
+        thread = self.answer(server.marshal.dumps(dict(stdout='', stderr='', status=None, values={})))
+        os.chown(self.path('other.sock'), 1, -1)
+        self.assertEqual(server.client(self.path('other.sock'), ['prog']), None)
+        os.chown(self.path('other.sock'), os.getuid(), -1)
+        self.assertEqual(server.client(self.path('other.sock'), ['prog']), {})
+        thread.join(10)
+
+if __name__ == '__main__':
+    unittest.main()
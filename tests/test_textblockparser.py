@@ -0,0 +1,156 @@
+"""Tests for tui.textblockparser.
+
+Run from the top directory with: python -m unittest discover tests
+"""
+import cStringIO
+import unittest
+
+from tui import DocParser
+from tui.textblockparser import (CompactIndentedParagraphs,
+                                 CompactSingleParagraph,
+                                 IndentedParagraphs,
+                                 ParseError,
+                                 SingleParagraph,
+                                 TextBlockParser,
+                                 TextBuffer,
+                                 UnescapedHashDecommenter)
+
+def parse(text, parser=None):
+    parser = parser or DocParser()
+    parser.parse(cStringIO.StringIO(text), 'test.docs')
+    return parser
+
+class DecommenterTest(unittest.TestCase):
+
+    cases = [('', ''),
+             ('no comment', 'no comment'),
+             ('# all comment', None),
+             ('text # comment', 'text '),
+             ('\\# hash', '# hash'),
+             ('\\\\# comment', '\\'),
+             ('\\\\\\# hash', '\\# hash'),
+             ('a\\b', 'a\\b'),
+             ('a \\# b # c', 'a # b ')]
+
+    def test_cases(self):
+        decomment = UnescapedHashDecommenter().decomment
+        for line, expected in self.cases:
+            self.assertEqual(decomment(line), expected, repr(line))
+
+class TextBlockParserTest(unittest.TestCase):
+
+    def test_blocks(self):
+        parser = parse('TITLE:\n    Prog\n'
+                       'PARAMETER: size\n    The size\n    in bytes.\n'
+                       'FILE: a.conf\n    First.\n\n    Second.\n')
+        self.assertEqual(parser['title'], ['Prog'])
+        self.assertEqual(parser['parameters'], {'size': ['The size in bytes.']})
+        self.assertEqual(parser['files'], {'a.conf': ['    First.', '', '    Second.']})
+
+    def test_tag_line_whitespace(self):
+        parser = parse('  PARAMETER  :  size  \n    Docs.\n')
+        self.assertEqual(parser['parameters'], {'size': ['Docs.']})
+
+    def test_longest_tag_wins(self):
+        parser = TextBlockParser(untagged=None)
+        parser.addblock('a', SingleParagraph, tag='A')
+        parser.addblock('ab', SingleParagraph, tag='AB')
+        parse('AB:\n    text\n', parser)
+        self.assertEqual(parser['ab'], ['text'])
+        self.assertEqual(parser['a'], [''])
+
+    def test_tag_without_colon_is_text(self):
+        parser = parse('GENERAL:\n    PARAMETER size\n')
+        self.assertEqual(parser['general'], ['    PARAMETER size'])
+        self.assertEqual(parser['parameters'], {})
+
+    def test_commented_tag_line(self):
+        parser = parse('GENERAL:\n    text\n# PARAMETER: size\n')
+        self.assertEqual(parser['parameters'], {})
+
+    def test_tabs(self):
+        parser = TextBlockParser(untagged=None)
+        parser.addblock('general', IndentedParagraphs)
+        parse('GENERAL:\n\tone\n\ttwo\n', parser)
+        self.assertEqual(parser['general'], ['    one two'])
+
+    def test_default_names(self):
+        parser = TextBlockParser(blocks={'general': IndentedParagraphs()})
+        self.assertEqual(parser.names, {'GENERAL': 'general'})
+        parse('GENERAL:\n    text\n', parser)
+        self.assertEqual(parser['general'], ['    text'])
+
+    def assertParseError(self, text, line_number):
+        try:
+            parse(text)
+        except ParseError, e:
+            self.assertTrue(("'test.docs':%d]" % line_number) in str(e), str(e))
+        else:
+            self.fail('no ParseError')
+
+    def test_errors_give_line_numbers(self):
+        self.assertParseError('\ngarbage\n', 2)
+        self.assertParseError('TITLE:\n    Prog\nPARAMETER:\n', 3)
+        self.assertParseError('TITLE: label\n', 1)
+
+class TextBufferTest(unittest.TestCase):
+
+    def test_join_packed_and_unpacked(self):
+        buffer = TextBuffer()
+        for line in ['a', 'b', '']:
+            buffer.append(line)
+        buffer.pack()
+        buffer.append('c')
+        self.assertEqual(len(buffer), 4)
+        self.assertEqual(buffer.join(0, 2), 'a b')
+        self.assertEqual(buffer.join(2, 3), '')
+        self.assertEqual(buffer.join(1, 4, '|'), 'b||c')
+        self.assertEqual(buffer.join(3, 4), 'c')
+        buffer.pack()
+        self.assertEqual(buffer.join(1, 4, '|'), 'b||c')
+
+class CompactBlockTest(unittest.TestCase):
+
+    lines = ['', 'first line', '  continued', '', '    indented', '    same indent',
+             '  \\', 'kept \\', '    new paragraph', '\ttab', '', '', 'last   ']
+
+    def feed(self, block, lines, pack=False):
+        block.startblock()
+        for line in lines:
+            block.addline(line)
+        if pack and hasattr(block, 'buffer'):
+            block.buffer.pack()
+        return block.text()
+
+    def test_same_text_as_plain_blocks(self):
+        pairs = [(SingleParagraph, CompactSingleParagraph),
+                 (IndentedParagraphs, CompactIndentedParagraphs)]
+        for plain, compact in pairs:
+            for n in range(len(self.lines) + 1):
+                lines = self.lines[:n]
+                expected = self.feed(plain(), lines)
+                self.assertEqual(self.feed(compact(), lines), expected, (compact, lines))
+                self.assertEqual(self.feed(compact(), lines, True), expected, (compact, lines))
+
+    def test_shared_buffer(self):
+        # Paragraphs are not continued over lines that other blocks added.
+        buffer = TextBuffer()
+        a = CompactSingleParagraph(buffer=buffer)
+        b = CompactSingleParagraph(buffer=buffer)
+        a.addline('a1')
+        b.addline('b1')
+        a.addline('a2')
+        buffer.pack()
+        b.addline('b2')
+        self.assertEqual(a.text(), ['a1 a2'])
+        self.assertEqual(b.text(), ['b1 b2'])
+        self.assertEqual(len(a), 2)
+
+    def test_repeated_blocks(self):
+        # Labelled blocks that turn up again continue where they left off.
+        parser = parse('PARAMETER: size\n    One.\nPARAMETER: name\n    Name.\n'
+                       'PARAMETER: size\n    Two.\n')
+        self.assertEqual(parser['parameters'], {'size': ['One. Two.'], 'name': ['Name.']})
+
+if __name__ == '__main__':
+    unittest.main()
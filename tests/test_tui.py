@@ -0,0 +1,453 @@
+"""Tests for parsing and resolving settings in tui.
+
+Run from the top directory with: python -m unittest discover tests
+"""
+import cStringIO
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from tui import (Option,
+                 ParseError,
+                 Posarg,
+                 Settings,
+                 StrictConfigParser,
+                 formats,
+                 get_metainfo,
+                 tui)
+
+def make_ui(parameters, **kw):
+    """Return a tui without docsfiles or configfiles, that is not launched."""
+    kw.setdefault('configfiles', [])
+    kw.setdefault('docsfiles', [])
+    kw.setdefault('width', 79)
+    ui = tui(parameters, progname='prog', command='prog', launch=False, **kw)
+    # The default help and version options are shared by all tuis.
+    for name in ui.basic_option_names.values():
+        ui.options[name].reset()
+    return ui
+
+class Captured(object):
+    """Capture stdout and stderr, and the exit status of sys.exit()."""
+
+    def __init__(self, function, *args, **kw):
+        self.status = None
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = cStringIO.StringIO(), cStringIO.StringIO()
+        try:
+            self.result = function(*args, **kw)
+        except SystemExit, e:
+            self.status = e.code or 0
+        finally:
+            self.stdout = sys.stdout.getvalue()
+            self.stderr = sys.stderr.getvalue()
+            sys.stdout, sys.stderr = stdout, stderr
+
+class Counting(formats.Format):
+    """Takes arguments up to the next option, and counts conversions."""
+    nargs = None
+    conversions = 0
+
+    def parse(self, argv):
+        Counting.conversions += 1
+        values = []
+        while argv and not argv[0].startswith('-'):
+            values.append(argv.pop(0))
+        return values
+
+    def parsestr(self, argstr):
+        return self.parse(formats.split_args(argstr))
+
+class TempDirTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def configfile(self, text, name='prog.conf'):
+        with open(self.path(name), 'w') as f:
+            f.write('[prog]\n' + text)
+        return self.path(name)
+
+class DeferredTest(TempDirTest):
+
+    def test_only_winners_are_converted(self):
+        config = self.configfile('outdir = %s\n' % self.path('config'))
+        ui = make_ui([Option('outdir', formats.WritableDir)], configfiles=[config], deferred=True)
+        ui.launch(['prog', '--outdir', self.path('argv')])
+        self.assertEqual(ui['outdir'], self.path('argv'))
+        self.assertTrue(os.path.isdir(self.path('argv')))
+        self.assertFalse(os.path.exists(self.path('config')))
+
+    def test_eager_converts_everything(self):
+        config = self.configfile('outdir = %s\n' % self.path('config'))
+        ui = make_ui([Option('outdir', formats.WritableDir)], configfiles=[config])
+        ui.launch(['prog', '--outdir', self.path('argv')])
+        self.assertTrue(os.path.isdir(self.path('config')))
+
+    def test_recurring_gets_all_layers(self):
+        config = self.configfile('tag = a\n')
+        ui = make_ui([Option('tag', 'String', recurring=True)], configfiles=[config], deferred=True)
+        ui.launch(['prog', '--tag', 'b', '--tag', 'c'])
+        self.assertEqual(ui['tag'], ['a', 'b', 'c'])
+
+    def test_help_works_with_bad_values(self):
+        # Whatever the dict order of the options, help is resolved first.
+        names = [chr(c) * 3 for c in range(ord('a'), ord('z') + 1)]
+        config = self.configfile(''.join('%s = bad\n' % name for name in names))
+        ui = make_ui([Option(name, 'Int') for name in names], configfiles=[config], deferred=True)
+        captured = Captured(ui.launch, ['prog', '--help'])
+        self.assertEqual(captured.status, 0)
+        self.assertTrue('USAGE: prog' in captured.stdout, captured.stdout)
+
+    def test_resolve_keeps_going(self):
+        config = self.configfile('zeta = bad\nalpha = bad\ngood = 3\n')
+        ui = make_ui([Option('zeta', 'Int'), Option('good', 'Int'), Option('alpha', 'Int')],
+                     configfiles=[config], deferred=True)
+        ui.parse_files()
+        ui.parse_argv(['prog'])
+        try:
+            ui.resolve()
+        except ParseError, e:
+            # The first one in option order.
+            self.assertTrue('zeta' in str(e), str(e))
+        else:
+            self.fail('no ParseError')
+        self.assertEqual(ui['good'], 3)
+
+class LazyTest(TempDirTest):
+
+    def make_ui(self, text, **kw):
+        Counting.conversions = 0
+        config = self.configfile(text)
+        return make_ui([Option('noise', 'Int'), Option('words', Counting, recurring=True)],
+                       configfiles=[config], lazy=True, **kw)
+
+    def test_converted_on_first_access(self):
+        ui = self.make_ui('words = a b\n')
+        ui.launch(['prog'])
+        self.assertEqual(Counting.conversions, 0)
+        self.assertEqual(ui['words'], [['a', 'b']])
+        self.assertEqual(ui['words'], [['a', 'b']])
+        self.assertEqual(Counting.conversions, 1)
+
+    def test_dict_converts(self):
+        ui = self.make_ui('noise = 3\n')
+        ui.launch(['prog'])
+        self.assertEqual(ui.dict()['noise'], 3)
+
+    def test_errors_on_access(self):
+        ui = self.make_ui('noise = bad\n')
+        ui.launch(['prog'])
+        self.assertRaises(ParseError, ui.__getitem__, 'noise')
+        # Still bad the next time.
+        self.assertRaises(ParseError, ui.__getitem__, 'noise')
+        self.assertRaises(ParseError, ui.validate_all)
+
+    def test_help_with_bad_values(self):
+        ui = self.make_ui('noise = bad\n')
+        captured = Captured(ui.launch, ['prog', '--help'])
+        self.assertEqual(captured.status, 0)
+        self.assertTrue('USAGE: prog' in captured.stdout, captured.stdout)
+        self.assertTrue('Int(bad)' in captured.stdout, captured.stdout)
+
+    def test_settings_with_bad_values(self):
+        ui = self.make_ui('noise = bad\n')
+        captured = Captured(ui.launch, ['prog', '--settings'])
+        self.assertTrue('noise' in str(captured.status), captured.status)
+
+class TakeTest(unittest.TestCase):
+
+    def setUp(self):
+        Counting.conversions = 0
+
+    def test_variable_nargs_converted_once(self):
+        for deferred in [False, True]:
+            Counting.conversions = 0
+            ui = make_ui([Option('words', Counting), Option('quiet', 'Flag', 'q')], deferred=deferred)
+            ui.launch(['prog', '--words', 'a', 'b', '-q'])
+            self.assertEqual(ui['words'], ['a', 'b'])
+            self.assertTrue(ui['quiet'])
+            self.assertEqual(Counting.conversions, 1, 'deferred=%s' % deferred)
+
+class LayersTest(TempDirTest):
+
+    def literals(self, **kw):
+        config = self.configfile('tag = a\n')
+        ui = make_ui([Option('tag', 'String', recurring=True)], configfiles=[config], **kw)
+        ui.launch(['prog', '--tag', 'b'])
+        self.assertEqual(ui['tag'], ['a', 'b'])
+        return sum(len(literals) for origin, literals in ui.layers)
+
+    def test_eager_keeps_no_literals(self):
+        self.assertEqual(self.literals(), 0)
+
+    def test_deferred_and_reloadable_keep_literals(self):
+        self.assertEqual(self.literals(deferred=True), 2)
+        self.assertEqual(self.literals(reloadable=True), 2)
+
+    def test_reload_needs_literals(self):
+        ui = make_ui([Option('tag', 'String')])
+        ui.launch(['prog'])
+        self.assertRaises(ValueError, ui.reload)
+
+class ReloadTest(TempDirTest):
+
+    def make_ui(self, text):
+        config = self.configfile(text)
+        ui = make_ui([Option('size', 'Int', 's', default=1),
+                      Option('name', 'String', default='a'),
+                      Option('total', 'Int', reducer='sum')], configfiles=[config], reloadable=True)
+        ui.launch(['prog'])
+        return ui
+
+    def rewrite(self, text):
+        self.configfile(text)
+        os.utime(self.path('prog.conf'), (1, 1))
+
+    def test_changed_values(self):
+        ui = self.make_ui('size = 2\nname = b\n')
+        self.assertEqual(ui.reload(), {})
+        self.rewrite('size = 3\nname = b\n')
+        self.assertEqual(ui.reload(), dict(size=(2, 3)))
+        self.assertEqual((ui['size'], ui['name']), (3, 'b'))
+        self.assertEqual(ui.reload(), {})
+
+    def test_command_line_wins(self):
+        config = self.configfile('size = 2\n')
+        ui = make_ui([Option('size', 'Int', 's', default=1)], configfiles=[config], reloadable=True)
+        ui.launch(['prog', '-s', '5'])
+        self.rewrite('size = 3\n')
+        self.assertEqual(ui.reload(), {})
+        self.assertEqual(ui['size'], 5)
+
+    def test_removed_values(self):
+        ui = self.make_ui('size = 2\n')
+        self.rewrite('')
+        self.assertEqual(ui.reload(), dict(size=(2, 1)))
+
+    def test_parse_error_changes_nothing(self):
+        ui = self.make_ui('size = 2\nname = b\n')
+        self.rewrite('size = big\nname = c\n')
+        self.assertRaises(ParseError, ui.reload)
+        self.assertEqual((ui['size'], ui['name']), (2, 'b'))
+        self.assertEqual(ui.options['size'].location, ui.options['name'].location)
+        # The file is tried again next time.
+        self.rewrite('size = 3\nname = b\n')
+        self.assertEqual(ui.reload(), dict(size=(2, 3)))
+
+    def test_skipped(self):
+        ui = self.make_ui('total = 2\n')
+        self.assertEqual(ui['total'], 2)
+        self.rewrite('total = 3\nsize = 2\n')
+        changes = ui.reload()
+        self.assertEqual(changes, dict(size=(1, 2)))
+        self.assertEqual(changes.skipped, ['total'])
+        self.assertEqual(ui['total'], 2)
+        self.assertEqual(ui.reload().skipped, [])
+
+    def test_save_and_restore(self):
+        option = Option('tag', 'String', recurring=True)
+        option.parsestr('a', 'tag', 'here')
+        state = option.save()
+        option.parsestr('b', 'tag', 'there')
+        self.assertEqual((option.value, option.location), (['a', 'b'], 'there'))
+        for i in range(2):
+            option.restore(state)
+            self.assertEqual((option.value, option.location), (['a'], 'here'))
+            option.parsestr('c', 'tag', 'there')
+        option.resolve([('tag', 'd', 'tag', 'lazy')], lazy=True)
+        state = option.save()
+        option.reset()
+        option.restore(state)
+        self.assertEqual((option.value, option.location), (['d'], 'lazy'))
+
+class ParametersTest(unittest.TestCase):
+
+    def make_ui(self):
+        return make_ui([Option('size', 'Int', 's', default=1),
+                        Posarg('first', 'String'),
+                        Posarg('second', 'String', optional=True)])
+
+    def test_getparam(self):
+        ui = self.make_ui()
+        size, first, second = ui.options['size'], ui.positional_args[0], ui.positional_args[1]
+        self.assertTrue(ui.getparam('size') is size)
+        self.assertTrue(ui.getparam('-s') is size)
+        self.assertTrue(ui.getparam('first') is first)
+        self.assertTrue(ui.getparam(0) is first)
+        self.assertTrue(ui.getparam(1) is second)
+        for key in [2, -1, '-x', 'missing', None, ['size']]:
+            self.assertRaises(KeyError, ui.getparam, key)
+
+    def test_frozen_keys_match_getparam(self):
+        ui = self.make_ui()
+        ui.launch(['prog', 'a', 'b'])
+        ui.freeze()
+        self.assertEqual((ui[0], ui[1], ui['-s']), ('a', 'b', 1))
+        self.assertRaises(KeyError, ui.__getitem__, -1)
+
+    def test_order(self):
+        ui = self.make_ui()
+        ui.launch(['prog', 'a', 'b'])
+        keys = ui.keys()
+        self.assertEqual(keys, ui.options.keys() + ['first', 'second'])
+        self.assertEqual(ui.values(), [ui.getparam(key).value for key in keys])
+        self.assertEqual(ui.items(), zip(keys, ui.values()))
+        self.assertEqual(list(ui), keys)
+        self.assertEqual(ui.freeze().keys(), keys)
+
+    def test_contains(self):
+        ui = self.make_ui()
+        self.assertTrue('size' in ui)
+        self.assertTrue('first' in ui)
+        self.assertFalse('-s' in ui)
+        self.assertFalse(0 in ui)
+
+    def test_name_clashes(self):
+        ui = self.make_ui()
+        self.assertRaises(ValueError, ui._add_positional_argument, Posarg('first', 'String', optional=True))
+        self.assertRaises(ValueError, ui._add_positional_argument, Posarg('size', 'String', optional=True))
+        self.assertRaises(ValueError, ui._add_option, Option('first', 'String'))
+        self.assertRaises(ValueError, make_ui, [Posarg('file', 'String'), Posarg('file', 'String')])
+
+class SettingsTest(unittest.TestCase):
+
+    def settings(self):
+        return Settings([('size', 1), ('name', 'a'), ('file', 'x')], [('-s', 'size'), (0, 'file')])
+
+    def test_lookup(self):
+        settings = self.settings()
+        self.assertEqual((settings['size'], settings['-s'], settings[0]), (1, 1, 'x'))
+        self.assertEqual((settings.get('-s'), settings.get('missing'), settings.get(1, 2)), (1, None, 2))
+        self.assertRaises(KeyError, settings.__getitem__, 'missing')
+
+    def test_mapping(self):
+        settings = self.settings()
+        self.assertEqual(list(settings), ['size', 'name', 'file'])
+        self.assertEqual(settings.keys(), list(settings.iterkeys()))
+        self.assertEqual(settings.values(), [1, 'a', 'x'])
+        self.assertEqual(settings.values(), list(settings.itervalues()))
+        self.assertEqual(settings.items(), list(settings.iteritems()))
+        self.assertEqual(len(settings), 3)
+        # Aliases are not keys.
+        self.assertTrue('size' in settings)
+        for key in ['-s', 0, 'missing']:
+            self.assertFalse(key in settings, key)
+
+    def test_equality(self):
+        settings = self.settings()
+        self.assertEqual(settings, self.settings())
+        self.assertEqual(settings, dict(size=1, name='a', file='x'))
+        self.assertFalse(settings != dict(size=1, name='a', file='x'))
+        self.assertNotEqual(settings, dict(size=1))
+        self.assertNotEqual(settings, settings.replace({'size': 2}))
+        self.assertNotEqual(settings, [('size', 1), ('name', 'a'), ('file', 'x')])
+        self.assertRaises(TypeError, hash, settings)
+
+    def test_replace(self):
+        settings = self.settings()
+        new = settings.replace({'size': 2, 0: 'y'})
+        self.assertEqual(new.items(), [('size', 2), ('name', 'a'), ('file', 'y')])
+        self.assertEqual((new['-s'], new[0]), (2, 'y'))
+        self.assertEqual(settings.items(), [('size', 1), ('name', 'a'), ('file', 'x')])
+        self.assertEqual(settings.replace([('name', 'b')])['name'], 'b')
+        self.assertRaises(KeyError, settings.replace, {'missing': 1})
+
+    def test_empty(self):
+        settings = Settings([])
+        self.assertEqual((settings.items(), len(settings)), ([], 0))
+        self.assertEqual(settings, {})
+
+    def test_frozen_tui(self):
+        ui = make_ui([Option('size', 'Int', 's', default=1), Posarg('file', 'String')])
+        ui.launch(['prog', 'x'])
+        settings = ui.freeze()
+        self.assertEqual(settings, ui.dict())
+        self.assertEqual((ui['size'], ui['-s'], ui[0], ui['file']), (1, 1, 'x', 'x'))
+        self.assertRaises(KeyError, ui.__getitem__, 'missing')
+        ui['-s'] = 2
+        self.assertEqual((ui['size'], ui.dict()['size']), (2, 2))
+        # Earlier snapshots are never modified.
+        self.assertEqual(settings['size'], 1)
+
+class MetainfoTest(TempDirTest):
+
+    docstring = """prog
+    
+    Does things.
+    Author: Some One
+    Website: http://example.com/
+    More description.
+    """
+
+    expected = dict(progname='prog', description='Does things.',
+                    author='Some One', website='http://example.com/')
+
+    def test_docstring(self):
+        self.assertEqual(get_metainfo(self.docstring), self.expected)
+
+    def test_first_line_pattern(self):
+        self.assertEqual(get_metainfo('prog v1.2\nDoes things.\n', first_line_pattern=r'^(?P<progname>\S+)(\s+v(?P<version>\S+))?'),
+                         dict(progname='prog', version='1.2', description='Does things.'))
+
+    def test_module(self):
+        self.assertEqual(get_metainfo(sys.modules[__name__]),
+                         dict(progname='Tests for parsing and resolving settings in tui.',
+                              description='Run from the top directory with: python -m unittest discover tests'))
+
+    def test_script_file(self):
+        with open(self.path('script.py'), 'w') as f:
+            f.write('#!/usr/bin/env python\n"""\n%s"""\nimport sys\n' % self.docstring)
+        self.assertEqual(get_metainfo(self.path('script.py')), self.expected)
+
+    def test_template_with_other_groups(self):
+        # An unnamed group, and a named group that each keyword pattern repeats.
+        template = r'^\s*(%(pretty)s)(?P<sep>:|=)\s*(?P<%(keyword)s>\S.+?)\s*$'
+        docstring = 'prog\nDoes things.\nAuthor= Some One\nWebsite: http://example.com/\n'
+        self.assertEqual(get_metainfo(docstring, keyword_pattern_template=template),
+                         dict(progname='prog', description='Does things.',
+                              author='Some One', website='http://example.com/'))
+
+    def test_special(self):
+        import re
+        special = dict(author=re.compile(r'^By (?P<author>.+)$'))
+        self.assertEqual(get_metainfo('prog\nBy Some One\nDoes things.\n', special=special),
+                         dict(progname='prog', author='Some One', description='Does things.'))
+
+class ImportTest(unittest.TestCase):
+
+    # Only imported by the code that needs them, see the top of tui/__init__.py.
+    lazy = ['ConfigParser', 'cPickle', 'collections', 'fcntl', 'hashlib', 'heapq', 'shlex',
+            'struct', 'subprocess', 'termios', 'textwrap']
+
+    def test_lazy_modules(self):
+        code = 'import sys, tui; print " ".join(sorted(set(sys.modules) & set(%r)))' % self.lazy
+        process = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE,
+                                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        stdout, stderr = process.communicate()
+        self.assertEqual(process.returncode, 0)
+        self.assertEqual(stdout.split(), [])
+
+    def test_strict_config_parser(self):
+        import ConfigParser
+        class Parser(StrictConfigParser):
+            pass
+        parser = Parser()
+        self.assertTrue(isinstance(parser, StrictConfigParser))
+        self.assertTrue(isinstance(parser, ConfigParser.SafeConfigParser))
+        self.assertTrue(issubclass(StrictConfigParser, ConfigParser.SafeConfigParser))
+        parser.readfp(cStringIO.StringIO('[prog]\nName = a\nother = %(Name)s\n'))
+        self.assertEqual(parser.get('prog', 'other'), 'a')
+        self.assertEqual(parser.unusedoptions(['prog']), ['other'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""Tests for tui.watch.
+
+Run from the top directory with: python -m unittest discover tests
+"""
+import os
+import threading
+import unittest
+
+from tui import (Option,
+                 ParseError,
+                 watch)
+
+from test_tui import (TempDirTest,
+                      make_ui)
+
+class WatcherTest(TempDirTest):
+
+    def setUp(self):
+        TempDirTest.setUp(self)
+        self.mtime = 1
+        self.config = self.configfile('first = 0\nsecond = 0\n')
+        self.ui = make_ui([Option('first', 'Int', default=0),
+                           Option('second', 'Int', default=0)], configfiles=[self.config], reloadable=True)
+        self.ui.launch(['prog'])
+        self.errors = []
+
+    def rewrite(self, text):
+        self.configfile(text)
+        # Distinct mtimes, however quickly the file is rewritten.
+        self.mtime += 1
+        os.utime(self.config, (self.mtime, self.mtime))
+
+    def test_check(self):
+        calls = []
+        watcher = watch.Watcher(self.ui, [calls.append])
+        self.assertEqual(watcher.check(), {})
+        self.rewrite('first = 1\nsecond = 0\n')
+        self.assertEqual(watcher.check(), dict(first=(0, 1)))
+        self.assertEqual(calls, [dict(first=(0, 1))])
+        self.assertEqual(self.ui['first'], 1)
+
+    def test_failed_files_are_not_retried(self):
+        watcher = watch.Watcher(self.ui, errback=self.errors.append)
+        self.rewrite('first = bad\n')
+        for i in range(3):
+            self.assertEqual(watcher.check(), {})
+        self.assertEqual(len(self.errors), 1)
+        self.assertTrue(isinstance(self.errors[0], ParseError))
+        # Explicitly given files are always read.
+        watcher.check([self.config])
+        self.assertEqual(len(self.errors), 2)
+        self.rewrite('first = 2\nsecond = 0\n')
+        self.assertEqual(watcher.check(), dict(first=(0, 2)))
+
+    def test_freeze(self):
+        watch.Watcher(self.ui, freeze=False)
+        self.assertEqual(self.ui._snapshot, None)
+        watch.Watcher(self.ui)
+        self.assertNotEqual(self.ui._snapshot, None)
+
+    def test_lazy_freeze_raises(self):
+        config = self.configfile('first = bad\n')
+        ui = make_ui([Option('first', 'Int')], configfiles=[config], reloadable=True, lazy=True)
+        ui.launch(['prog'])
+        self.assertRaises(ParseError, watch.Watcher, ui)
+        watch.Watcher(ui, freeze=False)
+
+    def test_snapshots_are_atomic(self):
+        # Readers must never see values from two different reloads.
+        watcher = watch.Watcher(self.ui)
+        stop = threading.Event()
+        seen = []
+        def read():
+            while not stop.is_set():
+                settings = self.ui.dict()
+                seen.append((settings['first'], settings['second']))
+        readers = [threading.Thread(target=read) for i in range(3)]
+        for thread in readers:
+            thread.daemon = True
+            thread.start()
+        try:
+            for i in range(1, 50):
+                self.rewrite('first = %d\nsecond = %d\n' % (i, i))
+                self.assertEqual(watcher.check(), dict(first=(i - 1, i), second=(i - 1, i)))
+        finally:
+            stop.set()
+            for thread in readers:
+                thread.join(10)
+        self.assertTrue(seen)
+        self.assertEqual([(first, second) for first, second in seen if first != second], [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -178,7 +178,8 @@ with keys 'author', 'command', 'contact', 'copyright', 'description',
 'download', 'progname', 'version' and 'website'. 
 
 The docstring needs to be multiline and the closing quotes need to be first 
-on a line, optionally preceded by whitespace. 
+on a line, optionally preceded by whitespace. You can also pass __doc__ or the
+script module instead of __file__, which saves reading the script file again.
 
 Command is assumed to be os.path.basename(scriptfile) with any trailing .py*
 filename extension removed.
@@ -293,26 +294,40 @@ __all__ = ['BadAbbreviationBlock',
            'PositionalArgument',
            'PositionalArgumentError',
            'ReservedOptionError',
+           'Settings',
            'StandardHelpOption',
            'StandardLongHelpOption',
            'StandardSettingsOption',
            'StandardVersionOption',
+           'completion',
+           'fastwrap',
            'formats',
+           'generate',
+           'prefetch',
+           'reducers',
+           'server',
            'tui',
-           'textblockparser']
-
-import ConfigParser
-import fcntl
+           'textblockparser',
+           'watch']
+
+# Modules that are only needed by some runs (e.g. ConfigParser only if there
+# are configfiles, subprocess only for the pager) are imported where used, to
+# keep startup fast.
+import array
+import bisect
+import cStringIO
+import errno
+import itertools
+import math
 import os
 import re
 import sys
-import struct
-import termios
-import textwrap
 
+import fastwrap
 import formats
-from textblockparser import (IndentedParagraphs,
-                             SingleParagraph,
+import reducers
+from textblockparser import (CompactIndentedParagraphs,
+                             CompactSingleParagraph,
                              TextBlockParser)
 
 
@@ -396,6 +411,136 @@ def _list(value, default=_UNSET):
         return [value]
     return value
 
+class DocVars(dict):
+    """A dict of docvars that keeps track of changes.
+
+    .version gets a new unique value whenever the dict is changed, so it can 
+    be used as a key for caching text rendered using the docvars.
+    """
+    _versions = itertools.count()
+
+    def __init__(self, *args, **kw):
+        super(DocVars, self).__init__(*args, **kw)
+        self.version = self._versions.next()
+
+    def _changed(method):
+        def wrapper(self, *args, **kw):
+            try:
+                return method(self, *args, **kw)
+            finally:
+                self.version = self._versions.next()
+        wrapper.__name__ = method.__name__
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+
+    __setitem__ = _changed(dict.__setitem__)
+    __delitem__ = _changed(dict.__delitem__)
+    clear = _changed(dict.clear)
+    pop = _changed(dict.pop)
+    popitem = _changed(dict.popitem)
+    setdefault = _changed(dict.setdefault)
+    update = _changed(dict.update)
+    del _changed
+
+class Settings(object):
+    """An immutable name:value mapping of settings, see tui.freeze().
+    
+    Values are kept in a tuple, and keys are looked up in a key:position dict
+    that is shared by all copies, so a read is a dict lookup and a tuple 
+    index. Options can also be looked up by abbreviation, like ui['-a'], and
+    positional arguments by position, like ui[0], but these aliases are not
+    keys: iteration, len(), `in` and == only see the names. Use .replace() to
+    get an updated copy.
+    
+    Behaves like a read-only collections.Mapping, without importing 
+    collections (see the module imports).
+    """
+    __slots__ = ('_names', '_index', '_values')
+
+    def __init__(self, items, aliases=()):
+        """
+        items is a sequence of (name, value) pairs, and aliases a sequence of
+        (alias, name) pairs for other keys that give the same value.
+        """
+        names, values = zip(*items) or ((), ())
+        index = dict((name, i) for i, name in enumerate(names))
+        index.update((alias, index[name]) for alias, name in aliases)
+        self._names = names
+        self._index = index
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._index[key]]
+
+    def __contains__(self, key):
+        i = self._index.get(key)
+        return i is not None and self._names[i] == key
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __eq__(self, other):
+        if isinstance(other, Settings):
+            return self.dict() == other.dict()
+        if isinstance(other, dict):
+            return self.dict() == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    # Equal to dicts, which are unhashable.
+    __hash__ = None
+
+    def __repr__(self):
+        return 'Settings(%r)' % (self.items(),)
+
+    def get(self, key, default=None):
+        try:
+            return self._values[self._index[key]]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(self._names)
+
+    def values(self):
+        return list(self._values)
+
+    def items(self):
+        return zip(self._names, self._values)
+
+    def iterkeys(self):
+        return iter(self._names)
+
+    def itervalues(self):
+        return iter(self._values)
+
+    def iteritems(self):
+        return itertools.izip(self._names, self._values)
+
+    def dict(self):
+        """Return a name:value dict of all settings."""
+        return dict(zip(self._names, self._values))
+
+    def replace(self, values):
+        """Return a copy with new values from a key:value dict or pairs."""
+        new = list(self._values)
+        index = self._index
+        for key, value in dict(values).items():
+            new[index[key]] = value
+        copy = Settings.__new__(Settings)
+        copy._names = self._names
+        copy._index = index
+        copy._values = tuple(new)
+        return copy
+
 def _docs(text, docvars):
     if not text:
         return
@@ -414,24 +559,232 @@ class DocParser(TextBlockParser):
         disable.
         """
         super(DocParser, self).__init__(untagged=None, tabsize=tabsize)
-        self.addblock('title', SingleParagraph)
-        self.addblock('description', SingleParagraph)
-        self.addblock('usage', SingleParagraph)
-        self.addblock('contact', IndentedParagraphs)
-        self.addblock('website', IndentedParagraphs)
-        self.addblock('download', IndentedParagraphs)
-        self.addblock('git', IndentedParagraphs)
-        self.addblock('subversion', IndentedParagraphs)
-        self.addblock('copyright', IndentedParagraphs)
-        self.addblock('license', IndentedParagraphs)
-        self.addblock('general', IndentedParagraphs)
-        self.addblock('additional', IndentedParagraphs)
-        self.addblock('parameters', SingleParagraph, True, 'PARAMETER')
-        self.addblock('files', IndentedParagraphs, True, 'FILE')
-
-class StrictConfigParser(ConfigParser.SafeConfigParser):
-    """A config parser that minimises the risks for hard-to-debug errors."""
+        self.addblock('title', CompactSingleParagraph)
+        self.addblock('description', CompactSingleParagraph)
+        self.addblock('usage', CompactSingleParagraph)
+        self.addblock('contact', CompactIndentedParagraphs)
+        self.addblock('website', CompactIndentedParagraphs)
+        self.addblock('download', CompactIndentedParagraphs)
+        self.addblock('git', CompactIndentedParagraphs)
+        self.addblock('subversion', CompactIndentedParagraphs)
+        self.addblock('copyright', CompactIndentedParagraphs)
+        self.addblock('license', CompactIndentedParagraphs)
+        self.addblock('general', CompactIndentedParagraphs)
+        self.addblock('additional', CompactIndentedParagraphs)
+        self.addblock('parameters', CompactSingleParagraph, True, 'PARAMETER')
+        self.addblock('files', CompactIndentedParagraphs, True, 'FILE')
+
+class DocsIndex(object):
+    """Index of the blocks in docsfiles, for parsing them on demand."""
+
+    def __init__(self, docsfiles, cachefile=None):
+        """
+        docsfiles is a list of paths to potential docsfiles; index if present.
+        A str means a list of one item.
+        
+        cachefile (if given) is the path to a file where the index is kept 
+        between runs. Files that have not changed since they were indexed 
+        will not be read at all. The cache is stored with marshal, which 
+        unlike pickle can not run code when loaded, and entries that do not
+        look right are ignored.
+        """
+        import marshal
+        self.docsfiles = [f for f in _list(docsfiles) if os.path.isfile(f)]
+        cache = dict()
+        if cachefile:
+            try:
+                with open(cachefile, 'rb') as f:
+                    cache = marshal.load(f)
+            except Exception:
+                pass
+            if not isinstance(cache, dict):
+                cache = dict()
+        self.blocks = []
+        self._labelled = None
+        updated = dict()
+        for docsfile in self.docsfiles:
+            stat = os.stat(docsfile)
+            key = (stat.st_size, stat.st_mtime)
+            blocks = self._cached(cache.get(docsfile), key)
+            if blocks is None:
+                blocks = DocParser().index(docsfile)
+            updated[docsfile] = (key, blocks)
+            self.blocks.extend((docsfile,) + block for block in blocks)
+        if cachefile and updated != cache:
+            try:
+                with open(cachefile, 'wb') as f:
+                    marshal.dump(updated, f, 2)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _cached(entry, key):
+        """Return the blocks in a cache entry if it is valid for key, or None."""
+        try:
+            entrykey, blocks = entry
+            if entrykey != key or not isinstance(blocks, list):
+                return None
+            for name, label, start, end, line_number in blocks:
+                if not (isinstance(name, str) and isinstance(label, (str, type(None)))
+                        and start <= end):
+                    return None
+        except (TypeError, ValueError):
+            return None
+        return blocks
+
+    def labels(self, name):
+        """List the labels of all labelled blocks with the given name."""
+        labels = []
+        for docsfile, blockname, label, start, end, line_number in self.blocks:
+            if blockname == name and label not in labels:
+                labels.append(label)
+        return labels
+
+    def parse(self, name, label=None):
+        """Return a DocParser that has parsed only the named blocks.
+        
+        label (if given) restricts this to the labelled blocks with that label. 
+        """
+        parser = DocParser()
+        if label is None:
+            blocks = [b for b in self.blocks if b[1] == name]
+        else:
+            if self._labelled is None:
+                self._labelled = dict()
+                for block in self.blocks:
+                    self._labelled.setdefault(block[1:3], []).append(block)
+            blocks = self._labelled.get((name, label), [])
+        for docsfile, blockname, blocklabel, start, end, line_number in blocks:
+            parser.parse_range(docsfile, start, end, line_number)
+        return parser
+
+class SearchIndex(object):
+    """Inverted index over the names and docs of parameters.
     
+    Postings are kept in flat arrays, so that the index is small and quick to
+    load from disk: the postings for .terms[k] are .ids[j] (an index into 
+    .names) and .weights[j] (the summed weights of the texts that the term 
+    occurs in) for j in range(.offsets[k], .offsets[k + 1]). .terms is 
+    sorted, so that terms with a common prefix are adjacent.
+    """
+    _word = re.compile(r'\w+')
+
+    def __init__(self, entries=()):
+        """entries is a sequence of (name, [(text, weight), ...])."""
+        self.names = []
+        postings = dict()
+        for name, texts in entries:
+            i = len(self.names)
+            self.names.append(name)
+            for text, weight in texts:
+                for term in self.split(text):
+                    termpostings = postings.setdefault(term, {})
+                    termpostings[i] = termpostings.get(i, 0) + weight
+        self.terms = sorted(postings)
+        self.offsets = array.array('l', [0])
+        self.ids = array.array('l')
+        self.weights = array.array('l')
+        for term in self.terms:
+            termpostings = postings[term]
+            ids = sorted(termpostings)
+            self.ids.extend(ids)
+            self.weights.extend(termpostings[i] for i in ids)
+            self.offsets.append(len(self.ids))
+
+    def __getstate__(self):
+        return (self.names, self.terms, self.offsets.tostring(), 
+                self.ids.tostring(), self.weights.tostring())
+
+    def __setstate__(self, state):
+        self.names, self.terms = state[:2]
+        self.offsets, self.ids, self.weights = [array.array('l') for i in range(3)]
+        for a, data in zip([self.offsets, self.ids, self.weights], state[2:]):
+            a.fromstring(data)
+
+    @classmethod
+    def fromstate(cls, state):
+        """Return an index from .__getstate__() output, or None if invalid.
+        
+        For state loaded from an untrusted cache, e.g. with marshal. 
+        """
+        try:
+            names, terms, offsets, ids, weights = state
+            if not (isinstance(names, list) and isinstance(terms, list)
+                    and all(isinstance(s, str) for s in names + terms + [offsets, ids, weights])):
+                return None
+            index = cls.__new__(cls)
+            index.__setstate__(state)
+        except (TypeError, ValueError):
+            return None
+        if (len(index.offsets) != len(terms) + 1 or index.offsets[0] != 0
+            or list(index.offsets) != sorted(index.offsets) or index.offsets[-1] != len(index.ids)
+            or len(index.weights) != len(index.ids)
+            or [i for i in index.ids if not 0 <= i < len(names)]):
+            return None
+        return index
+
+    @classmethod
+    def split(cls, text):
+        """Split text into lowercase terms."""
+        return cls._word.findall(text.lower())
+
+    def expand(self, term):
+        """Return the range of indices in .terms of terms that start with term."""
+        start = end = bisect.bisect_left(self.terms, term)
+        while end < len(self.terms) and self.terms[end].startswith(term):
+            end += 1
+        return xrange(start, end)
+
+    def search(self, query, limit=None):
+        """Return [(score, name)] for names matching query, best first.
+        
+        A name matches if each term in query is a prefix of some term indexed
+        for the name. Scores are tf-idf like, and prefix matches count half. 
+        Ties are broken by the order in which names were indexed. limit (if 
+        given) is the maximum number of matches to return.
+        """
+        scores = None
+        n = float(len(self.names))
+        for term in self.split(query):
+            termscores = dict()
+            for k in self.expand(term):
+                start, end = self.offsets[k], self.offsets[k + 1]
+                idf = math.log(1 + n / (end - start))
+                if self.terms[k] != term:
+                    idf /= 2
+                get = termscores.get
+                for i, weight in itertools.izip(self.ids[start:end], self.weights[start:end]):
+                    termscores[i] = get(i, 0) + weight * idf
+            if scores is not None:
+                termscores = dict((i, score + termscores[i]) 
+                                  for i, score in scores.iteritems() 
+                                  if i in termscores)
+            scores = termscores
+            if not scores:
+                return []
+        if not scores:
+            return []
+        key = lambda (i, score): (-score, i)
+        if limit is None:
+            matches = sorted(scores.iteritems(), key=key)
+        else:
+            import heapq
+            matches = heapq.nsmallest(limit, scores.iteritems(), key=key)
+        return [(score, self.names[i]) for i, score in matches]
+
+class StrictConfigParser:
+    """A config parser that minimises the risks for hard-to-debug errors.
+    
+    A case sensitive ConfigParser.SafeConfigParser with .unusedoptions(). 
+    ConfigParser is imported, and SafeConfigParser made the base class, when 
+    the first instance is made, since most runs have no configfiles to read.
+    """
+    
+    def __init__(self, *args, **kw):
+        import ConfigParser
+        StrictConfigParser.__bases__ = (ConfigParser.SafeConfigParser,)
+        ConfigParser.SafeConfigParser.__init__(self, *args, **kw)
+
     def optionxform(self, option):
         """Strip whitespace only."""
         return option.strip()
@@ -467,6 +820,9 @@ def get_terminal_size(default_cols=80, default_rows=25):
     def ioctl_GWINSZ(fd):
         """Get (cols, rows) from a putative fd to a tty."""
         try:                               
+            if not os.isatty(fd):
+                return None
+            import fcntl, struct, termios
             rows_cols = struct.unpack('hh', fcntl.ioctl(fd, termios.TIOCGWINSZ, '1234')) 
             return tuple(reversed(rows_cols))
         except:
@@ -486,10 +842,54 @@ def get_terminal_size(default_cols=80, default_rows=25):
     return cr
 
 def _autoindent(labels, indent=0, maxindent=25, extra=2):
-    return max(indent + extra, *(len(s) for s in labels if len(s) < maxindent))
+    return max([indent + extra] + [len(s) for s in labels if len(s) < maxindent])
 
 ## Public API
 
+# Compiled keyword regexes by configuration, see get_metainfo().
+_keyword_patterns = dict()
+
+def _keyword_patterns_for(keywords, template, prettify):
+    """Return a list of regexes that match a line for any of keywords.
+    
+    The patterns for the keywords are combined into a single alternation, 
+    which is compiled only once for each configuration. Templates that can't
+    be combined (e.g. because they define other named groups) give one regex 
+    per keyword.
+    """
+    key = (tuple(keywords), template, prettify)
+    try:
+        return _keyword_patterns[key]
+    except KeyError:
+        pass
+    patterns = [template % dict(pretty=prettify(kw), keyword=kw) for kw in keywords]
+    try:
+        compiled = [re.compile('|'.join('(?:%s)' % pattern for pattern in patterns))] if patterns else []
+    except re.error:
+        compiled = [re.compile(pattern) for pattern in patterns]
+    _keyword_patterns[key] = compiled
+    return compiled
+
+def _read_docstring(scriptfile):
+    """Return the docstring of a script file, reading no further than its end."""
+    if scriptfile[-4:] in ['.pyc', '.pyo']: 
+        scriptfile = scriptfile[:-1]
+    with open(scriptfile) as script:
+        for line in script:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line[:3] not in ('"""', "'''"):
+                break
+            closer = line[:3]
+            lines = [line[3:]]
+            for line in script:
+                if line.strip().startswith(closer):
+                    break
+                lines.append(line.rstrip('\n'))
+            return '\n'.join(lines)
+    raise ValueError('file contains no docstring')
+
 def get_metainfo(scriptfile,
                  keywords=['author', 'contact', 'copyright', 'download', 'git', 'subversion', 'version', 'website'],
                  special={},
@@ -504,8 +904,11 @@ def get_metainfo(scriptfile,
     This function will only make minimal efforts to succeed. If you need 
     anything else: roll your own.
     
-    The docstring needs to be multiline and the closing quotes need to be first 
-    on a line, optionally preceeded by whitespace. 
+    scriptfile is the path to the script, or the script module itself, or its
+    docstring (anything with a newline in it is taken as a docstring). Passing
+    the module or __doc__ saves reading the script file. In a script file, the
+    docstring needs to be multiline and the closing quotes need to be first on
+    a line, optionally preceeded by whitespace. 
     
     The first non-whitespace line is re.search'ed using first_line_pattern, 
     default e.g (version optional, contains no whitespace): PROGNAME [vVERSION]
@@ -524,43 +927,213 @@ def get_metainfo(scriptfile,
     Any keyword:pattern pairs that need special treatment can be supplied with 
     special.
     """
-    patterns = dict((kw, re.compile(keyword_pattern_template % dict(pretty=prettify(kw), keyword=kw))) for kw in keywords)
-    patterns.update(special)
+    if isinstance(scriptfile, type(sys)):
+        docstring = scriptfile.__doc__
+        if docstring is None:
+            raise ValueError('module has no docstring')
+    elif '\n' in scriptfile:
+        docstring = scriptfile
+    else:
+        return get_metainfo(_read_docstring(scriptfile), keywords, special, first_line_pattern, 
+                            keyword_pattern_template, prettify)
+    keywords = [kw for kw in keywords if kw not in special]
+    patterns = _keyword_patterns_for(keywords, keyword_pattern_template, prettify)
     metainfo = dict()
-    
-    if scriptfile[-4:] in ['.pyc', '.pyo']: 
-        scriptfile = scriptfile[:-1]
-    script = open(scriptfile)
-    closer = ''
-    for line in script:
+    lines = iter(docstring.splitlines())
+    for line in lines:
         line = line.strip()
-        if not line or line.startswith('#'):
-            continue
-        if line[:3] in ('"""', "'''"):
-            closer = line[:3] 
+        if line:
             break
-        raise ValueError('file contains no docstring')
-    if not line:
-        for line in script:
-            line = line.strip()
-            if line:
-                break
-    g = re.search(first_line_pattern, line[3:]).groupdict()
+    else:
+        raise ValueError('docstring is empty')
+    g = re.search(first_line_pattern, line).groupdict()
     metainfo['progname'] = g['progname']
     if g['version']:
         metainfo['version'] = g['version']
-    for line in script:
-        if line.strip().startswith(closer):
-            break
-        for keyword, pattern in patterns.items():
-            m = pattern.search(line)
+    for line in lines:
+        for keyword, kwpattern in special.items():
+            m = kwpattern.search(line)
             if m:
                 metainfo[keyword] = m.group(keyword)
                 break
-        if line.strip() and not 'description' in metainfo:
-            metainfo['description'] = line.strip()
+        else:
+            for pattern in patterns:
+                m = pattern.search(line)
+                if m:
+                    # Only the named keyword groups count, templates may have others.
+                    groups = m.groupdict()
+                    for keyword in keywords:
+                        if groups.get(keyword) is not None:
+                            metainfo[keyword] = groups[keyword]
+                            break
+                    break
+            else:
+                if line.strip() and not 'description' in metainfo:
+                    metainfo['description'] = line.strip()
     return metainfo
 
+def _filestat(path):
+    """Return something that changes when the file at path is changed."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime
+
+def _install_dir(install_dir):
+    """Return the directory to search for docsfiles and configfiles, or None.
+    
+    install_dir can also be a python package or module, or a path to a file
+    (e.g. mypackage or __file__), meaning the containing directory.
+    """
+    if isinstance(install_dir, type(sys)):
+        install_dir = install_dir.__file__
+    if isinstance(install_dir, basestring) and os.path.isfile(install_dir):
+        install_dir = os.path.dirname(install_dir)
+    return install_dir
+
+def _command_base(command):
+    """Return command without any trailing .py extension."""
+    if command.endswith('.py'):
+        return command[:-3]
+    return command
+
+def _docsfiles(install_dir, command, docsfiles=None, docsfilenames=None):
+    """Return the paths of potential docsfiles, as described in tui.__init__()."""
+    if docsfiles is None:
+        if install_dir:
+            if docsfilenames is None:
+                docsfilenames = [os.path.basename(install_dir) + '.docs']
+                if _command_base(command):
+                    docsfilenames.append(_command_base(command) + '.docs')
+            docsfiles = [os.path.join(install_dir, f) for f in _list(docsfilenames)]
+    elif docsfilenames:
+        raise ValueError('do not use docsfilenames together with docsfiles')
+    return docsfiles
+
+def _configfiles(install_dir, command, configfiles=None, configdirs=None, configfilenames=None):
+    """Return the paths of potential configfiles, as described in tui.__init__()."""
+    if configfiles is None:
+        dirname = _command_base(command)
+        if isinstance(configdirs, basestring):
+            dirname = configdirs
+            configdirs = None
+        if configdirs is None:
+            configdirs = []
+            if install_dir is not None:
+                configdirs.append(install_dir)
+            configdirs += [os.path.join('/etc', dirname), 
+                           os.path.expanduser(os.path.join('~', '.' + dirname))]
+        configfilenames = _list(configfilenames, [_command_base(command) + '.conf'])
+        configfiles = [os.path.join(d, f) for d in configdirs for f in configfilenames]
+    elif configdirs or configfilenames:
+        raise ValueError('do not use configfiles together with configdirs and configfilenames')
+    elif isinstance(configfiles, basestring):
+        configfiles = [configfiles]
+    return configfiles
+
+class Prefetch(object):
+    """Files read ahead on a background thread, see prefetch()."""
+    
+    def __init__(self, paths, terminal_size=None):
+        """
+        paths is a list of files to read. terminal_size is passed on as is.
+        
+        The thread does nothing but file I/O. In particular it never imports 
+        anything, since that would wait for any import the main thread is busy
+        with (or deadlock, if the tui is made while that import runs).
+        """
+        import threading
+        self.paths = paths
+        self.terminal_size = terminal_size
+        self.contents = dict()
+        self._thread = threading.Thread(target=self._read, name='tui.prefetch')
+        self._thread.daemon = True
+        self._thread.start()
+    
+    def _read(self):
+        for path in self.paths:
+            data = None
+            try:
+                if os.path.isfile(path):
+                    with open(path, 'rb') as f:
+                        data = f.read()
+            except (IOError, OSError):
+                pass
+            self.contents[path] = data
+    
+    def take(self, path):
+        """Return the contents of path as prefetched, or None if absent.
+        
+        Wait for the thread to finish if needed. Each path can only be taken 
+        once, so later reads go to disk. Raise KeyError if path was not 
+        prefetched.
+        """
+        self._thread.join()
+        return self.contents.pop(path)
+
+# The most recent Prefetch, see prefetch().
+_prefetch = None
+
+def _prefetched(path):
+    """Return Prefetch.take(path) for the most recent prefetch, see prefetch()."""
+    if _prefetch is None:
+        raise KeyError(path)
+    return _prefetch.take(path)
+
+def prefetch(install_dir=None,
+             command=None,
+             docsfiles=None,
+             docsfilenames=None,
+             configfiles=None,
+             configdirs=None,
+             configfilenames=None,
+             width=None):
+    """Start reading docsfiles and configfiles on a background thread.
+    
+    Call this at the top of a script, before importing anything slow, with 
+    the same values for these parameters as will be given to tui later. tui 
+    then uses the prefetched contents instead of reading the files itself, so 
+    that the file I/O overlaps with the imports. Files that change in 
+    between are used as they were when prefetched. Docsfiles are only used 
+    from here if tui is not given docsindex. 
+    
+    The terminal size is looked up right away (unless width is given), since
+    that is quick. Return the Prefetch object.
+    """
+    global _prefetch
+    install_dir = _install_dir(install_dir)
+    if command is None:
+        command = os.path.basename(sys.argv[0])
+    paths = list(_docsfiles(install_dir, command, docsfiles, docsfilenames) or [])
+    paths.extend(_configfiles(install_dir, command, configfiles, configdirs, configfilenames))
+    terminal_size = None
+    if not width:
+        terminal_size = get_terminal_size()
+    _prefetch = Prefetch(paths, terminal_size)
+    return _prefetch
+
+class _Taken(list):
+    """Arguments taken from argv by Option.take(), with their converted value."""
+
+    def __init__(self, args, value):
+        list.__init__(self, args)
+        self.value = value
+
+class _Changes(dict):
+    """Value changes from tui.reload(), with the options it had to skip."""
+
+    def __init__(self, changes, skipped):
+        dict.__init__(self, changes)
+        self.skipped = skipped
+
+def _copy(value):
+    """Return a copy of value if reducers could modify it in place."""
+    if isinstance(value, (list, set, dict)) or hasattr(value, 'maxlen'):
+        import copy
+        return copy.copy(value)
+    return value
+
 class Parameter(object):
     """A program parameter.
     
@@ -572,9 +1145,14 @@ class Parameter(object):
         self.docs = docs or self.format.docs
         self.recurring = recurring
 
+    # How values of recurring parameters are accumulated, see tui.reducers.
+    reducer = None
+
     @property
     def strvalue(self):
         value = self.value
+        if self.reducer:
+            return self.reducer.present(value, self.format)
         if not self.recurring:
             value = [value]
         return ', '.join(self.format.present(v) for v in value)
@@ -599,6 +1177,9 @@ class Parameter(object):
 class Option(Parameter):
     """A program option."""
     
+    # Winning literals that have not yet been converted, see .resolve().
+    pending = None
+
     def __init__(self, 
                  name, 
                  format, 
@@ -606,7 +1187,8 @@ class Option(Parameter):
                  default=_UNSET,
                  recurring=False, 
                  reserved=False,
-                 docs=None):
+                 docs=None,
+                 reducer=None):
         """
         name is the long option name. Used in settings files and with a '--'
         prefix on the command line. This should be as brief and descriptive 
@@ -633,27 +1215,160 @@ class Option(Parameter):
         If recurring is true, the option allowed to occur several times on the
         command line. .value will then be a list of all parsed values, in 
         parsing order. 
+        
+        reducer (implies recurring) decides how the values of a recurring
+        option are accumulated instead, see tui.reducers. For example 'count' 
+        to count occurrences, 'set' to drop duplicates, reducers.Last(10) to 
+        keep the last ten values, or a function(accumulated, value) that 
+        returns the new accumulated value. Values are then folded as they are 
+        parsed, so memory use stays bounded however many times the option is 
+        used. The default is then reducer.default, unless given.
         """
+        if recurring and reducer is None:
+            reducer = reducers.Append()
+        if reducer is not None:
+            reducer = reducers.get_reducer(reducer)
+            recurring = True
         super(Option, self).__init__(name, format, recurring, docs)
+        self.reducer = reducer
         if default is _UNSET:
-            if recurring:
-                default = []
+            if reducer:
+                default = reducer.default
             else:
                 default = self.format.default
-        self.value = default
+        self.default = default
         if abbreviation and len(abbreviation) != 1:
             raise ValueError("Option abbreviations must be strings of length 1.")
         if abbreviation == '-':
             raise ValueError("Invalid abbreviation (cannot be '-').")
         self.abbreviation = abbreviation
         self.reserved = reserved
-        self.location = "Builtin default."
+        self.reset()
         if docs is None:
             if recurring:
                 self.docs += " Can be used repeatedly."
             if reserved:
                 self.docs += " Reserved for command line use."
 
+    def _get_value(self):
+        if self.pending:
+            literals = self.pending
+            try:
+                self.resolve(literals)
+            except ParseError:
+                self.resolve(literals, lazy=True)
+                raise
+        return self._value
+
+    def _set_value(self, value):
+        self.pending = None
+        self._value = value
+
+    value = property(_get_value, _set_value)
+
+    @property
+    def strvalue(self):
+        try:
+            return Parameter.strvalue.fget(self)
+        except ParseError:
+            # Lazy values that can not be converted are shown as given, so 
+            # that help still works.
+            return ', '.join(literal if isinstance(literal, basestring) else ' '.join(literal)
+                             for name, literal, usedname, location in self.pending)
+
+    def save(self):
+        """Return the value and its origin, for .restore().
+        
+        Pending literals are kept as they are, unconverted.
+        """
+        return _copy(self._value), self.location, self.pending
+
+    def restore(self, state):
+        """Restore the value and its origin from .save().
+        
+        The same state can be restored any number of times.
+        """
+        value, self.location, self.pending = state
+        self._value = _copy(value)
+
+    def reset(self):
+        """Restore the builtin default value."""
+        if self.reducer:
+            self.value = self.reducer.initial(self.default)
+        else:
+            self.value = self.default
+        self.location = "Builtin default."
+
+    def resolve(self, literals, lazy=False):
+        """Reset to the builtin default, then parse and store literals.
+        
+        literals is a list of (name, literal, usedname, location) tuples, where
+        literal is either a string for .parsestr() or an argument list for
+        .parse(). 
+        
+        If lazy is true, the literals are not converted until the value is 
+        first accessed. Conversion errors are then raised on access. 
+        """
+        self.reset()
+        if lazy:
+            self.pending = literals
+            self.location = literals[-1][3]
+            return
+        for name, literal, usedname, location in literals:
+            self.parseliteral(literal, usedname, location)
+
+    def parseliteral(self, literal, usedname, location):
+        """Convert and store a literal from .take() or a configfile.
+        
+        literal is a string for .parsestr() or an argument list for .parse().
+        Arguments that .take() already had to convert are not converted again.
+        """
+        if isinstance(literal, basestring):
+            self.parsestr(literal, usedname, location)
+        elif isinstance(literal, _Taken):
+            self._store(literal.value, location)
+        else:
+            self.parse(list(literal), usedname, location)
+
+    def take(self, argv, usedname):
+        """Remove and return the arguments in argv that belong to the option.
+        
+        The arguments are not converted, unless the format takes a variable
+        number of arguments, since then the format is the only one who knows
+        how many to take. The converted value is then returned along with the
+        arguments, see .parseliteral().
+        """
+        nargs = self.nargs
+        if nargs is None or nargs < 0:
+            rest = list(argv)
+            value = self._convert(self.format.parse, rest, usedname)
+            nargs = len(argv) - len(rest)
+            literal = _Taken(argv[:nargs], value)
+        elif len(argv) < nargs:
+            raise BadNumberOfArguments(usedname, nargs, len(argv))
+        else:
+            literal = argv[:nargs]
+        del argv[:nargs]
+        return literal
+
+    def _convert(self, method, arg, usedname):
+        """Call a format parse method and translate any errors."""
+        try:
+            return method(arg)
+        except formats.BadNumberOfArguments, e:
+            raise BadNumberOfArguments(usedname, e.required, e.given)
+        except formats.BadArgument, e:
+            raise BadArgument(usedname, e.argument, e.message)
+
+    deferrable = property(lambda self: not self.reducer or self.reducer.deferrable)
+
+    def _store(self, value, location):
+        if self.reducer:
+            self.value = self.reducer(self.value, value)
+        else:
+            self.value = value
+        self.location = location
+
     def parse(self, argv, usedname, location):
         """Consume and process arguments and store the result.
         ARGS:
@@ -666,17 +1381,7 @@ class Option(Parameter):
             data from.
 
         """
-        try:
-            value = self.format.parse(argv)
-        except formats.BadNumberOfArguments, e:
-            raise BadNumberOfArguments(usedname, e.required, e.supplied)
-        except formats.BadArgument, e:
-            raise BadArgument(usedname, e.argument, e.message)
-        if self.recurring:
-            self.value.append(value)
-        else:
-            self.value = value
-        self.location = location
+        self._store(self._convert(self.format.parse, argv, usedname), location)
 
     def parsestr(self, argsstr, usedname, location):
         """Parse a string lexically and store the result.
@@ -690,22 +1395,14 @@ class Option(Parameter):
             data from.
 
         """
-        try:
-            value = self.format.parsestr(argsstr)
-        except formats.BadNumberOfArguments, e:
-            raise BadNumberOfArguments(usedname, e.required, e.supplied)
-        except formats.BadArgument, e:
-            raise BadArgument(usedname, e.argument, e.message)
-        if self.recurring:
-            self.value.append(value)
-        else:
-            self.value = value
-        self.location = location
+        self._store(self._convert(self.format.parsestr, argsstr, usedname), location)
 
 help_option = Option('help', formats.Flag, 'h', reserved=True, docs='Print help and exit.')
 longhelp_option = Option('HELP', formats.Flag, reserved=True, docs='Print verbose help and exit.')
 version_option = Option('version', formats.Flag, 'V', reserved=True, docs='Print version string and exit.')
 settings_option = Option('settings', formats.Flag, reserved=True, docs='Print settings summary and exit.')
+paramhelp_option = Option('help-param', formats.String, reserved=True, docs='Print help on a single option or positional argument and exit.')
+searchhelp_option = Option('help-search', formats.String, reserved=True, docs='Print help on the options and positional arguments whose names or docs match the given words and exit.')
 
 class PositionalArgument(Parameter):
     """A positional command line program parameter."""
@@ -807,6 +1504,17 @@ class tui(TUIBase):
                          'additional',
                          'files']
     
+    # Module used for wrapping help text. Anything with textwrap compatible 
+    # wrap() and fill() functions will do, e.g. the textwrap module itself.
+    textwrapper = fastwrap
+    
+    # Minimum page width for showing settings as a table, see .settingshelp().
+    # None means never.
+    settings_table_width = None
+    
+    # Command line flag for the dynamic completion protocol, see .complete().
+    completion_flag = '--tui-complete'
+    
     def __init__(self,
                  parameters=None,
                  version=None,
@@ -840,10 +1548,19 @@ class tui(TUIBase):
                  configfilenames=None,
                  sections=None,
                  ignore=None,
+                 deferred=False,
+                 lazy=False,
+                 reloadable=False,
                  helpoption=help_option,
                  longhelpoption=longhelp_option,
                  versionoption=version_option,
-                 settingsoption=settings_option):
+                 settingsoption=settings_option,
+                 paramhelpoption=None,
+                 searchhelpoption=None,
+                 docsindex=False,
+                 helpcache=False,
+                 helpdir=None,
+                 pager=False):
         """
         Many of the metainfo parameters (author, progname...) should already
         be present in the program docstring if you're coding by the book. You 
@@ -880,7 +1597,10 @@ class tui(TUIBase):
         mypackage or __file__).
         
         argv is the list of command line arguments to use (see launch just 
-        below). None means use a copy of sys.argv.
+        below). None means use a copy of sys.argv. If argv[1] is 
+        .completion_flag, .launch() prints completion candidates and exits, 
+        see .complete(). If launch is True, this is done right away, before 
+        any docs or configfiles are read.
 
         If launch is True (default) then .launch(argv) will be called after 
         initiallization.
@@ -944,6 +1664,32 @@ class tui(TUIBase):
         docs will be read on instantation. Use .readdocs() (or .launch()) for 
         that.
         
+        If docsindex is true, docsfiles are only indexed on instantiation (a
+        quick pass over each file), and are not parsed until the docs are 
+        actually needed, e.g. for help output. Help on a single parameter then 
+        only parses that parameter's docs. A str is taken as the path to a 
+        file in which to cache the index between runs, so that unchanged 
+        docsfiles are not read at all.
+        
+        If helpcache is true, the output of the help, longhelp and settings
+        options is cached on disk, so that later runs with the same parameters,
+        values, docs, docvars and width can print it with a single file read.
+        Each command keeps one cache file per kind of help and width, which is
+        replaced when anything changes, so the cache does not grow with use.
+        True means use the tui directory in the user cache dir 
+        ($XDG_CACHE_HOME, or ~/.cache). A str is taken as the path to the 
+        cache directory.
+        
+        helpdir is the path to a directory of help texts generated at build 
+        time by tui.generate. If present, these are printed by the help and 
+        longhelp options instead of rendering the help at runtime, as long as
+        all options still have their builtin defaults (since help shows 
+        current values).
+        
+        pager is a shell command used for showing help and settings when 
+        stdout is a terminal. True means use $PAGER, or less if not set. False
+        means print directly to stdout. 
+        
         width is the maximum allowed width for help text. 0 means try to guess
         the terminal width, and use 79 if that fails.
         
@@ -974,6 +1720,22 @@ class tui(TUIBase):
         are shared and you want to ignore the others. Set to None to ignore all
         all unknown (not recommended). 
         
+        If deferred is true, .parse_files() and .parse_argv() only collect the
+        raw literals from configfiles and command line, and values are not 
+        converted until .resolve() (or .launch()) has decided which literals
+        win. Conversions (and side effects like creating directories) then 
+        only happen for values that actually take effect.
+        
+        If lazy is true (implies deferred), the winning literals are not even
+        converted by .resolve(), but on first access, e.g. by ui['name'] or 
+        .dict(). Conversion errors are then raised on access. Use 
+        .validate_all() to convert everything up front.
+        
+        If reloadable is true, the literals from configfiles and command line
+        are kept (as they are in deferred mode) so that .reload() can 
+        recompute values when configfiles change. Otherwise only the 
+        converted values are kept.
+        
         options can be used to supply a preconfigured option dictionary, if you
         for some reason prefer this to .makeoption(). tui will not check this 
         for you. See also option_order and abbreviations.
@@ -1005,12 +1767,31 @@ class tui(TUIBase):
         settingsoption adds an option that lets the user print a brief summary
         of program settings. Default is '--settings' or '-S', option reserved 
         for command line use). None means don't add such an option.
+
+        paramhelpoption adds an option that lets the user request help on a 
+        single option or positional argument. Use paramhelp_option for 
+        '--help-param NAME', option reserved for command line use. Default is 
+        None, which means don't add such an option, so that programs do not 
+        lose the name to a new reserved option.
+        
+        searchhelpoption adds an option that lets the user search the docs for
+        options and positional arguments. Use searchhelp_option for 
+        '--help-search WORDS', option reserved for command line use. Default 
+        is None, which means don't add such an option.
         """
         params = locals()
+        self.deferred = deferred or lazy
+        self.lazy = lazy
+        self.reloadable = reloadable
+        self.layers = []
+        self._configstate = dict()
+        self._snapshot = None
+        self._layouts = dict()
         self.options = dict()
         self.option_order = []
         self.abbreviations = dict()
         self.positional_args = []
+        self.parameters = dict()
         for p in parameters:
             if isinstance(p, Option):
                 self._add_option(p)
@@ -1019,7 +1800,7 @@ class tui(TUIBase):
             else:
                 raise TypeError('unknown parameter type')
         self.basic_option_names = dict()
-        for optiontype in ['help', 'longhelp', 'settings', 'version']:
+        for optiontype in ['help', 'longhelp', 'paramhelp', 'searchhelp', 'settings', 'version']:
             option = params[optiontype + 'option']
             if not option:
                 continue
@@ -1028,63 +1809,63 @@ class tui(TUIBase):
             self._add_option(option)
             self.basic_option_names[optiontype] = option.name
 
-        # Did the user give a module/package rather than a path? 
-        if isinstance(install_dir, type(sys)):
-            install_dir = install_dir.__file__
-        if isinstance(install_dir, basestring) and os.path.isfile(install_dir):
-            install_dir = os.path.dirname(install_dir)
+        install_dir = _install_dir(install_dir)
         
-        self.docvars = dict((s, params[s]) for s in ['author', 'progname', 'version'])
+        self.docvars = DocVars((s, params[s]) for s in ['author', 'progname', 'version'])
         if command is None:
             command = os.path.basename(sys.argv[0])
         self.docvars['command'] = command
-        command_base = command
-        if command.endswith('.py'):
-            command_base = command[:-3]
-        
-        self.docs = dict(title=_docs(title, self.docvars),
-                         usage=_docs(usage, self.docvars),
-                         files=_docs(filedocs, self.docvars))
-        if filedocs is None:
-            filedocs = dict()
-        self.docs['files'] = filedocs
+        command_base = _command_base(command)
+        
+        # Docs are kept as templates and docvars are interpolated on render, 
+        # see ._section(). These are the sections that can use docvars.
+        self._templates = set(['title', 'usage', 'files'])
+        self._paramtemplates = dict()
+        self._rendered = dict()
+        self.docs = dict(title=_list(title, None),
+                         usage=_list(usage, None),
+                         files=dict(filedocs or {}))
         self.docs.update((name, _list(params[name])) for name in ['additional', 'contact', 'copyright', 'description', 'download', 'general', 'git', 'license', 'subversion', 'website'])
         self.ignore = _list(ignore)
-        if docsfiles is None:
-            if install_dir:
-                if docsfilenames is None:
-                    docsfilenames = [os.path.basename(install_dir) + '.docs']
-                    if command_base:
-                        docsfilenames.append(command_base + '.docs')
-                docsfiles = [os.path.join(install_dir, f) for f in docsfilenames]
-        elif docsfilenames:
-            raise ValueError('do not use docsfilenames together with docsfiles')
-        self.read_docs(docsfiles)
+        docsfiles = _docsfiles(install_dir, command, docsfiles, docsfilenames)
+        self.docsfiles = docsfiles
+        
+        if helpcache is True:
+            cachehome = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser(os.path.join('~', '.cache'))
+            helpcache = os.path.join(cachehome, 'tui')
+        self.helpcache = helpcache or None
+        self._completions = None
+        
+        # Shell completion must be quick, so answer before reading any docs, 
+        # configfiles or terminal settings.
+        if launch:
+            self._complete_if_asked(argv)
+        
+        self.docsindex = None
+        self._unread_docsfiles = None
+        if docsindex:
+            cachefile = None
+            if isinstance(docsindex, basestring):
+                cachefile = docsindex
+            self.docsindex = DocsIndex(docsfiles, cachefile)
+            self._unread_docsfiles = docsfiles
+        else:
+            self.read_docs(docsfiles)
         
         self.sections = _list(sections, [command_base])
-        if configfiles is None:
-            dirname = command_base
-            if isinstance(configdirs, basestring):
-                dirname = configdirs
-                configdirs = None
-            if configdirs is None:
-                configdirs = []
-                if install_dir is not None:
-                    configdirs.append(install_dir)
-                configdirs += [os.path.join('/etc', dirname), 
-                               os.path.expanduser(os.path.join('~', '.' + dirname))]
-            configfilenames = _list(configfilenames, [command_base + '.conf'])
-            configfiles = [os.path.join(d, f) for d in configdirs for f in configfilenames]
-        elif configdirs or configfilenames:
-            raise ValueError('do not use configfiles together with configdirs and configfilenames')
-        elif isinstance(configfiles, basestring):
-            configfiles = [configfiles]
-        self.configfiles = configfiles
+        self.configfiles = _configfiles(install_dir, command, configfiles, configdirs, configfilenames)
         if self.configfiles:
             self.addconfigfiledocs()
         
+        self.helpdir = helpdir
+        self._searchindex = None
+        self.pager = pager
+        
         if not width:
-            width = get_terminal_size()[0]
+            if _prefetch and _prefetch.terminal_size:
+                width = _prefetch.terminal_size[0]
+            else:
+                width = get_terminal_size()[0]
         self.width = width
         
         if launch:
@@ -1096,18 +1877,27 @@ class tui(TUIBase):
     
     def __contains__(self, key):
         """Shorthand for key in .keys()."""
-        return key in self.keys()
+        return key in self.parameters
     
     def __getitem__(self, key):
-        """Shorthand for .getparam(key).value."""
-        return self.getparam(key).value
+        """Shorthand for .getparam(key).value, see also .freeze()."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.getparam(key).value
+        try:
+            return snapshot[key]
+        except KeyError:
+            return snapshot[self.getparam(key).name]
     
     def __setitem__(self, key, value):
         """Shorthand for .getparam(key).value = value.
         
         Useful when doing additional modifications after tui is done parsing.
         """
-        self.getparam(key).value = value
+        param = self.getparam(key)
+        param.value = value
+        if self._snapshot is not None:
+            self._update_snapshot({param.name: value})
     
     def keys(self):
         """List names of options and positional arguments."""
@@ -1115,10 +1905,10 @@ class tui(TUIBase):
 
     def values(self):
         """List values of options and positional arguments."""
-        return self.options.values() + [p.value for p in self.positional_args]
+        return [o.value for o in self.options.values()] + [p.value for p in self.positional_args]
 
     def items(self):
-        """List values of options and positional arguments."""
+        """List (name, value) for options and positional arguments."""
         return [(p.name, p.value) for p in self.options.values() + self.positional_args]
 
     def dict(self):
@@ -1126,24 +1916,51 @@ class tui(TUIBase):
         
         Useful when you absolutely need a dict, e.g: do_stuff(**ui.dict()).
         """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot.dict()
         return dict(self.items())
     
+    def freeze(self):
+        """Serve ui[key] and .dict() from a snapshot of the current values.
+        
+        The snapshot is never modified. .reload() and ui[key] = value replace
+        it with an updated copy instead, so that threads reading settings see 
+        either all or none of the changes, without locking. Call this when 
+        done parsing, e.g. after .launch(). 
+        
+        Return the snapshot, a Settings object. Threads that want to read 
+        several settings from the same snapshot can keep a reference to it.
+        """
+        aliases = [('-' + a, o.name) for a, o in self.abbreviations.items()]
+        aliases.extend(enumerate(p.name for p in self.positional_args))
+        self._snapshot = Settings(self.items(), aliases)
+        return self._snapshot
+    
+    def _update_snapshot(self, values):
+        """Replace the snapshot with a copy updated with a name:value dict."""
+        self._snapshot = self._snapshot.replace(values)
+    
     def getparam(self, key):
         """Get option or positional argument, by name, index or abbreviation.
         
-        Abbreviations must be prefixed by a '-' character, like so: ui['-a']
+        Abbreviations must be prefixed by a '-' character, like so: ui['-a'],
+        and indexes are positions among the positional arguments: ui[0]. 
+        Negative indexes are not accepted.
         """
         try:
-            return self.options[key]
-        except:
+            return self.parameters[key]
+        except (KeyError, TypeError):
             pass
-        for posarg in self.positional_args:
-            if posarg.name == key:
-                return posarg
         try:
-            return self.abbreviations[key[1:]]
-        except:
-            raise KeyError('no such option or positional argument')
+            if isinstance(key, (int, long)):
+                if key >= 0:
+                    return self.positional_args[key]
+            elif key.startswith('-'):
+                return self.abbreviations[key[1:]]
+        except (IndexError, KeyError, AttributeError):
+            pass
+        raise KeyError('no such option or positional argument')
     
     def _add_option(self, option):
         """Add an Option object to the user interface."""
@@ -1151,12 +1968,14 @@ class tui(TUIBase):
             raise ValueError('name already in use')
         if option.abbreviation in self.abbreviations:
             raise ValueError('abbreviation already in use')
-        if option.name in [arg.name for arg in self.positional_args]:
+        if option.name in self.parameters:
             raise ValueError('name already in use by a positional argument')
         self.options[option.name] = option
+        self.parameters[option.name] = option
         if option.abbreviation:
             self.abbreviations[option.abbreviation] = option
         self.option_order.append(option.name)
+        self._layouts.clear()
 
     def _add_positional_argument(self, posarg):
         """Append a positional argument to the user interface.
@@ -1170,8 +1989,19 @@ class tui(TUIBase):
                 raise ValueError("recurring positional arguments must be last")
             if self.positional_args[-1].optional and not posarg.optional:
                 raise ValueError("required positional arguments must precede optional ones")
+        if posarg.name in self.parameters:
+            raise ValueError('name already in use')
         self.positional_args.append(posarg)
+        self.parameters[posarg.name] = posarg
+        self._layouts.clear()
     
+    def _require_docs(self):
+        """Read docsfiles that have so far only been indexed."""
+        if self._unread_docsfiles is not None:
+            docsfiles = self._unread_docsfiles
+            self._unread_docsfiles = None
+            self.read_docs(docsfiles)
+
     def read_docs(self, docsfiles):
         """Read program documentation from a DocParser compatible file.
 
@@ -1180,35 +2010,88 @@ class tui(TUIBase):
         """
         updates = DocParser()
         for docsfile in _list(docsfiles):
-            if os.path.isfile(docsfile):
-                updates.parse(docsfile)
-        self.docs.update((k, _docs(updates[k], self.docvars)) for k in self.docs if updates.blocks[k])
+            try:
+                data = _prefetched(docsfile)
+            except KeyError:
+                if os.path.isfile(docsfile):
+                    updates.parse(docsfile)
+                continue
+            if data is not None:
+                updates.parse(cStringIO.StringIO(data), docsfile)
+        for section in self.docs:
+            if not updates.blocks[section]:
+                continue
+            if section == 'files':
+                self.docs[section] = dict(self.docs[section])
+                self.docs[section].update(updates[section])
+            else:
+                self.docs[section] = updates[section]
+            self._templates.add(section)
         for name, text in updates['parameters'].items():
             if name in self:
-                self.getparam(name).docs = text[0] % self.docvars
+                param = self.getparam(name)
+                param.docs = self._paramtemplates[param] = text[0]
             elif name not in self.ignore:
                 raise ValueError("parameter %r does not exist" % name)
 
+    def _section(self, name):
+        """Return the docs for a section, with any docvars interpolated.
+        
+        Interpolated text is cached until the docs or the docvars change.
+        """
+        text = self.docs[name]
+        if name not in self._templates:
+            return text
+        return self._render(name, text)
+
+    def _paramdocs(self, param):
+        """Return param.docs, with docvars interpolated if from a docsfile."""
+        if self._paramtemplates.get(param) is not param.docs:
+            return param.docs
+        return self._render(param, param.docs)
+
+    def _render(self, key, text):
+        cached = self._rendered.get(key)
+        if cached and cached[0] == self.docvars.version and cached[1] is text:
+            return cached[2]
+        if isinstance(text, basestring):
+            rendered = text % self.docvars
+        else:
+            rendered = _docs(text, self.docvars)
+        self._rendered[key] = (self.docvars.version, text, rendered)
+        return rendered
+
+    def _get_docvars(self):
+        return self._docvars
+
+    def _set_docvars(self, docvars):
+        if not isinstance(docvars, DocVars):
+            docvars = DocVars(docvars)
+        self._docvars = docvars
+
+    docvars = property(_get_docvars, _set_docvars, doc="Variables for interpolation in docs, e.g. %(progname)s.")
+
     def addconfigfiledocs(self):
-        docs = ["A %(progname)s configuration file. %(progname)s will look configfiles in the following loctions, and in the following order:" % self.docvars]
-        docs.extend("  %s. %s" % (i + 1, p) for i, p in enumerate(self.configfiles))
+        escape = lambda s: str(s).replace('%', '%%')
+        docs = ["A %(progname)s configuration file. %(progname)s will look configfiles in the following loctions, and in the following order:"]
+        docs.extend("  %s. %s" % (i + 1, escape(p)) for i, p in enumerate(self.configfiles))
         docs.append('')
         docs.append("The following sections will be parsed, and in the following order:")
-        docs.extend("  %s. [%s]" % (i + 1, s) for i, s in enumerate(self.sections))
+        docs.extend("  %s. [%s]" % (i + 1, escape(s)) for i, s in enumerate(self.sections))
         docs.append('')        
         docs.append("The [DEFAULT] section (note uppercase) is always read if present, and it is read as if its contents were copied to the beginning of all other sections. Settings on the command line override any settings found in configfiles.")
         docs.append('')        
         docs.append('SYNTAX:')        
         docs.append("  The syntax is similar to what you would find in Microsoft Windows .ini files, with [Sections] and option:value pairs. Specifically, it is a case sensitive version of python's ConfigParser. Example:")        
         docs.append('    [Section Name]')        
-        docs.append('    option1: value %(option2)s ; comment')        
+        docs.append('    option1: value %%(option2)s ; comment')        
         docs.append('    option2= value # comment')
         docs.append('')
         docs.append('  Names:')
         ignore = ''
         if self.ignore:
-            ignore = (' %(progname)s ignores the following names: ' % self.docvars + 
-                      ', '.join(repr(name) for name in self.ignore) + 
+            ignore = (' %(progname)s ignores the following names: ' + 
+                      escape(', '.join(repr(name) for name in self.ignore)) + 
                       '. Note that these may likely still be used by other programs that use the same configfile.')
         docs.append('    Section and option names are case sensitive, and for options, only the long variant is valid (and not -a style abbreviations).' + ignore)
         docs.append('')
@@ -1218,7 +2101,7 @@ class tui(TUIBase):
         docs.append('  Values:')
         docs.append('    Type values exactly as you would on the command line, except in the case of flags where the values "1", "Yes", "True" and "On" (case insensitive) mean setting the flag to True, and where the values "0", "No", "False" and "Off" mean setting the flag to False. Use "" for passing an empty string.')
         docs.append('')
-        self.docs['files']['CONFIGFILE'] = docs
+        self.docs['files'] = dict(self.docs['files'], CONFIGFILE=docs)
 
     def parse_files(self, files=None, sections=None):
         """Parse configfiles. 
@@ -1237,22 +2120,126 @@ class tui(TUIBase):
         files = _list(files, self.configfiles)
         sections = _list(sections, self.sections)
         for file in files:
+            literals = []
+            self.layers.append((file, literals))
+            for name, value, usedname, location in self._read_configfile(file, sections):
+                option = self.options[name]
+                if option.deferrable and self._keep_literals:
+                    literals.append((name, value, usedname, location))
+                if not self.deferred or not option.deferrable:
+                    option.parsestr(value, usedname, location)
+
+    def _read_configfile(self, file, sections):
+        """Return (name, literal, usedname, location) for the options set in a
+        configfile, without storing anything. Missing files set nothing.
+        
+        The file is remembered for .reload(), with its sections.
+        """
+        self._configstate[file] = (_filestat(file), sections)
+        try:
+            data = _prefetched(file)
+        except KeyError:
+            if not os.path.isfile(file):
+                return []
             parser = StrictConfigParser()
             parser.read(file)
-            for section in sections:
-                if not parser.has_section(section):
+        else:
+            if data is None:
+                return []
+            parser = StrictConfigParser()
+            parser.readfp(cStringIO.StringIO(data), file)
+        literals = []
+        for section in sections:
+            if not parser.has_section(section):
+                continue
+            for unused in parser.unusedoptions(section):
+                if unused not in self.options and unused not in self.ignore: 
+                    templ = "The option %r in section [%s] of file %s does not exist."
+                    raise InvalidOption(unused, message=templ % (unused, section, file))
+            for name in parser.options(section):          
+                if name in self.options:
+                    if self.options[name].reserved:
+                        templ = "The option %s in section [%s] of file %s is reserved for command line use."
+                        raise ReservedOptionError(name, message=templ % (name, section, file))
+                    location = '%s [%s]' % (file, section)
+                    literals.append((name, parser.get(section, name), name, location))
+        return literals
+
+    def reload(self, files=None):
+        """Re-read configfiles and recompute the values they affect.
+        
+        files is a list of configfiles to re-read. None means the ones read by
+        .parse_files() that have changed size or mtime since. Values are 
+        recomputed from all layers as in .resolve(), so settings from later 
+        configfiles and the command line still win. Options with reducers 
+        that fold values as they are parsed (see reducers.Reducer.deferrable)
+        keep their values until restart.
+        
+        Return a name:(old, new) dict for the options whose values changed. 
+        Its .skipped attribute is a sorted list of the options that are set 
+        in the re-read files but keep their values until restart. 
+        If a file can not be parsed, ParseError is raised and nothing is 
+        changed. If the tui is frozen, the snapshot is replaced once all 
+        values are recomputed, see .freeze(). See also tui.watch.
+        
+        Only works if the tui was made with reloadable=True (or deferred), 
+        since the literals from the command line are needed.
+        """
+        if not self._keep_literals:
+            raise ValueError('reload() needs a tui made with reloadable=True')
+        if files is None:
+            files = [file for file, (stat, sections) in self._configstate.items() if _filestat(file) != stat]
+        configstate = dict(self._configstate)
+        layers = list(self.layers)
+        names = set()
+        skipped = set()
+        try:
+            for i, (origin, literals) in enumerate(layers):
+                if origin not in files or origin not in configstate:
                     continue
-                for unused in parser.unusedoptions(section):
-                    if unused not in self.options and unused not in self.ignore: 
-                        templ = "The option %r in section [%s] of file %s does not exist."
-                        raise InvalidOption(unused, message=templ % (unused, section, file))
-                for name in parser.options(section):          
-                    if name in self.options:
-                        if self.options[name].reserved:
-                            templ = "The option %s in section [%s] of file %s is reserved for command line use."
-                            raise ReservedOptionError(message=templ % (unused, section, file))
-                        value = parser.get(section, name)
-                        self.options[name].parsestr(value, name, '%s [%s]' % (file, section))
+                entries = self._read_configfile(origin, configstate[origin][1])
+                skipped.update(entry[0] for entry in entries if not self.options[entry[0]].deferrable)
+                entries = [entry for entry in entries if self.options[entry[0]].deferrable]
+                names.update(entry[0] for entry in literals + entries)
+                layers[i] = (origin, entries)
+            winners = self._winners(layers)
+            old = dict((name, self.options[name].value) for name in names)
+            saved = [(self.options[name], self.options[name].save()) for name in names]
+            try:
+                for name in names:
+                    if name in winners:
+                        self.options[name].resolve(winners[name])
+                    else:
+                        self.options[name].reset()
+            except ParseError:
+                for option, state in saved:
+                    option.restore(state)
+                raise
+        except ParseError:
+            self._configstate = configstate
+            raise
+        self.layers = layers
+        changes = dict()
+        for name in names:
+            new = self.options[name].value
+            if new != old[name]:
+                changes[name] = (old[name], new)
+        if self._snapshot is not None and changes:
+            self._update_snapshot((name, new) for name, (old, new) in changes.items())
+        return _Changes(changes, sorted(skipped))
+
+    def _parse_option(self, option, argv, usedname, location, literals):
+        """Take the arguments for an option from argv, and convert them 
+        unless in deferred mode.
+        
+        Options with reducers that fold values into something of bounded size
+        are always converted right away, and their literals are not kept.
+        """
+        literal = option.take(argv, usedname)
+        if option.deferrable and self._keep_literals:
+            literals.append((option.name, literal, usedname, location))
+        if not self.deferred or not option.deferrable:
+            option.parseliteral(literal, usedname, location)
 
     def _parse_options(self, argv, location):
         """Parse the options part of an argument list.
@@ -1264,6 +2251,8 @@ class tui(TUIBase):
             
         """
         observed = []
+        literals = []
+        self.layers.append((location, literals))
         while argv:
             if argv[0].startswith('--'):
                 name = argv.pop(0)[2:]
@@ -1277,7 +2266,7 @@ class tui(TUIBase):
                     if option in observed:
                         raise OptionRecurrenceError(name)
                     observed.append(option)
-                option.parse(argv, name, location)
+                self._parse_option(option, argv, name, location, literals)
             elif argv[0].startswith('-'):
                 # A single - is not an abbreviation block, but the first positional arg.
                 if argv[0] == '-':
@@ -1294,7 +2283,7 @@ class tui(TUIBase):
                         if option in observed:
                             raise OptionRecurrenceError(option.name)
                         observed.append(option)
-                    option.parse(argv, '-' + abbreviation, location)
+                    self._parse_option(option, argv, '-' + abbreviation, location, literals)
             # only arguments that start with -- or - can be Options.
             else:
                 break
@@ -1333,35 +2322,148 @@ class tui(TUIBase):
         self._parse_options(argv, location)
         self._parse_positional_arguments(argv)
 
+    def resolve(self):
+        """Convert the literals that win for each option, and store the values.
+        
+        All literals collected by .parse_files() and .parse_argv() are 
+        considered, in the order they were collected. For most options only the
+        last one wins, but recurring options get all of them. Options that got
+        no literals are left alone, and so are options with reducers that 
+        fold values as they are parsed.
+        
+        Only needed in deferred mode (.launch() does this for you), but it 
+        is harmless otherwise. In lazy mode, conversion is left until the 
+        values are accessed.
+        
+        The help, version and other basic options are resolved first, and 
+        the rest in option order. If a literal can not be converted, the 
+        other options are still resolved (so that e.g. --help works even if a
+        configfile has a bad value) and the first ParseError is raised last.
+        """
+        winners = self._winners(self.layers)
+        order = self.basic_option_names.values() + self.option_order + sorted(winners)
+        error = None
+        for name in order:
+            if name not in winners:
+                continue
+            try:
+                self.options[name].resolve(winners.pop(name), self.lazy)
+            except ParseError, e:
+                error = error or e
+        if error:
+            raise error
+
+    # Whether literals are kept in .layers, see .resolve() and .reload().
+    _keep_literals = property(lambda self: self.deferred or self.reloadable)
+
+    def _winners(self, layers):
+        """Return a name:literals dict of the literals that win in layers."""
+        winners = dict()
+        for origin, literals in layers:
+            for entry in literals:
+                if self.options[entry[0]].recurring:
+                    winners.setdefault(entry[0], []).append(entry)
+                else:
+                    winners[entry[0]] = [entry]
+        return winners
+
+    def validate_all(self):
+        """Convert any option values that are still pending in lazy mode.
+        
+        Raise ParseError on the first bad value. Does nothing outside lazy 
+        mode, where values are converted by .resolve().
+        """
+        for option in self.options.values():
+            option.value
+
+    def _label(self, kind, param):
+        """Return the label for param in a help table of the given kind.
+        
+        kind is 'options', 'arguments' or 'settings'.
+        """
+        if kind == 'settings':
+            return param.name + ': '
+        if kind == 'arguments':
+            return param.displayname + ': '
+        label = '--' + param.name
+        if param.abbreviation:
+            label += ', -' + param.abbreviation
+        return label + ': '
+    
+    def _layout(self, kind, indent=0, maxindent=25):
+        """Return (params, labels, helpindent) for a help table.
+        
+        kind is 'options', 'arguments' or 'settings'. The layout is only 
+        computed once for each kind and indent, until a parameter is added. 
+        """
+        key = (kind, indent, maxindent)
+        layout = self._layouts.get(key)
+        if layout is None:
+            if kind == 'arguments':
+                params = list(self.positional_args)
+            else:
+                params = [self.options[name] for name in self.option_order]
+            margin = ' ' * indent
+            if kind == 'options':
+                margin = '%*s' % (indent, ' ')
+            labels = [margin + self._label(kind, p) for p in params]
+            helpindent = _autoindent(labels, indent, maxindent)
+            layout = self._layouts[key] = (params, labels, helpindent)
+        return layout
+    
+    def _itertable(self, layout, texts, width=0):
+        """Yield lines of labels and texts wrapped in two columns."""
+        params, labels, helpindent = layout
+        for label, text in itertools.izip(labels, texts):
+            for line in self._wrap_labelled(label, text, helpindent, width):
+                yield line
+
+    def iteroptionhelp(self, indent=0, maxindent=25, width=79):
+        """Yield the lines of .optionhelp() one by one."""
+        self._require_docs()
+        layout = self._layout('options', indent, maxindent)
+        texts = ("%s(%s). %s" % (o.formatname, o.strvalue, self._paramdocs(o)) for o in layout[0])
+        return self._itertable(layout, texts, width)
+
     def optionhelp(self, indent=0, maxindent=25, width=79):
         """Return user friendly help on program options."""
-        def makelabels(option):
-            labels = '%*s--%s' % (indent, ' ', option.name)
-            if option.abbreviation:
-                labels += ', -' + option.abbreviation
-            return labels + ': '
-        docs = []
-        helpindent = _autoindent([makelabels(o) for o in self.options.values()], indent, maxindent)
-        for name in self.option_order:
-            option = self.options[name]
-            labels = makelabels(option)
-            helpstring = "%s(%s). %s" % (option.formatname, option.strvalue, option.docs)
-            wrapped = self._wrap_labelled(labels, helpstring, helpindent, width)
-            docs.extend(wrapped)
-        return '\n'.join(docs)
+        return '\n'.join(self.iteroptionhelp(indent, maxindent, width))
+
+    def iterposarghelp(self, indent=0, maxindent=25, width=79):
+        """Yield the lines of .posarghelp() one by one."""
+        self._require_docs()
+        layout = self._layout('arguments', indent, maxindent)
+        texts = (p.formatname + '. ' + self._paramdocs(p) for p in layout[0])
+        return self._itertable(layout, texts, width)
 
     def posarghelp(self, indent=0, maxindent=25, width=79):
         """Return user friendly help on positional arguments in the program."""
-        docs = []
-        makelabel = lambda posarg: ' ' * indent + posarg.displayname + ': '
-        helpindent = _autoindent([makelabel(p) for p in self.positional_args], indent, maxindent)
-        for posarg in self.positional_args:
-            label = makelabel(posarg)
-            text = posarg.formatname + '. ' + posarg.docs
-            wrapped = self._wrap_labelled(label, text, helpindent, width)
-            docs.extend(wrapped)
-        return '\n'.join(docs)
+        return '\n'.join(self.iterposarghelp(indent, maxindent, width))
+        
+    def paramhelp(self, name, width=0, maxindent=25):
+        """Return user friendly help on a single option or positional argument.
         
+        name is anything accepted by .getparam(). Raise KeyError if there is no
+        such parameter. If docsfiles have only been indexed, only the docs for 
+        this parameter will be parsed.
+        """
+        param = self.getparam(name)
+        docs = param.docs
+        if self._unread_docsfiles is not None:
+            parsed = self.docsindex.parse('parameters', param.name)['parameters']
+            if param.name in parsed:
+                docs = parsed[param.name][0] % self.docvars
+        else:
+            docs = self._paramdocs(param)
+        if isinstance(param, Option):
+            label = self._label('options', param)
+            text = "%s(%s). %s" % (param.formatname, param.strvalue, docs)
+        else:
+            label = self._label('arguments', param)
+            text = param.formatname + '. ' + docs
+        helpindent = _autoindent([label], 0, maxindent)
+        return '\n'.join(self._wrap_labelled(label, text, helpindent, width))
+
     def format_usage(self, usage=None):
         """Return a formatted usage string. 
         
@@ -1369,9 +2471,11 @@ class tui(TUIBase):
         generate one.
         """
         if usage is None:
-            usage = self.docs['usage']
-        if usage is not None:
-            return usage[0] % self.docvars
+            usage = self._section('usage')
+        else:
+            usage = _docs(usage, self.docvars)
+        if usage:
+            return usage[0]
         usage = self.docvars['command']
         if self.basic_option_names.get('help'):
             usage += ' [--%s]' % self.basic_option_names.get('help')
@@ -1402,7 +2506,7 @@ class tui(TUIBase):
             width = self.width
         paragraph = text[0].lstrip()
         s = ' ' * (len(text[0]) - len(paragraph) + indent)
-        wrapped = textwrap.wrap(paragraph.strip(), width, initial_indent=s, subsequent_indent=s)
+        wrapped = self.textwrapper.wrap(paragraph.strip(), width, initial_indent=s, subsequent_indent=s)
         return '\n'.join(wrapped)
 
     def _wraptext(self, text, indent=0, width=0):
@@ -1413,7 +2517,7 @@ class tui(TUIBase):
         if not width:
             width = self.width
         s = ' ' * indent
-        wrapped = textwrap.wrap(helpstring, width, initial_indent=s, subsequent_indent=s)
+        wrapped = self.textwrapper.wrap(helpstring, width, initial_indent=s, subsequent_indent=s)
         if len(label) > indent:
             return [label] + wrapped
         wrapped[0] = label + ' ' * (indent - len(label)) + wrapped[0].lstrip()
@@ -1429,7 +2533,7 @@ class tui(TUIBase):
         """
         if not width:
             width = self.width
-        return textwrap.fill('USAGE: ' + self.format_usage(usage), width=width, subsequent_indent='    ...')
+        return self.textwrapper.fill('USAGE: ' + self.format_usage(usage), width=width, subsequent_indent='    ...')
 
     def versionhelp(self, width=0):
         """Return self.docvars['version']. 
@@ -1446,52 +2550,74 @@ class tui(TUIBase):
             self.iMaxHelpWidth.
 
         """
+        self._require_docs()
         out = []
-        out.append(self._wrap(self.docs['title'], width=width))
-        if self.docs['description']:
-            out.append(self._wrap(self.docs['description'], indent=2, width=width))
+        out.append(self._wrap(self._section('title'), width=width))
+        if self._section('description'):
+            out.append(self._wrap(self._section('description'), indent=2, width=width))
         out.append('')
         out.append(self._wrapusage(width=width))
         out.append('')
         return '\n'.join(out)
 
-    def customhelp(self, help_sections, width=0):
-        out = []
-        def heading(name):
-            out and not out[-1].isspace() and out.append('')
-            name and out.append(name.upper() + ':')
+    def itercustomhelp(self, help_sections, width=0):
+        """Yield the text of .customhelp() piece by piece.
+        
+        Joining the yielded strings with newlines gives .customhelp(). Help 
+        tables are yielded a line at a time, so output can be written as it 
+        is produced.
+        """
+        self._require_docs()
+        last = None
         for section in help_sections:
+            # heading is False for none, True for just a blank line, or a name.
+            heading = False
+            blocks = []
+            lines = ()
             if section == 'title':
-                out.append(self._wrap(self.docs[section], width=width))
+                blocks = [self._wrap(self._section(section), width=width)]
             elif section == 'description':
-                if self.docs[section]:
-                    out.append(self._wrap(self.docs[section], width=width, indent=2))
+                if self._section(section):
+                    blocks = [self._wrap(self._section(section), width=width, indent=2)]
             elif section == 'usage':
-                heading(None)
-                out.append(self._wrapusage(width=width))
+                heading = True
+                blocks = [self._wrapusage(width=width)]
             elif section == 'arguments':
                 if self.positional_args:
-                    heading(section)
-                    out.append(self.posarghelp(indent=2, width=width))
+                    heading = section
+                    lines = self.iterposarghelp(indent=2, width=width)
             elif section == 'options':
                 if self.options:
-                    heading(section)
-                    out.append(self.optionhelp(indent=2, width=width))
+                    heading = section
+                    lines = self.iteroptionhelp(indent=2, width=width)
             elif section == 'general':
-                if self.docs[section]:
-                    heading(None)
-                    out.append(self._wraptext(self.docs[section], width=width))
+                if self._section(section):
+                    heading = True
+                    blocks = [self._wraptext(self._section(section), width=width)]
             elif section == 'files':
-                if self.docs[section]:
-                    heading(section)
-                    for file, docs in self.docs[section].items():
-                        out.append('  %s:' % file)
-                        out.append(self._wraptext(docs, indent=4, width=width))
+                if self._section(section):
+                    heading = section
+                    for file, docs in self._section(section).items():
+                        blocks.append('  %s:' % file)
+                        blocks.append(self._wraptext(docs, indent=4, width=width))
             else:
-                if self.docs[section]:
-                    heading(section)
-                    out.append(self._wraptext(self.docs[section], indent=2, width=width))
-        return '\n'.join(out)
+                if self._section(section):
+                    heading = section
+                    blocks = [self._wraptext(self._section(section), indent=2, width=width)]
+            if heading:
+                if last is not None and not last.isspace():
+                    last = ''
+                    yield last
+                if heading is not True:
+                    last = heading.upper() + ':'
+                    yield last
+            for last in blocks:
+                yield last
+            for last in lines:
+                yield last
+
+    def customhelp(self, help_sections, width=0):
+        return '\n'.join(self.itercustomhelp(help_sections, width))
     
     def help(self, width=0):
         """Return the standard formatted command line help for the prog.
@@ -1499,6 +2625,10 @@ class tui(TUIBase):
         width is maximum allowed page width, use self.width if 0.
         """
         return self.customhelp(self.help_sections, width)
+
+    def iterhelp(self, width=0):
+        """Yield the text of .help() piece by piece, see .itercustomhelp()."""
+        return self.itercustomhelp(self.help_sections, width)
                 
     def longhelp(self, width=0):
         """Return the standard formatted help text for the prog. 
@@ -1509,6 +2639,10 @@ class tui(TUIBase):
         width is maximum allowed page width, use self.width if 0.
         """
         return self.customhelp(self.longhelp_sections, width)
+
+    def iterlonghelp(self, width=0):
+        """Yield the text of .longhelp() piece by piece, see .itercustomhelp()."""
+        return self.itercustomhelp(self.longhelp_sections, width)
                 
     def strsettings(self, indent=0, maxindent=25, width=0):
         """Return user friendly help on positional arguments.        
@@ -1521,38 +2655,446 @@ class tui(TUIBase):
         
         width is maximum allowed page width, use self.width if 0.
         """
-        out = []
-        makelabel = lambda name: ' ' * indent + name + ': '
-        settingsindent = _autoindent([makelabel(s) for s in self.options], indent, maxindent)
-        for name in self.option_order:
-            option = self.options[name]
-            label = makelabel(name)
-            settingshelp = "%s(%s): %s" % (option.formatname, option.strvalue, option.location)
-            wrapped = self._wrap_labelled(label, settingshelp, settingsindent, width)
-            out.extend(wrapped)
-        return '\n'.join(out)
+        return '\n'.join(self.iterstrsettings(indent, maxindent, width))
+
+    def iterstrsettings(self, indent=0, maxindent=25, width=0):
+        """Yield the lines of .strsettings() one by one."""
+        layout = self._layout('settings', indent, maxindent)
+        texts = ("%s(%s): %s" % (o.formatname, o.strvalue, o.location) for o in layout[0])
+        return self._itertable(layout, texts, width)
+
+    def settingstable(self, indent=0, width=0):
+        """Return program settings as a table of names, formats, values and origins.
+        
+        indent is the number of spaces preceeding the text on each line. 
+        
+        Values and origins are wrapped to share the space left over after the
+        name and format columns. If there is not enough room for that, return
+        .strsettings() instead.
+        
+        width is maximum allowed page width, use self.width if 0.
+        """
+        return '\n'.join(self.itersettingstable(indent, width))
+
+    def itersettingstable(self, indent=0, width=0):
+        """Yield the lines of .settingstable() one by one."""
+        if not width:
+            width = self.width
+        headings = ('NAME', 'FORMAT', 'VALUE', 'ORIGIN')
+        rows = [(o.name, o.formatname, o.strvalue, o.location) for o in self._layout('settings', indent)[0]]
+        widths = [max(len(row[i]) for row in rows + [headings]) for i in range(4)]
+        left = width - indent - widths[0] - widths[1] - 6
+        if left < 2 * len('VALUE'):
+            for line in self.iterstrsettings(indent=indent, width=width):
+                yield line
+            return
+        widths[2] = min(widths[2], max(left // 2, left - widths[3]))
+        widths[3] = left - widths[2]
+        margin = ' ' * indent
+        for row in [headings] + rows:
+            cells = [[row[0]], [row[1]]]
+            cells.extend(self.textwrapper.wrap(text, w) or [''] for text, w in zip(row[2:], widths[2:]))
+            for line in itertools.izip_longest(*cells, fillvalue=''):
+                yield (margin + '  '.join(c.ljust(w) for c, w in zip(line, widths))).rstrip()
 
     def settingshelp(self, width=0):
         """Return a summary of program options, their values and origins.
         
+        The settings are shown as a table (see .settingstable()) if width is at
+        least .settings_table_width.
+        
         width is maximum allowed page width, use self.width if 0.
         """
+        return '\n'.join(self.itersettingshelp(width))
+
+    def itersettingshelp(self, width=0):
+        """Yield the lines of .settingshelp() one by one."""
+        self._require_docs()
+        yield self._wrap(self._section('title'), width=width)
+        if self._section('description'):
+            yield self._wrap(self._section('description'), indent=2, width=width)
+        yield ''
+        yield 'SETTINGS:'
+        if self.settings_table_width and (width or self.width) >= self.settings_table_width:
+            lines = self.itersettingstable(indent=2, width=width)
+        else:
+            lines = self.iterstrsettings(indent=2, width=width)
+        line = None
+        for line in lines:
+            yield line
+        if line is None:
+            # An empty table still takes up a line.
+            yield ''
+        yield ''
+
+
+    def _hashspec(self, md5):
+        """Update md5 with everything but values that affects help output.
+        
+        Strings are hashed one by one rather than building a big structure to
+        repr, which is a lot faster for large parameter specs.
+        """
+        md5.update(repr([__version__, self.help_sections, self.longhelp_sections,
+                         sorted(self.docvars.items()), sorted(self.docs.items()),
+                         sorted((a, o.name) for a, o in self.abbreviations.items())]))
+        for name in self.option_order:
+            option = self.options[name]
+            md5.update('%r %r %r %r %r\n' % (name, option.formatname, option.format.docs,
+                                             option.reserved, option.docs))
+        for posarg in self.positional_args:
+            md5.update('%r %r %r %r %r %r %r\n' % (posarg.name, posarg.displayname, posarg.formatname,
+                                                  posarg.format.docs, posarg.optional, posarg.recurring, 
+                                                  posarg.docs))
+        for docsfile in self.docsfiles or []:
+            try:
+                st = os.stat(docsfile)
+                md5.update('%r %r %r\n' % (docsfile, st.st_size, st.st_mtime))
+            except OSError:
+                md5.update('%r\n' % docsfile)
+
+    def specfingerprint(self, *extra):
+        """Return a hex digest of the parameter spec, docs and docvars.
+        
+        This also covers the size and mtime of each docsfile (so that unparsed
+        docsfiles count too), and anything in extra.
+        """
+        import hashlib
+        md5 = hashlib.md5(repr(extra))
+        self._hashspec(md5)
+        return md5.hexdigest()
+
+    def fingerprint(self, *extra):
+        """Return a hex digest of everything that affects help output.
+        
+        Same as .specfingerprint(), but also covers current values and their 
+        origins. Anything in extra, e.g. the page width, is included as well.
+        """
+        import hashlib
+        md5 = hashlib.md5(repr(extra))
+        self._hashspec(md5)
+        for option in self._layout('settings')[0]:
+            md5.update('%r %r\n' % (option.strvalue, option.location))
+        return md5.hexdigest()
+
+    def _cachepath(self, name):
+        command = os.path.basename(self.docvars['command'])
+        return os.path.join(self.helpcache, '%s-%s' % (command, name))
+
+    def _readcache(self, name, key):
+        """Return the data cached under name, or None if not cached with key."""
+        try:
+            with open(self._cachepath(name), 'rb') as f:
+                if f.readline().rstrip('\n') == key:
+                    return f.read()
+        except IOError:
+            pass
+        return None
+
+    def _writecache(self, name, key, data):
+        """Atomically write data under name in the help cache, ignoring errors.
+        
+        Each name has one cache file, with key on the first line. Writing with 
+        a new key replaces the file, so the cache only holds the latest entry 
+        for each name.
+        """
+        path = self._cachepath(name)
+        tmppath = '%s.%s.tmp' % (path, os.getpid())
+        try:
+            if not os.path.isdir(self.helpcache):
+                os.makedirs(self.helpcache)
+            with open(tmppath, 'wb') as f:
+                f.write(key + '\n')
+                f.write(data)
+            os.rename(tmppath, path)
+        except (IOError, OSError):
+            pass
+
+    def cachedhelp(self, methodname, width=0):
+        """Return getattr(self, methodname)(width), cached if helpcache is set.
+        
+        Cache files are named <command>-<methodname>-<width>.txt, and hold 
+        the .fingerprint() of what they were rendered from, so they are 
+        replaced rather than added to when values, docs or docvars change. 
+        They are written to a temporary file first and then renamed, so that 
+        concurrent runs never see partial output. Failure to read or write the
+        cache is not an error.
+        """
+        return '\n'.join(self.itercachedhelp(methodname, width))
+
+    def itercachedhelp(self, methodname, width=0):
+        """Yield the text of .cachedhelp() piece by piece.
+        
+        On a cache miss, the help is yielded as it is rendered by 
+        getattr(self, 'iter' + methodname)(width), and cached when done.
+        """
+        method = getattr(self, 'iter' + methodname)
+        if not self.helpcache:
+            for text in method(width):
+                yield text
+            return
+        width = width or self.width
+        name = '%s-%s.txt' % (methodname, width)
+        key = self.fingerprint(methodname, width)
+        cached = self._readcache(name, key)
+        if cached is not None:
+            yield cached
+            return
         out = []
-        out.append(self._wrap(self.docs['title'], width=width))
-        if self.docs['description']:
-            out.append(self._wrap(self.docs['description'], indent=2, width=width))
-        out.append('')
-        out.append('SETTINGS:')
-        out.append(self.strsettings(indent=2, width=width))
-        out.append('')
-        return '\n'.join(out)
+        for text in method(width):
+            out.append(text)
+            yield text
+        self._writecache(name, key, '\n'.join(out))
+
+    def searchindex(self):
+        """Return a SearchIndex over the names and docs of all parameters.
+        
+        The index is built on first use, and kept in the help cache (if set) 
+        until the parameter spec, the docs or the docvars change.
+        """
+        if self._searchindex is not None:
+            return self._searchindex
+        import marshal
+        if self.helpcache:
+            key = self.specfingerprint('search')
+            try:
+                index = SearchIndex.fromstate(marshal.loads(self._readcache('search.marshal', key)))
+            except (EOFError, TypeError, ValueError):
+                index = None
+            if index is not None:
+                self._searchindex = index
+                return index
+        self._require_docs()
+        entries = []
+        for name in self.option_order:
+            option = self.options[name]
+            entries.append((name, [(name, 3), (option.formatname, 2), (self._paramdocs(option), 1)]))
+        for posarg in self.positional_args:
+            entries.append((posarg.name, [(posarg.name + ' ' + posarg.displayname, 3), 
+                                          (posarg.formatname, 2), 
+                                          (self._paramdocs(posarg), 1)]))
+        self._searchindex = SearchIndex(entries)
+        if self.helpcache:
+            self._writecache('search.marshal', key, marshal.dumps(self._searchindex.__getstate__(), 2))
+        return self._searchindex
+
+    def search_docs(self, query, limit=None):
+        """Return [(score, parameter)] for parameters matching query, best first.
+        
+        query is a string of words. A parameter matches if each word is the 
+        start of a word in its name, format name or docs. See SearchIndex.
+        limit (if given) is the maximum number of matches to return.
+        """
+        matches = self.searchindex().search(query, limit)
+        return [(score, self.getparam(name)) for score, name in matches]
+
+    def itersearchhelp(self, query, width=0, limit=None):
+        """Yield .paramhelp() for each parameter that matches query, best first."""
+        matches = self.search_docs(query, limit)
+        if not matches:
+            yield 'Nothing matches %r.' % query
+        for score, param in matches:
+            yield self.paramhelp(param.name, width)
+
+    def searchhelp(self, query, width=0, limit=None):
+        """Return help on the parameters that match query, see .search_docs()."""
+        return '\n'.join(self.itersearchhelp(query, width, limit))
+
+    def completions(self):
+        """Return (flags, candidates) for completion, see .complete().
+        
+        flags is a sorted list of all option names and abbreviations, with 
+        dashes. candidates is a dict of parameter name: sorted list of all 
+        arguments from the format, for formats with static_completion. 
+        These are built on first use, and kept in the help cache (if set) 
+        until the parameter spec, the docs or the docvars change.
+        """
+        if self._completions is not None:
+            return self._completions
+        import marshal
+        if self.helpcache:
+            key = self.specfingerprint('complete')
+            try:
+                completions = self._cachedcompletions(marshal.loads(self._readcache('complete.marshal', key)))
+            except (EOFError, TypeError, ValueError):
+                completions = None
+            if completions is not None:
+                self._completions = completions
+                return completions
+        flags = ['--' + name for name in self.options]
+        flags.extend('-' + abbreviation for abbreviation in self.abbreviations)
+        flags.sort()
+        candidates = dict()
+        for param in self.options.values() + self.positional_args:
+            if param.format.static_completion:
+                candidates[param.name] = sorted(param.format.complete(''))
+        self._completions = flags, candidates
+        if self.helpcache:
+            self._writecache('complete.marshal', key, marshal.dumps(self._completions, 2))
+        return self._completions
+
+    @staticmethod
+    def _cachedcompletions(data):
+        """Return (flags, candidates) from the help cache if valid, or None."""
+        try:
+            flags, candidates = data
+            if not (isinstance(flags, list) and isinstance(candidates, dict)):
+                return None
+            for word in flags + candidates.keys() + sum(candidates.values(), []):
+                if not isinstance(word, basestring):
+                    return None
+        except (TypeError, ValueError):
+            return None
+        return flags, candidates
+
+    def complete(self, words, cword=None):
+        """Return a list of completion candidates for words[cword].
+        
+        words is a command line split into words, including the command, and
+        cword is the index of the word to complete. None means the last word.
+        
+        Words that start with a dash are completed with option names, as long
+        as no positional arguments precede them. Other words are completed by
+        the .complete() method of the format of the option or positional 
+        argument that they belong to. Candidates from formats that have 
+        static_completion are looked up in .completions() instead.
+        
+        This is what a program answers when started with .completion_flag, 
+        followed by cword and words. The candidates are then printed one per 
+        line, without reading docs or configfiles, e.g:
+        myprog --tui-complete 2 myprog --mode f
+        """
+        if cword is None:
+            cword = len(words) - 1
+        prefix = words[cword] if cword < len(words) else ''
+        words = words[1:cword]
+        i = 0
+        options = True
+        while i < len(words):
+            word = words[i]
+            if word == '--':
+                i += 1
+                options = False
+                break
+            if not word.startswith('-') or word == '-':
+                break
+            if word.startswith('--'):
+                option = self.options.get(word[2:])
+            else:
+                option = self.abbreviations.get(word[-1])
+            nargs = 0
+            if option:
+                nargs = option.nargs
+                if nargs is None or nargs < 0:
+                    nargs = 1
+            i += 1 + nargs
+            if i > len(words):
+                return self._complete_param(option, prefix)
+        n = len(words) - i
+        if options and not n and prefix.startswith('-'):
+            return self._prefixed(self.completions()[0], prefix)
+        for posarg in self.positional_args:
+            nargs = posarg.nargs
+            if nargs is None or nargs < 1:
+                nargs = 1
+            if posarg.recurring or n < nargs:
+                return self._complete_param(posarg, prefix)
+            n -= nargs
+        return []
+
+    def _complete_param(self, param, prefix):
+        """Return completion candidates for an argument to param."""
+        if not param.format.static_completion:
+            return param.format.complete(prefix)
+        return self._prefixed(self.completions()[1][param.name], prefix)
+
+    def _prefixed(self, candidates, prefix):
+        """Return the items in the sorted list candidates that start with prefix."""
+        start = bisect.bisect_left(candidates, prefix)
+        stop = start
+        while stop < len(candidates) and candidates[stop].startswith(prefix):
+            stop += 1
+        return candidates[start:stop]
+
+    def _complete_if_asked(self, argv):
+        """Print completion candidates and exit if argv[1] is .completion_flag."""
+        if argv is None:
+            argv = sys.argv
+        if len(argv) > 1 and argv[1] == self.completion_flag:
+            self._complete_and_exit(argv[2:])
+
+    def _complete_and_exit(self, args):
+        """Print .complete() candidates for [cword] + words and exit."""
+        try:
+            candidates = self.complete(args[1:], int(args[0]))
+        except (IndexError, ValueError):
+            sys.exit('usage: %s %s CWORD WORDS...' % (self.docvars['command'], self.completion_flag))
+        for candidate in candidates:
+            print candidate
+        sys.exit()
+
+    def helpfilename(self, methodname, width=0):
+        """Return the basename of a prebuilt help file, see tui.generate."""
+        command = os.path.basename(self.docvars['command'])
+        return '%s-%s-%s.txt' % (command, methodname, width or self.width)
+
+    def prebuilthelp(self, methodname, width=0):
+        """Return getattr(self, methodname)(width) from helpdir, or None.
+        
+        None is returned if there is no helpdir, if there is no help file for
+        this width, or if any option but the basic options has been set, since
+        prebuilt help only shows builtin defaults.
+        """
+        if not self.helpdir:
+            return None
+        basic = set(self.basic_option_names.values())
+        for name, option in self.options.items():
+            if name not in basic and option.location != "Builtin default.":
+                return None
+        path = os.path.join(self.helpdir, self.helpfilename(methodname, width))
+        try:
+            with open(path) as f:
+                return f.read()
+        except IOError:
+            return None
+
+    def page(self, lines):
+        """Print lines as they come, through a pager if enabled.
+        
+        The pager is only used if stdout is a terminal, see the pager 
+        parameter to tui. If the user quits the pager early, the remaining
+        lines are discarded.
+        """
+        out = sys.stdout
+        pager = None
+        if self.pager and out.isatty():
+            command = self.pager
+            if command is True:
+                command = os.environ.get('PAGER') or 'less'
+            try:
+                import subprocess
+                pager = subprocess.Popen(command, shell=True, stdin=subprocess.PIPE)
+                out = pager.stdin
+            except OSError:
+                pass
+        try:
+            try:
+                for line in lines:
+                    print >> out, line
+            finally:
+                if pager:
+                    pager.stdin.close()
+                    pager.wait()
+        except IOError, e:
+            if e.errno != errno.EPIPE:
+                raise
 
     def launch(self,
                argv=None,
                showusageonnoargs=False,
                width=0,
                helphint="Use with --help for more information.\n",
-               debug_parser=False):
+               debug_parser=False,
+               files=True):
         """Do the usual stuff to initiallize the program.
         
         Read config files and parse arguments, and if the user has used any 
@@ -1576,7 +3118,14 @@ class tui(TUIBase):
         
         helphint is a string that hints on how to get more help which is 
         displayed at the end of usage help messages. 
+        
+        If files is false, configfiles are not parsed, e.g. because they 
+        already have been (see tui.server).
+        
+        If argv[1] is .completion_flag, print completion candidates and exit,
+        see .complete().
         """
+        self._complete_if_asked(argv)
         if showusageonnoargs and len(argv) == 1:
             print self.shorthelp(width=width)
             if helphint:
@@ -1584,16 +3133,46 @@ class tui(TUIBase):
             sys.exit(0)
         parsing_error = None
         try:
-            self.parse_files()
+            if files:
+                self.parse_files()
             self.parse_argv(argv)
         except ParseError, parsing_error:
             if debug_parser:
                 raise
-        for optiontype in ['help', 'longhelp', 'settings', 'version']:
+        if self.deferred:
+            # Resolve even if parsing failed, so help options still work.
+            try:
+                self.resolve()
+            except ParseError, e:
+                if debug_parser:
+                    raise
+                parsing_error = parsing_error or e
+        for optiontype in ['help', 'longhelp', 'paramhelp', 'searchhelp', 'settings', 'version']:
             name = self.basic_option_names.get(optiontype)
             if name and self[name]:
-                methodname = optiontype.rstrip('help') + 'help'
-                print getattr(self, methodname)(width)
+                # Only the settings summary shows values, so only it needs 
+                # them all converted. Help works even if values are bad.
+                if self.lazy and optiontype == 'settings':
+                    try:
+                        self.validate_all()
+                    except ParseError, e:
+                        self.graceful_exit(e, width)
+                if optiontype == 'paramhelp':
+                    try:
+                        print self.paramhelp(self[name], width)
+                    except KeyError:
+                        self.graceful_exit(InvalidOption(self[name]), width)
+                elif optiontype == 'searchhelp':
+                    self.page(self.itersearchhelp(self[name], width))
+                elif optiontype == 'version':
+                    print self.versionhelp(width)
+                else:
+                    methodname = optiontype.rstrip('help') + 'help'
+                    text = self.prebuilthelp(methodname, width)
+                    if text is None:
+                        self.page(self.itercachedhelp(methodname, width))
+                    else:
+                        self.page([text])
                 sys.exit()
         if parsing_error:
             self.graceful_exit(parsing_error, width)
@@ -0,0 +1,241 @@
+"""TUI Textual User Interface - A sane command line user interface.
+
+Author: Joel Hedlund <yohell@ifm.liu.se>
+
+This module generates static shell completion scripts for textual user
+interfaces, for bash, zsh and fish. The scripts are self-contained, so no
+python process is needed for completion. Values for Choice formats are
+embedded, and file and directory formats use the shell's own file completion.
+Choice values containing whitespace are split into several words by bash.
+
+Generate scripts at build time using tui.generate, e.g:
+
+python -m tui.generate -k bash -k zsh -k fish mymodule:make_ui
+
+For arguments that can not be known at build time, bash_dynamic() returns a 
+script that asks the program itself instead, see tui.complete().
+
+If you have problems with this package, please contact the author.
+
+"""
+__version__ = "2.0.0rc1"
+__copyright__ = "Copyright (c) 2026 Joel Hedlund."
+__license__ = "MIT"
+
+import os
+import re
+
+import formats
+
+# Shells that scripts can be generated for, and the file names to use.
+shells = dict(bash='%s.bash',
+              zsh='_%s',
+              fish='%s.fish')
+
+def action(format):
+    """Return how to complete arguments for format.
+
+    This is ('file', []), ('dir', []), ('choice', [values]) or ('none', []).
+    """
+    if isinstance(format, formats.Choice):
+        return 'choice', sorted(format.special)
+    if isinstance(format, formats.ReadableFile):
+        return 'file', []
+    if isinstance(format, formats.ReadableDir):
+        return 'dir', []
+    return 'none', []
+
+def summary(docs):
+    """Return the first sentence of docs, for use as a short description."""
+    docs = ' '.join(docs.split())
+    match = re.match(r'(.*?\.)(\s|$)', docs)
+    if match:
+        return match.group(1)
+    return docs
+
+def _spec(ui):
+    """Return (command, options, posargs) describing ui for completion.
+
+    options is a list of (name, abbreviation, nargs, recurring, action,
+    values, description) and posargs a list of (displayname, optional,
+    recurring, action, values, description).
+    """
+    ui._require_docs()
+    command = os.path.basename(ui.docvars['command'])
+    options = []
+    for name in ui.option_order:
+        option = ui.options[name]
+        kind, values = action(option.format)
+        options.append((name, option.abbreviation, option.nargs, option.recurring,
+                        kind, values, summary(ui._paramdocs(option))))
+    posargs = []
+    for posarg in ui.positional_args:
+        kind, values = action(posarg.format)
+        posargs.append((posarg.displayname, posarg.optional, posarg.recurring,
+                        kind, values, summary(ui._paramdocs(posarg))))
+    return command, options, posargs
+
+def _sh_quote(s):
+    """Quote s for use in a POSIX shell script."""
+    return "'" + s.replace("'", "'\\''") + "'"
+
+def _fish_quote(s):
+    """Quote s for use in a fish script."""
+    return "'" + s.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+def _flags(name, abbreviation):
+    flags = ['--' + name]
+    if abbreviation:
+        flags.append('-' + abbreviation)
+    return flags
+
+def bash(ui):
+    """Return a bash completion script for ui."""
+    command, options, posargs = _spec(ui)
+    function = '_tui_complete_' + re.sub(r'\W', '_', command)
+    compgen = dict(file='compgen -f -- "$cur"', dir='compgen -d -- "$cur"')
+    def complete(kind, values):
+        if kind == 'choice':
+            # compgen -W does quote removal on the words, so quote them twice.
+            words = ' '.join(re.sub(r'([^\w@%+=:,./-])', r'\\\1', v) for v in values)
+            return 'compgen -W %s -- "$cur"' % _sh_quote(words)
+        return compgen.get(kind, '')
+    out = ['# bash completion for %s, generated by tui.completion.' % command,
+           '%s()' % function,
+           '{',
+           '    local cur="${COMP_WORDS[COMP_CWORD]}"',
+           '    local prev="${COMP_WORDS[COMP_CWORD-1]}"',
+           '    COMPREPLY=()',
+           '    case "$prev" in']
+    for name, abbreviation, nargs, recurring, kind, values, docs in options:
+        if nargs:
+            out.append('        %s)' % '|'.join(_flags(name, abbreviation)))
+            if complete(kind, values):
+                out.append('            COMPREPLY=($(%s))' % complete(kind, values))
+            out.append('            return;;')
+    out.extend(['    esac',
+                '    if [[ "$cur" == -* ]]; then',
+                '        COMPREPLY=($(compgen -W %s -- "$cur"))' % _sh_quote(' '.join(f for o in options for f in _flags(o[0], o[1]))),
+                '        return',
+                '    fi',
+                '    local i skip=0 n=0',
+                '    for ((i=1; i<COMP_CWORD; i++)); do',
+                '        if ((skip)); then',
+                '            ((skip--))',
+                '            continue',
+                '        fi',
+                '        case "${COMP_WORDS[i]}" in'])
+    for name, abbreviation, nargs, recurring, kind, values, docs in options:
+        if nargs:
+            out.append('            %s) skip=%s;;' % ('|'.join(_flags(name, abbreviation)), nargs))
+    out.extend(['            -*) ;;',
+                '            *) ((n++));;',
+                '        esac',
+                '    done',
+                '    case $n in'])
+    for i, (displayname, optional, recurring, kind, values, docs) in enumerate(posargs):
+        pattern = recurring and '*' or str(i)
+        if complete(kind, values):
+            out.append('        %s) COMPREPLY=($(%s));;' % (pattern, complete(kind, values)))
+        else:
+            out.append('        %s) ;;' % pattern)
+    out.extend(['    esac',
+                '}',
+                'complete -o filenames -F %s %s' % (function, command),
+                ''])
+    return '\n'.join(out)
+
+def bash_dynamic(ui):
+    """Return a bash completion script for ui that runs the program to complete.
+    
+    The program is started with tui.completion_flag, and answers without 
+    reading docs or configfiles, see tui.complete(). It is started as typed
+    on the command line (e.g. ./prog), but as a single word and never as a
+    shell function or alias. A leading ~/ is expanded.
+    """
+    command = os.path.basename(ui.docvars['command'])
+    function = '_tui_complete_' + re.sub(r'\W', '_', command)
+    return '\n'.join(['# bash completion for %s, generated by tui.completion.' % command,
+                      '%s()' % function,
+                      '{',
+                      "    local IFS=$'\\n'",
+                      '    local program="${COMP_WORDS[0]}"',
+                      '    if [[ "$program" == "~/"* ]]; then',
+                      '        program="$HOME/${program#"~/"}"',
+                      '    fi',
+                      '    COMPREPLY=($(command -- "$program" %s "$COMP_CWORD" "${COMP_WORDS[@]}" 2>/dev/null))' % _sh_quote(ui.completion_flag),
+                      '}',
+                      'complete -o filenames -F %s %s' % (function, command),
+                      ''])
+
+def _zsh_escape(s):
+    """Escape s for use in an _arguments spec in single quotes."""
+    return re.sub(r'([\[\]:\\])', r'\\\1', s).replace("'", "'\\''")
+
+def zsh(ui):
+    """Return a zsh completion script for ui."""
+    command, options, posargs = _spec(ui)
+    def complete(kind, values):
+        if kind == 'choice':
+            values = (re.sub(r'([\s()\[\]:\\])', r'\\\1', v) for v in values)
+            action = '(%s)' % ' '.join(values)
+        else:
+            action = dict(file='_files', dir='_files -/').get(kind, ' ')
+        return action.replace("'", "'\\''")
+    out = ['#compdef %s' % command,
+           '# zsh completion for %s, generated by tui.completion.' % command,
+           '_arguments -s \\']
+    for name, abbreviation, nargs, recurring, kind, values, docs in options:
+        flags = _flags(name, abbreviation)
+        spec = '[%s]' % _zsh_escape(docs)
+        for i in range(nargs):
+            spec += ':%s:%s' % (_zsh_escape(name.upper()), complete(kind, values))
+        if recurring:
+            exclude = '*'
+        else:
+            exclude = '(%s)' % ' '.join(flags)
+        if len(flags) > 1:
+            out.append("  '%s'{%s}'%s' \\" % (exclude, ','.join(flags), spec))
+        else:
+            out.append("  '%s%s%s' \\" % (exclude, flags[0], spec))
+    for i, (displayname, optional, recurring, kind, values, docs) in enumerate(posargs):
+        position = recurring and '*' or str(i + 1)
+        colons = optional and not recurring and '::' or ':'
+        out.append("  '%s%s%s:%s' \\" % (position, colons, _zsh_escape(displayname), complete(kind, values)))
+    out[-1] = out[-1][:-2]
+    out.append('')
+    return '\n'.join(out)
+
+def fish(ui):
+    """Return a fish completion script for ui."""
+    command, options, posargs = _spec(ui)
+    out = ['# fish completion for %s, generated by tui.completion.' % command]
+    if not any(p[3] == 'file' for p in posargs):
+        out.append('complete -c %s -f' % _fish_quote(command))
+    for name, abbreviation, nargs, recurring, kind, values, docs in options:
+        line = 'complete -c %s -l %s' % (_fish_quote(command), _fish_quote(name))
+        if abbreviation:
+            line += ' %s %s' % (len(abbreviation) == 1 and '-s' or '-o', _fish_quote(abbreviation))
+        if nargs:
+            line += ' -r'
+            if kind == 'file':
+                line += ' -F'
+            elif kind == 'dir':
+                line += " -f -a '(__fish_complete_directories (commandline -ct))'"
+            elif kind == 'choice':
+                line += ' -f -a %s' % _fish_quote(' '.join(values))
+        line += ' -d %s' % _fish_quote(docs)
+        out.append(line)
+    for displayname, optional, recurring, kind, values, docs in posargs:
+        if kind == 'choice':
+            out.append('complete -c %s -a %s -d %s' % (_fish_quote(command), _fish_quote(' '.join(values)), _fish_quote(displayname)))
+        elif kind == 'dir':
+            out.append("complete -c %s -a '(__fish_complete_directories (commandline -ct))' -d %s" % (_fish_quote(command), _fish_quote(displayname)))
+    out.append('')
+    return '\n'.join(out)
+
+def script(ui, shell):
+    """Return a completion script for ui, for shell (one of .shells)."""
+    if shell not in shells:
+        raise ValueError('unsupported shell %r' % shell)
+    return globals()[shell](ui)
@@ -0,0 +1,85 @@
+"""TUI Textual User Interface - A sane command line user interface.
+
+Author: Joel Hedlund <yohell@ifm.liu.se>
+
+This module contains a fast drop-in replacement for textwrap.wrap and
+textwrap.fill, for the kind of text found in help output.
+
+The textwrap module splits text into chunks using a regex that handles
+hyphenated words and arbitrary whitespace. Text with single spaces between
+words, no hyphens and no other whitespace (which is most help text) is simply
+split on spaces here, and wrapped using the same rules as textwrap. Other text
+is handed to textwrap, so the output is always identical to textwrap output
+with the default settings.
+
+If you have problems with this package, please contact the author.
+
+"""
+__version__ = "2.0.0rc1"
+__copyright__ = "Copyright (c) 2026 Joel Hedlund."
+__license__ = "MIT"
+
+import re
+
+# Text that textwrap would chunk into anything other than words and single
+# spaces, or that would be changed by its whitespace munging.
+_unsafe = re.compile(r'[-\t\n\x0b\x0c\r]|  |^ | $')
+
+def wrap(text, width=70, initial_indent='', subsequent_indent='', **kw):
+    """Same as textwrap.wrap(text, width, initial_indent=..., ...).
+
+    Any other keyword arguments for textwrap.TextWrapper are passed on to
+    textwrap, as is text that the fast wrapping can not handle.
+    """
+    if (kw or width - max(len(initial_indent), len(subsequent_indent)) < 1
+        or _unsafe.search(text)):
+        import textwrap
+        return textwrap.wrap(text, width, initial_indent=initial_indent,
+                             subsequent_indent=subsequent_indent, **kw)
+    if not text:
+        return []
+    return _wrap_words(text.split(' '), width, initial_indent, subsequent_indent)
+
+def fill(text, width=70, initial_indent='', subsequent_indent='', **kw):
+    """Same as textwrap.fill(text, width, initial_indent=..., ...)."""
+    return '\n'.join(wrap(text, width, initial_indent, subsequent_indent, **kw))
+
+def _wrap_words(words, width, initial_indent, subsequent_indent):
+    """Wrap words like textwrap.TextWrapper._wrap_chunks() would.
+
+    words is a list of non-empty words that were separated by single spaces.
+    It is modified when long words are broken. Both indents must leave room
+    for at least one character.
+    """
+    lines = []
+    indent = initial_indent
+    i = 0
+    n = len(words)
+    while i < n:
+        space = width - len(indent)
+        word = words[i]
+        if len(word) > space:
+            # A word that does not fit on a line of its own is broken.
+            lines.append(indent + word[:space])
+            words[i] = word[space:]
+            indent = subsequent_indent
+            continue
+        line = [word]
+        length = len(word)
+        i += 1
+        while i < n:
+            word = words[i]
+            if length + 1 + len(word) > space:
+                if length < space and len(word) > space:
+                    # textwrap puts as much as fits of a long word after the
+                    # space (keeping the space if nothing fits).
+                    left = space - length - 1
+                    line.append(word[:left])
+                    words[i] = word[left:]
+                break
+            line.append(word)
+            length += 1 + len(word)
+            i += 1
+        lines.append(indent + ' '.join(line))
+        indent = subsequent_indent
+    return lines
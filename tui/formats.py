@@ -13,7 +13,6 @@ __license__ = "MIT"
 
 import os
 import re
-import shlex
 
 class FormatError(Exception):
     """Base class for exceptions raised while converting arguments to values."""
@@ -41,6 +40,23 @@ class BadNumberOfArguments(FormatError):
             message = "requires %d arguments and was given %d" % (required, given)
         self.message = message
 
+# Characters that make shlex do something other than split on whitespace: 
+# quotes, escapes and comments, plus the whitespace characters that 
+# str.split() honors but shlex does not. 
+_shlex_special = re.compile(r'[\'"\\#\x0b\x0c]')
+
+def split_args(argstr):
+    """Split a settings file value into a list of arguments.
+    
+    Gives the same result as shlex.split(argstr, comments=True), but plain 
+    values without quotes, escapes or comments are split using str.split(), 
+    which is a lot faster. 
+    """
+    if isinstance(argstr, str) and not _shlex_special.search(argstr):
+        return argstr.split()
+    import shlex
+    return shlex.split(argstr, comments=True)
+
 def default_presenter(value):
     s = str(value)
     for c in s:
@@ -58,6 +74,11 @@ class BaseFormat(object):
     # in most circumstances.
     nargs = 1
 
+    # Whether .complete() gives the same candidates as long as the format is
+    # unchanged, so that they can be cached. Formats that complete from the 
+    # file system or other changing sources should set this to False.
+    static_completion = True
+
     def __init__(self,
                  name=None,
                  nargs=None,     
@@ -109,7 +130,7 @@ class BaseFormat(object):
         NOTE: formats with nargs == 0 or None probably want to override this 
         method.
         """
-        argv = shlex.split(argstr, comments=True)
+        argv = split_args(argstr)
         if len(argv) != self.nargs:
             raise BadNumberOfArguments(self.nargs, len(argv))
         return self.parse(argv)
@@ -120,6 +141,37 @@ class BaseFormat(object):
         Lookup value in self.specials, or call .to_literal() if absent.
         """
 
+    def complete(self, prefix):
+        """Return a list of the arguments that start with prefix.
+        
+        Used for shell completion, see tui.complete(). The default is to 
+        complete the special values. Subclasses that know of other valid 
+        arguments can override this.
+        """
+        return sorted(s for s in self.special if s.startswith(prefix))
+
+def _complete_path(prefix, dirs=False):
+    """Return the sorted paths that start with prefix.
+    
+    Directories get a trailing slash, and other files are left out if dirs is
+    true. Hidden files are only included if prefix names a hidden file.
+    """
+    dirname, basename = os.path.split(prefix)
+    try:
+        names = os.listdir(os.path.expanduser(dirname or os.curdir))
+    except OSError:
+        return []
+    paths = []
+    for name in sorted(names):
+        if not name.startswith(basename) or (name.startswith('.') and not basename.startswith('.')):
+            continue
+        path = os.path.join(dirname, name)
+        if os.path.isdir(os.path.expanduser(path)):
+            paths.append(path + os.sep)
+        elif not dirs:
+            paths.append(path)
+    return paths
+
 def get_format(format):
     """Get a format object.
     
@@ -242,7 +294,7 @@ class Flag(Format):
         Use the values in self.true for True in settings files, or those in 
         self.false for False, case insensitive.
         """
-        argv = shlex.split(argstr, comments=True)
+        argv = split_args(argstr)
         if len(argv) != 1:
             raise BadNumberOfArguments(1, len(argv))
         arg = argv[0]
@@ -383,6 +435,7 @@ class ReadableFile(Format):
     """
     mode = 'r'
     default = ''
+    static_completion = False
     
     def to_python(self, literal):
         try:
@@ -391,6 +444,9 @@ class ReadableFile(Format):
             raise ValueError(e.strerror)
         return literal
 
+    def complete(self, prefix):
+        return super(ReadableFile, self).complete(prefix) + _complete_path(prefix)
+
 class WritableFile(ReadableFile):
     """A writable file, will be created if possible.
 
@@ -402,7 +458,11 @@ class WritableFile(ReadableFile):
 class ReadableDir(Format):
     """A readable directory."""
     default = '.'
+    static_completion = False
     
+    def complete(self, prefix):
+        return super(ReadableDir, self).complete(prefix) + _complete_path(prefix, dirs=True)
+
     def to_python(self, literal):
         if not os.access(literal, os.R_OK):
             raise ValueError('it does not exist')
@@ -526,8 +586,20 @@ class List(Metaformat):
         for k, v in self.special.items():
             if v == value:
                 return k
+        if value is None:
+            return default_presenter(value)
         return self.separator.join(self.format.present(v) for v in value)
 
+    static_completion = property(lambda self: self.format.static_completion)
+
+    def complete(self, prefix):
+        """Complete the last item in the list using self.format."""
+        head, separator, tail = prefix.rpartition(self.separator)
+        items = [head + separator + s for s in self.format.complete(tail)]
+        if not separator:
+            items = super(List, self).complete(prefix) + items
+        return items
+
 class Tuple(Metaformat):
     """A simple tuple metaformat."""
     separator = ':'
@@ -549,14 +621,20 @@ class Tuple(Metaformat):
         """
         self.format = []
         for f in format:
-            self.format.append(get_format(f))
+            f = get_format(f)
             if f.nargs == 0:
                 raise ValueError('format.nargs cannot be 0')
+            self.format.append(f)
         super(Tuple, self).__init__(**kw)
         self.separator = separator or self.__class__.separator
         if len(self.separator) >= len(format):
             raise ValueError('needs more formats than separator characters') 
         self.strip = strip
+        # Precompile the separator layout into a single regex; each group 
+        # holds everything up to the first occurrence of the next separator, 
+        # just like repeated .split(sep, 1) would.
+        groups = ['(.*?)' + re.escape(self.get_separator(i)) for i in range(1, len(self.format))]
+        self._splitter = re.compile(''.join(groups) + '(.*)$', re.DOTALL)
 
     def get_separator(self, i):
         """Return the separator that preceding format i, or '' for i == 0."""
@@ -591,9 +669,9 @@ class Tuple(Metaformat):
     def parse(self, argv):
         """Pop, parse and return the first arg from argv.
         
-        The arg will be repeatedly .split(x, 1) based on self.get_separator() and the 
-        (optionally stripped) items will be parsed by self.format and returned
-        as a list. 
+        The arg will be split on the separators given by self.get_separator() 
+        (each at its first occurrence, in order) and the (optionally stripped) 
+        items will be parsed by self.format and returned as a list. 
 
         Raise BadNumberOfArguments or BadArgument on errors.
          
@@ -601,25 +679,43 @@ class Tuple(Metaformat):
         """
         if not argv:
             raise BadNumberOfArguments(1, 0)
-        remainder = argv.pop(0)
-        lookup = self.casesensitive and remainder or remainder.lower()
+        return self.parse_argument(argv.pop(0))
+
+    def parse_argument(self, argument):
+        """Parse a single tuple literal.
+        
+        Raise BadArgument on errors.
+        """
+        lookup = self.casesensitive and argument or argument.lower()
         if lookup in self.special:
             return self.special[lookup]
+        m = self._splitter.match(argument)
+        if not m:
+            raise BadArgument(argument, 'does not contain required separator ' + repr(self._missing_separator(argument)))
         values = []
-        for i, format in enumerate(self.format[:-1]):
-            print i, self.get_separator(i)
-            try:
-                arg, remainder = remainder.split(self.get_separator(i + 1), 1)
-            except:
-                raise BadArgument(remainder, 'does not contain required separator ' + repr(self.get_separator(i + 1)))
+        for format, arg in zip(self.format, m.groups()):
             if self.strip:
                 arg = arg.strip()
             values.append(format.parse([arg]))
-        if self.strip:
-            remainder = remainder.strip()
-        values.append(format.parse([remainder]))
         return values
-    
+        
+    def parse_many(self, arguments):
+        """Parse an iterable of tuple literals and return a list of values.
+        
+        Useful for recurring options, where the same layout is parsed over 
+        and over again. Raise BadArgument on errors.
+        """
+        return [self.parse_argument(argument) for argument in arguments]
+
+    def _missing_separator(self, argument):
+        """Return the first separator that argument does not contain."""
+        for i in range(1, len(self.format)):
+            separator = self.get_separator(i)
+            try:
+                argument = argument.split(separator, 1)[1]
+            except IndexError:
+                return separator
+
     def present(self, value):
         """Return a user-friendly representation of a value.
         
@@ -628,5 +724,7 @@ class Tuple(Metaformat):
         for k, v in self.special.items():
             if v == value:
                 return k
+        if value is None:
+            return default_presenter(value)
         return ''.join(self.get_separator(i) + self.format[i].present(v) for i, v in enumerate(value))
     
\ No newline at end of file
@@ -0,0 +1,249 @@
+"""TUI Textual User Interface - A sane command line user interface.
+
+Author: Joel Hedlund <yohell@ifm.liu.se>
+
+This module generates static help for textual user interfaces at build time:
+help texts in a set of page widths, a troff man page, a Markdown reference,
+and shell completion scripts (see tui.completion). Installed programs can then
+serve help from these files (see the helpdir parameter to tui) instead of
+parsing docsfiles and wrapping text at runtime.
+
+Usage: python -m tui.generate [OPTIONS] SPEC
+
+SPEC is module:attribute, where attribute is a tui instance or a function that
+returns one. The module is imported, so it must not launch the tui on import.
+
+If you have problems with this package, please contact the author.
+
+"""
+__version__ = "2.0.0rc1"
+__copyright__ = "Copyright (c) 2026 Joel Hedlund."
+__license__ = "MIT"
+
+import os
+import re
+import sys
+
+from tui import (Option,
+                 Posarg,
+                 completion,
+                 formats,
+                 tui)
+
+# All kinds of files that can be generated.
+kinds = ['text', 'man', 'markdown'] + sorted(completion.shells)
+
+def load(spec, call=True):
+    """Return the tui given by a module:attribute spec, without launching it.
+
+    If the attribute is callable (e.g. a factory function) and not itself a
+    tui, it is called without arguments and should return a tui. If call is
+    false, the factory itself is returned instead.
+    """
+    modulename, sep, attribute = spec.partition(':')
+    if not sep or not modulename or not attribute:
+        raise ValueError('spec must be module:attribute')
+    __import__(modulename)
+    obj = sys.modules[modulename]
+    for name in attribute.split('.'):
+        obj = getattr(obj, name)
+    if not isinstance(obj, tui) and callable(obj):
+        if not call:
+            return obj
+        obj = obj()
+    if not isinstance(obj, tui):
+        raise ValueError('%s is not a tui' % spec)
+    return obj
+
+def helptext(ui, methodname, width):
+    """Return getattr(ui, methodname)(width) as printed by ui.launch().
+
+    The option that requests this help is set while rendering, since it is
+    set when the help is printed at runtime.
+    """
+    optiontype = dict(help='help', longhelp='longhelp')[methodname]
+    name = ui.basic_option_names.get(optiontype)
+    if not name:
+        return getattr(ui, methodname)(width)
+    option = ui.options[name]
+    value = option.value
+    option.value = True
+    try:
+        return getattr(ui, methodname)(width)
+    finally:
+        option.value = value
+
+def _troff(text):
+    """Escape text for use in troff."""
+    text = text.replace('\\', '\\e').replace('-', '\\-')
+    return re.sub(r"(?m)^([.'])", r'\\&\1', text)
+
+def _paragraphs(text):
+    """Yield (indent, paragraph) for the non-blank paragraphs in docs text."""
+    for paragraph in text:
+        stripped = paragraph.lstrip()
+        if stripped:
+            yield len(paragraph) - len(stripped), stripped.strip()
+
+def _other_sections(ui):
+    """Yield (name, text) for the non-standard sections in longhelp."""
+    skip = set(['title', 'description', 'usage', 'arguments', 'options', 'general'])
+    for name in ui.longhelp_sections:
+        if name not in skip and ui._section(name):
+            yield name, ui._section(name)
+
+def manpage(ui, section=1):
+    """Return a troff man page for ui, for use with man -l or in MANPATH."""
+    ui._require_docs()
+    command = ui.docvars['command']
+    out = []
+    def paragraphs(text):
+        for indent, paragraph in _paragraphs(text):
+            if indent:
+                out.append('.RS %s' % indent)
+            out.append('.PP')
+            out.append(_troff(paragraph))
+            if indent:
+                out.append('.RE')
+    out.append('.TH "%s" "%s" "" "%s" ""' % (_troff(command.upper()), section, _troff(ui._section('title')[0])))
+    out.append('.SH NAME')
+    out.append('%s \\- %s' % (_troff(command), _troff(' '.join(ui._section('description')) or ui._section('title')[0])))
+    out.append('.SH SYNOPSIS')
+    out.append(_troff(ui.format_usage()))
+    if ui._section('description') or ui._section('general'):
+        out.append('.SH DESCRIPTION')
+        paragraphs(ui._section('description'))
+        paragraphs(ui._section('general'))
+    if ui.positional_args:
+        out.append('.SH ARGUMENTS')
+        for posarg in ui.positional_args:
+            out.append('.TP')
+            out.append('\\fI%s\\fR' % _troff(posarg.displayname))
+            out.append(_troff('%s. %s' % (posarg.formatname, ui._paramdocs(posarg))))
+    if ui.options:
+        out.append('.SH OPTIONS')
+        for name in ui.option_order:
+            option = ui.options[name]
+            labels = '\\fB\\-\\-%s\\fR' % _troff(name)
+            if option.abbreviation:
+                labels += ', \\fB\\-%s\\fR' % _troff(option.abbreviation)
+            out.append('.TP')
+            out.append(labels)
+            out.append(_troff('%s(%s). %s' % (option.formatname, option.strvalue, ui._paramdocs(option))))
+    for name, text in _other_sections(ui):
+        out.append('.SH %s' % _troff(name.upper()))
+        if name == 'files':
+            for filename, docs in text.items():
+                out.append('.SS %s' % _troff(filename))
+                paragraphs(docs)
+        else:
+            paragraphs(text)
+    return '\n'.join(out) + '\n'
+
+def _md(text):
+    """Escape text for use in Markdown."""
+    return re.sub(r'([\\`*_\[\]<>#|])', r'\\\1', text)
+
+def markdown(ui):
+    """Return a Markdown reference for ui."""
+    ui._require_docs()
+    out = []
+    def paragraphs(text):
+        for indent, paragraph in _paragraphs(text):
+            out.append(('> ' if indent else '') + _md(paragraph))
+            out.append('')
+    out.append('# %s' % _md(ui.docvars['command']))
+    out.append('')
+    out.append(_md(ui._section('title')[0]))
+    out.append('')
+    paragraphs(ui._section('description'))
+    out.append('## Usage')
+    out.append('')
+    out.append('    ' + ui.format_usage())
+    out.append('')
+    if ui.positional_args:
+        out.append('## Arguments')
+        out.append('')
+        for posarg in ui.positional_args:
+            out.append('* `%s`: %s. %s' % (posarg.displayname, _md(posarg.formatname), _md(ui._paramdocs(posarg))))
+        out.append('')
+    if ui.options:
+        out.append('## Options')
+        out.append('')
+        for name in ui.option_order:
+            option = ui.options[name]
+            labels = '`--%s`' % name
+            if option.abbreviation:
+                labels += ', `-%s`' % option.abbreviation
+            out.append('* %s: %s(%s). %s' % (labels, _md(option.formatname), _md(option.strvalue), _md(ui._paramdocs(option))))
+        out.append('')
+    paragraphs(ui._section('general'))
+    for name, text in _other_sections(ui):
+        out.append('## %s' % _md(name.capitalize()))
+        out.append('')
+        if name == 'files':
+            for filename, docs in text.items():
+                out.append('### `%s`' % filename)
+                out.append('')
+                paragraphs(docs)
+        else:
+            paragraphs(text)
+    return '\n'.join(out)
+
+def generate(ui, outdir, widths=(79,), kinds=kinds):
+    """Write help files for ui to outdir and return their paths.
+
+    kinds is any of 'text' (help and longhelp in each of the given widths,
+    named by ui.helpfilename() so that they can be found using helpdir),
+    'man' (<command>.1), 'markdown' (<command>.md), and 'bash', 'zsh' and
+    'fish' (completion scripts, named as in tui.completion.shells).
+    """
+    if not os.path.isdir(outdir):
+        os.makedirs(outdir)
+    command = os.path.basename(ui.docvars['command'])
+    files = []
+    if 'text' in kinds:
+        for width in widths:
+            for methodname in ['help', 'longhelp']:
+                files.append((ui.helpfilename(methodname, width), helptext(ui, methodname, width)))
+    if 'man' in kinds:
+        files.append((command + '.1', manpage(ui)))
+    if 'markdown' in kinds:
+        files.append((command + '.md', markdown(ui)))
+    for shell in sorted(completion.shells):
+        if shell in kinds:
+            files.append((completion.shells[shell] % command, completion.script(ui, shell)))
+    paths = []
+    for filename, text in files:
+        path = os.path.join(outdir, filename)
+        with open(path, 'w') as f:
+            f.write(text)
+        paths.append(path)
+    return paths
+
+def main(argv=None):
+    """Run the tui.generate command line interface."""
+    ui = tui([Option('outdir', 'String', 'o', default='.',
+                     docs='Directory to write the generated files to.'),
+              Option('width', 'Int', 'w', recurring=True,
+                     docs='Page width for help texts. Default is 79.'),
+              Option('kind', formats.Choice(kinds), 'k', recurring=True,
+                     docs='What to generate. Default is all kinds.'),
+              Posarg('spec', 'String',
+                     docs='module:attribute, where attribute is a tui or a function that returns one.')],
+             progname='tui.generate',
+             command='python -m tui.generate',
+             description='Generate static help texts, a man page, a Markdown reference and shell completion scripts from a tui spec.',
+             version=__version__,
+             configfiles=[],
+             argv=argv)
+    sys.path.insert(0, os.getcwd())
+    try:
+        target = load(ui['spec'])
+    except (ImportError, AttributeError, ValueError), e:
+        ui.graceful_exit(e)
+    for path in generate(target, ui['outdir'], ui['width'] or [79], ui['kind'] or kinds):
+        print path
+
+if __name__ == '__main__':
+    main()
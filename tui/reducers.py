@@ -0,0 +1,164 @@
+"""TUI Textual User Interface - A sane command line user interface.
+
+Author: Joel Hedlund <yohell@ifm.liu.se>
+
+This module contains reducers that decide how the values of recurring options
+are accumulated in textual user interfaces.
+
+If you have problems with this package, please contact the author.
+
+"""
+__version__ = "2.0.0rc1"
+__copyright__ = "Copyright (c) 2026 Joel Hedlund."
+__license__ = "MIT"
+
+import formats
+
+class Reducer(object):
+    """Base for the reducer API.
+
+    A reducer folds each new value into the accumulated value of an option,
+    which starts out as the option default.
+    """
+    # Default for options that do not give one.
+    default = None
+
+    # Whether raw literals can be kept and converted later. Reducers that fold
+    # values into something of bounded size should leave this False, so that
+    # values are folded as they are parsed and nothing else is kept around.
+    deferrable = False
+
+    def initial(self, default):
+        """Return a fresh accumulated value, given the option default."""
+        return default
+
+    def __call__(self, accumulated, value):
+        """Fold value into accumulated and return the result."""
+        return value
+
+    def present(self, accumulated, format):
+        """Return a user-friendly representation of an accumulated value."""
+        return format.present(accumulated)
+
+class Append(Reducer):
+    """Keep all values in a list, in parsing order."""
+    default = ()
+    deferrable = True
+
+    def initial(self, default):
+        # A fresh list, so that appending does not change the default. Other
+        # defaults (e.g. None) are used as they are.
+        if isinstance(default, (list, tuple)):
+            return list(default)
+        return default
+
+    def __call__(self, accumulated, value):
+        accumulated.append(value)
+        return accumulated
+
+    def present(self, accumulated, format):
+        return ', '.join(format.present(v) for v in accumulated)
+
+class Count(Reducer):
+    """Count the number of times the option is used.
+
+    False values are not counted, so that flags that are switched off in
+    configfiles do not add to the count.
+    """
+    default = 0
+
+    def __call__(self, accumulated, value):
+        if value is False:
+            return accumulated
+        return accumulated + 1
+
+    def present(self, accumulated, format):
+        return str(accumulated)
+
+class Sum(Reducer):
+    """Add up all values."""
+    default = 0
+
+    def __call__(self, accumulated, value):
+        return accumulated + value
+
+class Min(Reducer):
+    """Keep the smallest value."""
+
+    def __call__(self, accumulated, value):
+        if accumulated is None or value < accumulated:
+            return value
+        return accumulated
+
+class Max(Reducer):
+    """Keep the largest value."""
+
+    def __call__(self, accumulated, value):
+        if accumulated is None or value > accumulated:
+            return value
+        return accumulated
+
+class Set(Append):
+    """Keep the distinct values in a set. The default must be iterable."""
+    deferrable = False
+
+    def initial(self, default):
+        return set(default)
+
+    def __call__(self, accumulated, value):
+        accumulated.add(value)
+        return accumulated
+
+    def present(self, accumulated, format):
+        return ', '.join(sorted(format.present(v) for v in accumulated))
+
+class Last(Append):
+    """Keep only the last few values, oldest first. The default must be iterable."""
+    deferrable = False
+
+    def __init__(self, maxlen=1):
+        """maxlen is the number of values to keep."""
+        if maxlen < 1:
+            raise ValueError('maxlen must be at least 1')
+        self.maxlen = maxlen
+
+    def initial(self, default):
+        import collections
+        return collections.deque(default, self.maxlen)
+
+class Function(Reducer):
+    """Fold values using a custom function(accumulated, value)."""
+
+    def __init__(self, function):
+        self.function = function
+
+    def __call__(self, accumulated, value):
+        return self.function(accumulated, value)
+
+    def present(self, accumulated, format):
+        return formats.default_presenter(accumulated)
+
+def get_reducer(reducer):
+    """Get a reducer object.
+
+    If reducer is a reducer object, return unchanged. If it is a string
+    matching one of the Reducer subclasses in the tui.reducers module (case
+    insensitive), return an instance of that class. If it is a Reducer
+    subclass, return an instance of it. Otherwise assume it is a function that
+    takes the accumulated value and a new value and returns their combination,
+    and wrap it in a Function reducer. Raise ValueError on error.
+    """
+    if isinstance(reducer, Reducer):
+        return reducer
+    if isinstance(reducer, basestring):
+        for name, reducerclass in globals().items():
+            if name.lower() == reducer.lower():
+                if not isinstance(reducerclass, type) or not issubclass(reducerclass, Reducer):
+                    raise ValueError('%s is not the name of a reducer class' % reducer)
+                return reducerclass()
+        raise ValueError('no such reducer')
+    if isinstance(reducer, type) and issubclass(reducer, Reducer):
+        return reducer()
+    if callable(reducer):
+        return Function(reducer)
+    raise ValueError('no such reducer')
@@ -0,0 +1,362 @@
+"""TUI Textual User Interface - A sane command line user interface.
+
+Author: Joel Hedlund <yohell@ifm.liu.se>
+
+This module runs textual user interfaces as local servers, so that short lived
+programs can get their settings, help and error messages without paying for
+interpreter startup and tui construction on every run.
+
+A server holds a tui with its docs read and its configfiles parsed, and
+answers requests on a Unix socket, one at a time. A request is a line of JSON
+with the argv, environment, working directory and page width of the client.
+The server parses the configfiles (again, only if they have changed) and argv
+the way tui.launch() would, in the client's environment and working
+directory, and replies with a marshalled dict:
+
+status is None if the program should run, and then values is the name:value
+dict of all settings. Otherwise status is the exit status (as given to
+sys.exit()), e.g. after printing help or an error message. stdout and stderr
+hold whatever the tui printed.
+
+Start a server with e.g:
+
+python -m tui.server ~/.myprog.sock mymodule:make_ui
+
+where make_ui returns a tui made with launch=False, and have the program ask
+it for its settings first:
+
+from tui import server
+settings = server.client(os.path.expanduser('~/.myprog.sock'))
+if settings is None:
+    # No server, so do it the usual way.
+    settings = make_ui().launch() or ...
+
+The socket is only accessible to the user running the server, and clients 
+only connect to sockets owned by the user running them. Replies are read with
+marshal, which can not run code when loaded, so settings values must be of 
+the types marshal supports (e.g. strings, numbers, lists, tuples and dicts).
+
+If you have problems with this package, please contact the author.
+
+"""
+__version__ = "2.0.0rc1"
+__copyright__ = "Copyright (c) 2026 Joel Hedlund."
+__license__ = "MIT"
+
+import cStringIO
+import errno
+import json
+import marshal
+import os
+import signal
+import socket
+import stat
+import sys
+
+from tui import (ParseError,
+                 Posarg,
+                 generate,
+                 tui)
+
+def _str(obj):
+    """Return obj decoded from JSON with unicode strings encoded as utf-8."""
+    if isinstance(obj, unicode):
+        return obj.encode('utf-8')
+    if isinstance(obj, list):
+        return [_str(item) for item in obj]
+    if isinstance(obj, dict):
+        return dict((_str(key), _str(value)) for key, value in obj.items())
+    return obj
+
+def _stat(paths):
+    """Return a key for paths that changes when any of the files change."""
+    key = []
+    for path in paths or []:
+        try:
+            st = os.stat(path)
+            key.append((path, st.st_size, st.st_mtime))
+        except OSError:
+            key.append((path, None))
+    return key
+
+class Server(object):
+    """Answer requests for a tui on a Unix socket."""
+
+    def __init__(self, make_ui, path):
+        """
+        make_ui is a function that returns a tui made with launch=False. It
+        is called again whenever a docsfile has changed. A tui is also
+        accepted, but then changes to docsfiles are not picked up.
+
+        path is the path of the Unix socket to listen on. A stale socket
+        file (refusing connections) is removed first. Raise ValueError if a
+        server is already listening there, or if path is not a socket.
+        """
+        self.make_ui = make_ui
+        self.path = path
+        self.ui = None
+        self._build()
+        if _listening(path):
+            raise ValueError('a server is already listening on %s' % path)
+        if os.path.lexists(path):
+            if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                raise ValueError('%s exists and is not a socket' % path)
+            os.unlink(path)
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0177)
+        try:
+            self.socket.bind(path)
+        finally:
+            os.umask(umask)
+        self.socket.listen(16)
+
+    def _build(self):
+        """Make the tui, and remember its pristine state."""
+        if isinstance(self.make_ui, tui):
+            if self.ui is not None:
+                return
+            self.ui = self.make_ui
+        else:
+            self.ui = self.make_ui()
+        self._docskey = _stat(self.ui.docsfiles)
+        self._pristine = self._state()
+        self._configkey = None
+        self._configured = None
+
+    def _state(self):
+        """Return a snapshot of the values of all options, see ._restore()."""
+        state = [(option, option.save()) for option in self.ui.options.values()]
+        return state, list(self.ui.layers)
+
+    def _restore(self, snapshot):
+        """Restore option values from a snapshot, and clear positional args."""
+        state, layers = snapshot
+        for option, saved in state:
+            option.restore(saved)
+        for posarg in self.ui.positional_args:
+            posarg.value = None
+        self.ui.layers = list(layers)
+
+    def _launch(self, argv):
+        """Parse configfiles (if changed) and argv, as tui.launch() would."""
+        if _stat(self.ui.docsfiles) != self._docskey:
+            self._build()
+        configkey = _stat(self.ui.configfiles)
+        if configkey != self._configkey:
+            self._restore(self._pristine)
+            try:
+                self.ui.parse_files()
+            except ParseError:
+                # Let .launch() report it, and try again next time.
+                self._restore(self._pristine)
+                self._configkey = None
+                self.ui.launch(argv)
+                return self.ui.dict()
+            self._configkey = configkey
+            self._configured = self._state()
+        self._restore(self._configured)
+        self.ui.launch(argv, files=False)
+        return self.ui.dict()
+
+    def handle(self, req):
+        """Return the reply dict for a request dict, see the module docs."""
+        reply = dict(status=None, values=None, stdout='', stderr='')
+        environ = dict(os.environ)
+        cwd = os.getcwd()
+        width = self.ui.width
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = cStringIO.StringIO(), cStringIO.StringIO()
+        try:
+            if req.get('env') is not None:
+                os.environ.clear()
+                os.environ.update(req['env'])
+            if req.get('cwd'):
+                os.chdir(req['cwd'])
+            if req.get('width'):
+                self.ui.width = req['width']
+            try:
+                reply['values'] = self._launch(list(req.get('argv') or [self.ui.docvars['command']]))
+            except ParseError, e:
+                # Lazy conversion errors turn up when values are accessed.
+                self.ui.graceful_exit(e)
+        except SystemExit, e:
+            reply['values'] = None
+            if e.code is None or isinstance(e.code, int):
+                reply['status'] = e.code or 0
+            else:
+                print >> sys.stderr, e.code
+                reply['status'] = 1
+        except Exception, e:
+            reply['values'] = None
+            reply['status'] = 1
+            print >> sys.stderr, 'ERROR: %s: %s' % (e.__class__.__name__, e)
+        finally:
+            reply['stdout'] = sys.stdout.getvalue()
+            reply['stderr'] = sys.stderr.getvalue()
+            sys.stdout, sys.stderr = stdout, stderr
+            self.ui.width = width
+            os.chdir(cwd)
+            if req.get('env') is not None:
+                os.environ.clear()
+                os.environ.update(environ)
+        try:
+            return marshal.dumps(reply, 2)
+        except ValueError, e:
+            reply.update(values=None, status=1, stderr='ERROR: settings can not be marshalled: %s\n' % e)
+            return marshal.dumps(reply, 2)
+
+    def handle_request(self):
+        """Wait for and answer a single request."""
+        connection, address = self.socket.accept()
+        try:
+            data = _receive(connection)
+            if data:
+                connection.sendall(self.handle(_str(json.loads(data))))
+        except (socket.error, ValueError):
+            pass
+        finally:
+            connection.close()
+
+    def serve_forever(self):
+        """Answer requests until interrupted."""
+        while True:
+            self.handle_request()
+
+    def close(self):
+        """Stop listening and remove the socket file."""
+        self.socket.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+def _listening(path, timeout=1):
+    """Return True if a server accepts connections on the socket at path.
+
+    Return False if there is no such file or the connection is refused. Other
+    errors (e.g. a timeout, from a server too busy to accept) are raised.
+    Nothing is sent, so a server that accepts just sees an empty request.
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(timeout)
+    try:
+        connection.connect(path)
+    except socket.error, e:
+        if e.errno in (errno.ECONNREFUSED, errno.ENOENT):
+            return False
+        raise
+    finally:
+        connection.close()
+    return True
+
+def _receive(connection):
+    """Read everything from connection until the other end stops sending."""
+    chunks = []
+    while True:
+        chunk = connection.recv(65536)
+        if not chunk:
+            return ''.join(chunks)
+        chunks.append(chunk)
+
+def _check_owner(path):
+    """Raise socket.error unless path is a socket owned by the current user."""
+    try:
+        st = os.lstat(path)
+    except OSError, e:
+        raise socket.error(e.errno, e.strerror)
+    if not stat.S_ISSOCK(st.st_mode):
+        raise socket.error(errno.ENOTSOCK, '%s is not a socket' % path)
+    if st.st_uid != os.getuid():
+        raise socket.error(errno.EPERM, '%s is owned by another user' % path)
+
+def _load_reply(data):
+    """Return the reply dict from data, or raise ValueError if malformed."""
+    try:
+        reply = marshal.loads(data)
+    except (EOFError, TypeError, ValueError):
+        raise ValueError('malformed reply')
+    if not (isinstance(reply, dict)
+            and isinstance(reply.get('stdout'), str)
+            and isinstance(reply.get('stderr'), str)
+            and (reply.get('status') is None or isinstance(reply['status'], (int, long)))
+            and (reply.get('values') is None or isinstance(reply['values'], dict))):
+        raise ValueError('malformed reply')
+    return reply
+
+def request(path, argv=None, env=None, cwd=None, width=None, timeout=None):
+    """Send a request to the server at path and return the reply dict.
+
+    argv, env, cwd and width default to those of the calling process (width
+    is left to the server if stdout is not a terminal). An empty request is
+    sent if argv is False, which the server does not answer. Raise
+    socket.error if no server is listening, or if path is not a socket owned
+    by the current user. Raise ValueError if the reply is malformed.
+    """
+    _check_owner(path)
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(timeout)
+    try:
+        connection.connect(path)
+        if argv is False:
+            return None
+        if width is None and sys.stdout.isatty():
+            from tui import get_terminal_size
+            width = get_terminal_size()[0]
+        req = dict(argv=list(sys.argv if argv is None else argv),
+                   env=dict(os.environ if env is None else env),
+                   cwd=cwd or os.getcwd(),
+                   width=width)
+        connection.sendall(json.dumps(req) + '\n')
+        connection.shutdown(socket.SHUT_WR)
+        return _load_reply(_receive(connection))
+    finally:
+        connection.close()
+
+def client(path, argv=None):
+    """Return the settings for this run from the server at path.
+
+    Any help or error messages are printed, and if the tui would have exited
+    (e.g. on --help or bad arguments) so does this, with the same status.
+    Return None if no server is listening, so that the caller can fall back
+    to making its own tui. This includes sockets owned by other users, and 
+    anything answering that is not a tui server.
+    """
+    try:
+        reply = request(path, argv)
+    except (socket.error, ValueError):
+        return None
+    sys.stdout.write(reply['stdout'])
+    sys.stderr.write(reply['stderr'])
+    if reply['status'] is not None:
+        sys.exit(reply['status'])
+    return reply['values']
+
+def main(argv=None):
+    """Run the tui.server command line interface."""
+    ui = tui([Posarg('socket', 'String',
+                     docs='Path of the Unix socket to listen on.'),
+              Posarg('spec', 'String',
+                     docs='module:attribute, where attribute is a function that returns a tui made with launch=False (or such a tui).')],
+             progname='tui.server',
+             command='python -m tui.server',
+             description='Serve settings, help and error messages for a tui on a Unix socket.',
+             version=__version__,
+             configfiles=[],
+             argv=argv)
+    sys.path.insert(0, os.getcwd())
+    try:
+        # The factory, not the tui it makes, so that the server can rebuild.
+        server = Server(generate.load(ui['spec'], call=False), ui['socket'])
+    except (ImportError, AttributeError, ValueError, socket.error), e:
+        ui.graceful_exit(e)
+    # Remove the socket file when killed.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,7 @@ __version__ = "1.0.0"
 __copyright__ = "Copyright (c) 2011 Joel Hedlund."
 __license__ = "MIT"
 
+import array
 import re
 
 class ParseError(Exception):
@@ -87,6 +88,148 @@ class IndentedParagraphs(TextBlock):
         """Return the indented paragraphs as a list of strings."""
         return self.lines
 
+class TextBuffer(object):
+    """Numbered lines of text, packed into a single string.
+    
+    Lines are appended to a list, and .pack() moves them into one string with 
+    an array of line offsets, so that they no longer need one string object 
+    each.
+    """
+    __slots__ = ('packed', 'offsets', 'lines')
+
+    def __init__(self):
+        self.packed = ''
+        self.offsets = array.array('L', [0])
+        self.lines = []
+
+    def __len__(self):
+        return len(self.offsets) - 1 + len(self.lines)
+
+    def append(self, line):
+        """Add a line (no newlines) to the buffer."""
+        self.lines.append(line)
+
+    def pack(self):
+        """Move appended lines into the packed string."""
+        if not self.lines:
+            return
+        end = len(self.packed)
+        self.offsets.extend(end + n for n in _cumulative(len(line) + 1 for line in self.lines))
+        self.packed += '\n'.join(self.lines) + '\n'
+        self.lines = []
+
+    def join(self, start, end, separator=' '):
+        """Join lines start to end (not inclusive) using separator."""
+        if start >= end:
+            return ''
+        n_packed = len(self.offsets) - 1
+        parts = []
+        if start < n_packed:
+            packed = self.packed[self.offsets[start]:self.offsets[min(end, n_packed)] - 1]
+            parts.append(packed.replace('\n', separator))
+        if end > n_packed:
+            parts.extend(self.lines[max(start - n_packed, 0):end - n_packed])
+        return separator.join(parts)
+
+def _cumulative(numbers):
+    total = 0
+    for n in numbers:
+        total += n
+        yield total
+
+class CompactTextBlock(object):
+    """Base class for text blocks that keep their text in a shared buffer.
+    
+    The buffer is a TextBuffer that can be shared by all blocks from the same
+    TextBlockParser. A block only holds a flat array of (start, end, indent) 
+    spans of lines in the buffer, one for each paragraph, and paragraph 
+    strings are not built until .text() is called. 
+    """
+    __slots__ = ('buffer', 'spans', 'tabsize')
+
+    def __init__(self, tabsize=4, buffer=None):
+        """
+        tabsize > 0 replaces tab characters with that many spaces. Set <= 0 to 
+        disable.
+        
+        buffer is the TextBuffer to store lines in. None means use a new one.
+        """
+        if buffer is None:
+            buffer = TextBuffer()
+        self.buffer = buffer
+        self.spans = array.array('l')
+        self.tabsize = tabsize
+
+    def __len__(self):
+        return len(self.spans) // 3
+
+    def startblock(self):
+        pass
+
+    def _add(self, text, indent, continued):
+        """Store a line of text, as a new paragraph unless continued."""
+        spans = self.spans
+        if continued and spans and spans[-2] == len(self.buffer):
+            spans[-2] += 1
+        else:
+            spans.extend((len(self.buffer), len(self.buffer) + 1, indent))
+        self.buffer.append(text)
+
+    def addline(self, line):
+        """Add a line (no trailing newlines) to the text block."""
+        self._add(line, 0, False)
+
+    def text(self):
+        """Return the text in the block as a list of lines."""
+        join = self.buffer.join
+        spans = self.spans
+        return [' ' * spans[i + 2] + join(spans[i], spans[i + 1]) 
+                for i in xrange(0, len(spans), 3)]
+
+class CompactSingleParagraph(CompactTextBlock):
+    """Compact version of SingleParagraph."""
+    __slots__ = ()
+
+    def addline(self, line):
+        line = line.strip()
+        if not line:
+            return
+        self._add(line, 0, True)
+
+    def text(self):
+        """Return the paragraph as a string."""
+        return [' '.join(CompactTextBlock.text(self))]
+
+class CompactIndentedParagraphs(CompactTextBlock):
+    """Compact version of IndentedParagraphs."""
+    __slots__ = ('_previous_indent', '_keep_indent')
+
+    def startblock(self):
+        self._previous_indent = -1
+        self._keep_indent = True
+
+    def addline(self, line):
+        if self.tabsize:
+            line = line.replace('\t', ' ' * self.tabsize)
+        stripped = line.lstrip()
+        indent = len(line) - len(stripped)
+        stripped = stripped.rstrip()
+        if stripped.endswith('\\'):
+            stripped = stripped[:-1].rstrip()
+            keep_next_indent = True
+        else:
+            keep_next_indent = False
+        if not stripped:
+            # A blank line is an empty paragraph.
+            self.spans.extend((len(self.buffer), len(self.buffer), 0))
+            self._previous_indent = -1
+        elif self._keep_indent or indent != self._previous_indent:
+            self._add(stripped, indent, False)
+            self._previous_indent = indent
+        else:
+            self._add(stripped, indent, True)
+        self._keep_indent = keep_next_indent
+
 class Decommenter(object):
     """Base class for Decommenters for TextBlockParsers."""
     
@@ -114,14 +257,19 @@ class UnescapedHashDecommenter(Decommenter):
     ...     you get the picture.
     """
 
+    _comment = re.compile(r'(\\*)\1(#.*|\\(#))')
+    
+    # _repl is a workaround for the fact that python <3.3 re gives None 
+    # rather than '' for nonmatching groups.
+    _repl = staticmethod(lambda m: m.group(1) + (m.group(3) or ''))
+
     def decomment(self, line):
-        if line and line[0] == '#':
+        # Most lines have no hash characters, and then there is nothing to do.
+        if '#' not in line:
+            return line
+        if line[0] == '#':
             return None
-        decomment = r'(\\*)\1(#.*|\\(#))'
-        # repl is a workaround for the fact that python <3.3 re gives None 
-        # rather than '' for nonmatching groups.
-        repl = lambda m: m.group(1) + (m.group(3) or '')
-        return re.sub(decomment, repl, line)
+        return self._comment.sub(self._repl, line)
     
 class TextBlockParser(object):
     def __init__(self,
@@ -155,8 +303,17 @@ class TextBlockParser(object):
             labelled_classes = dict()
         self.labelled_classes = labelled_classes
         if names is None:
-            names = dict((name.upper, name) for name in blocks)
+            names = dict((name.upper(), name) for name in blocks)
         self.names = names
+        # Shared storage for CompactTextBlocks.
+        self.buffer = TextBuffer()
+        self._compile_tags()
+
+    def _compile_tags(self):
+        """Build the regex that recognizes tag lines from self.names."""
+        tags = sorted(self.names, key=len, reverse=True)
+        alternatives = '|'.join(re.escape(tag) for tag in tags) or '(?!)'
+        self._tag_line = re.compile(r'\s*(%s)\s*:(.*)' % alternatives)
 
     def __getitem__(self, name):
         if name in self.labelled_classes:
@@ -171,48 +328,130 @@ class TextBlockParser(object):
         if tag in self.names:
             raise ValueError('tag already in use') 
         self.names[tag] = name
+        self._compile_tags()
         if labelled:
             self.blocks[name] = dict()
             self.labelled_classes[name] = textblockclass
         else:
-            self.blocks[name] = textblockclass()
+            self.blocks[name] = self._newblock(textblockclass)
+
+    def _newblock(self, textblockclass):
+        if issubclass(textblockclass, CompactTextBlock):
+            return textblockclass(self.tabsize, self.buffer)
+        return textblockclass()
 
-    def parse(self, file):
-        """Parse text blocks from a file."""
+    def parse(self, file, filename=None):
+        """Parse text blocks from a file.
+        
+        file is a path or an open file. filename (if given) is used in error
+        messages instead of file.name, e.g. for StringIO objects.
+        """
         if isinstance(file, basestring):
             file = open(file)
-        line_number = 0
+        self._parse_lines(file, filename or file.name)
+        self.buffer.pack()
+
+    def parse_range(self, filename, start, end, line_number=0):
+        """Parse text blocks from the bytes start to end in a file.
+        
+        Use with offsets from .index() to parse only the blocks you need.
+        line_number is the number of lines preceding start in the file, and 
+        is only used in error messages.
+        """
+        file = open(filename, 'rb')
+        try:
+            file.seek(start)
+            lines = file.read(end - start).split('\n')
+        finally:
+            file.close()
+        # Text ending with a newline does not have an empty last line.
+        if lines and not lines[-1]:
+            lines.pop()
+        self._parse_lines(lines, filename, line_number)
+        self.buffer.pack()
+
+    def index(self, filename):
+        """Make a list of the tagged blocks in a file, without parsing them.
+        
+        Return a list of (name, label, start, end, line_number) tuples, one for 
+        each tag line in the file. start and end are the byte offsets of the 
+        tag line and of the next tag line (or end of file) and line_number is 
+        the number of lines preceding the tag line. These are suitable for 
+        passing on to .parse_range(). label is None for unlabelled blocks.
+        
+        This only takes a quick look at each line, so no ParseErrors are 
+        raised for malformed blocks until they are parsed.
+        """
+        blocks = []
+        offset = 0
+        match_tag_line = self._tag_line.match
+        file = open(filename, 'rb')
+        try:
+            for line_number, line in enumerate(file):
+                length = len(line)
+                # Only tag lines need the full treatment.
+                if match_tag_line(line):
+                    line = self._clean(line.rstrip('\n'))
+                    m = line is not None and match_tag_line(line)
+                    if m:
+                        if blocks:
+                            blocks[-1][3] = offset
+                        name = self.names[m.group(1)]
+                        label = m.group(2).strip() or None
+                        blocks.append([name, label, offset, None, line_number])
+                offset += length
+        finally:
+            file.close()
+        if blocks:
+            blocks[-1][3] = offset
+        return [tuple(block) for block in blocks]
+
+    def _clean(self, line):
+        """Expand tabs and remove comments, or return None for comment lines."""
+        if self.tabsize > 0:
+            line = line.replace('\t', ' ' * self.tabsize)
+        if self.decommenter:
+            line = self.decommenter.decomment(line)
+        return line
+
+    def _parse_lines(self, lines, filename, line_number=0):
         label = None
         block = self.untagged
-        for line in file:
+        tab = self.tabsize > 0 and ' ' * self.tabsize
+        decomment = self.decommenter and self.decommenter.decomment
+        match_tag_line = self._tag_line.match
+        for line in lines:
             line_number += 1
             line = line.rstrip('\n')
-            if self.tabsize > 0:
-                line = line.replace('\t', ' ' * self.tabsize)
-            if self.decommenter:
-                line = self.decommenter.decomment(line)
+            if tab:
+                line = line.replace('\t', tab)
+            if decomment:
+                line = decomment(line)
                 if line is None:
                     continue
-            tag = line.split(':', 1)[0].strip()
+            m = match_tag_line(line)
             # Still in the same block?
-            if tag not in self.names:
+            if not m:
                 if block is None:
                     if line and not line.isspace():
-                        raise ParseError(file.name, line, "garbage before first block: %r" % line)
+                        raise ParseError(filename, line_number, "garbage before first block: %r" % line)
                     continue
                 block.addline(line)
                 continue
             # Open a new block.
-            name = self.names[tag]
-            label = line.split(':',1)[1].strip()
+            name = self.names[m.group(1)]
+            label = m.group(2).strip()
             if name in self.labelled_classes:
                 if not label:
-                    raise ParseError(file.name, line, "missing label for %r block" % name)
-                block = self.blocks[name].setdefault(label, self.labelled_classes[name]())
+                    raise ParseError(filename, line_number, "missing label for %r block" % name)
+                block = self.blocks[name].get(label)
+                if block is None:
+                    block = self._newblock(self.labelled_classes[name])
+                    self.blocks[name][label] = block
             else:
                 if label:
                     msg = "label %r present for unlabelled block %r" % (label, name)
-                    raise ParseError(file.name, line_number, msg)
+                    raise ParseError(filename, line_number, msg)
                 block = self.blocks[name]
             block.startblock()
             
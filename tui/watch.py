@@ -0,0 +1,207 @@
+"""TUI Textual User Interface - A sane command line user interface.
+
+Author: Joel Hedlund <yohell@ifm.liu.se>
+
+This module reloads the configfiles of textual user interfaces in long running
+programs when they change or on SIGHUP, so that they need not be restarted,
+e.g:
+
+from tui import watch
+def changed(changes):
+    for name, (old, new) in changes.items():
+        log('%s changed from %r to %r' % (name, old, new))
+watcher = watch.Watcher(ui, [changed])
+watcher.start()
+watcher.handle_signal()
+
+The tui must be made with reloadable=True, so that settings from the command
+line can be applied again on top of the reloaded configfiles. The directories
+of ui.configfiles are watched with inotify where available (Linux). The files
+are polled otherwise, and also if some of the directories do not exist (yet).
+Only configfiles that have changed are read again, and settings from the
+command line still override them, see tui.reload().
+
+The tui is frozen (see tui.freeze()) unless freeze=False, so other threads
+can read settings using ui[name] or ui.dict() without locking, and see
+either all or none of the changes from a reload. Callbacks are run in a watcher thread, with
+watcher.lock held. Hold it while changing settings using ui[name] = value.
+
+If you have problems with this package, please contact the author.
+
+"""
+__version__ = "2.0.0rc1"
+__copyright__ = "Copyright (c) 2026 Joel Hedlund."
+__license__ = "MIT"
+
+import os
+import select
+import signal
+import sys
+import threading
+
+from tui import (ParseError,
+                 _filestat)
+
+class Inotify(object):
+    """Wait for changes in directories using inotify(7).
+
+    OSError is raised if inotify is not available or a directory can not be
+    watched.
+    """
+    # IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+    # IN_DELETE, which covers editors that replace files by renaming.
+    mask = 0x4 | 0x8 | 0x40 | 0x80 | 0x100 | 0x200
+
+    def __init__(self, dirs):
+        import ctypes
+        import ctypes.util
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            init, add_watch = libc.inotify_init, libc.inotify_add_watch
+        except (OSError, AttributeError):
+            raise OSError('inotify is not available')
+        self.fd = init()
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init failed')
+        for dir in dirs:
+            if add_watch(self.fd, dir, self.mask) < 0:
+                errno = ctypes.get_errno()
+                self.close()
+                raise OSError(errno, os.strerror(errno), dir)
+
+    def wait(self, timeout=None):
+        """Return True if something changed within timeout seconds."""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return False
+        # Events only say that it is time to look, so they are discarded.
+        os.read(self.fd, 65536)
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+class Watcher(object):
+    """Reload the configfiles of a tui in a background thread as they change."""
+
+    def __init__(self, ui, callbacks=(), interval=1.0, errback=None, freeze=True):
+        """
+        ui is the tui to reload, made with reloadable=True (or deferred), 
+        after it has parsed its configfiles.
+
+        callbacks are called with the name:(old, new) dict of changed values
+        after each reload that changed anything, see .register().
+
+        interval is the number of seconds between polls when inotify is not
+        available, and the longest time .stop() has to wait.
+
+        errback is called with the ParseError if a changed file can not be
+        parsed, and the old values are kept. None means print the error to
+        stderr. The files are not tried again until they change.
+
+        If freeze is true, ui.freeze() is called here, so that other threads
+        can read settings without locking (see the module docs). In lazy mode
+        this converts all values, and raises ParseError if any are bad.
+        """
+        if not (ui.reloadable or ui.deferred):
+            raise ValueError('the tui must be made with reloadable=True')
+        self.ui = ui
+        self.callbacks = list(callbacks)
+        self.interval = interval
+        self.errback = errback
+        self.lock = threading.RLock()
+        self._stopped = threading.Event()
+        self._signalled = threading.Event()
+        self._threads = []
+        # File stats when reloading last failed, see .check().
+        self._failed = None
+        if freeze:
+            with self.lock:
+                ui.freeze()
+
+    def register(self, callback):
+        """Call callback with the changes after each reload."""
+        self.callbacks.append(callback)
+
+    def check(self, files=None):
+        """Reload configfiles and run the callbacks. Return the changes.
+        
+        files is a list of configfiles to read. None means the changed ones,
+        unless they are just as they were when reloading last failed.
+        """
+        with self.lock:
+            stats = [_filestat(path) for path in self.ui.configfiles]
+            if files is None and stats == self._failed:
+                return dict()
+            try:
+                changes = self.ui.reload(files)
+            except ParseError, e:
+                self._failed = stats
+                if self.errback:
+                    self.errback(e)
+                else:
+                    print >> sys.stderr, 'ERROR: %s' % e
+                return dict()
+            self._failed = None
+            if changes:
+                for callback in self.callbacks:
+                    callback(changes)
+            return changes
+
+    def start(self):
+        """Start watching in a daemon thread."""
+        dirs = set(os.path.dirname(os.path.abspath(path)) for path in self.ui.configfiles)
+        existing = sorted(dir for dir in dirs if os.path.isdir(dir))
+        try:
+            inotify = Inotify(existing)
+        except OSError:
+            inotify = None
+        poll = not inotify or len(existing) < len(dirs)
+        self._start(self._watch, inotify, poll)
+
+    def handle_signal(self, signum=signal.SIGHUP):
+        """Reload all configfiles when the process gets signum.
+        
+        The signal handler only wakes a worker thread, which does the 
+        reloading. Signal handlers can only be installed from the main thread.
+        """
+        signal.signal(signum, lambda signum, frame: self._signalled.set())
+        self._start(self._wait_for_signal)
+
+    def _start(self, target, *args):
+        self._stopped.clear()
+        thread = threading.Thread(target=target, args=args)
+        thread.daemon = True
+        thread.start()
+        self._threads.append(thread)
+
+    def _wait_for_signal(self):
+        while not self._stopped.is_set():
+            # Without a timeout, the wait could not be stopped.
+            self._signalled.wait(self.interval)
+            if self._signalled.is_set() and not self._stopped.is_set():
+                self._signalled.clear()
+                self.check(self.ui.configfiles)
+
+    def _watch(self, inotify, poll):
+        try:
+            while not self._stopped.is_set():
+                if inotify:
+                    changed = inotify.wait(self.interval) or poll
+                else:
+                    self._stopped.wait(self.interval)
+                    changed = True
+                if changed and not self._stopped.is_set():
+                    self.check()
+        finally:
+            if inotify:
+                inotify.close()
+
+    def stop(self):
+        """Stop watching, and wait for the threads to finish.
+        
+        Signal handlers installed by .handle_signal() are left in place, but 
+        do nothing.
+        """
+        self._stopped.set()
+        while self._threads:
+            self._threads.pop().join()